@@ -1,10 +1,14 @@
+from datetime import datetime
+from typing import Optional
 from flask import request, jsonify, current_app
 from flask_restx import Namespace, Resource
-from flask import send_file
+from flask import send_file, Response, stream_with_context
 
 from models import DashboardStats, CrashInfo
-from services import monitoring_service, task_manager
+from services import monitoring_service, task_manager, crash_index, crash_triage, crash_minimizer, coverage_service
+from services.archive import stream_tar, stream_zip
 import os
+import json
 
 
 api = Namespace("results", description="结果分析")
@@ -17,8 +21,7 @@ class Dashboard(Resource):
     def get(self):
         """获取仪表盘统计数据"""
         try:
-            import asyncio
-            stats = asyncio.run(monitoring_service.get_dashboard_stats())
+            stats = monitoring_service.get_dashboard_stats()
 
             return DashboardStats(**stats).model_dump(), 200
 
@@ -27,64 +30,94 @@ class Dashboard(Resource):
             return {"error": str(e)}, 500
 
 
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """解析 ISO 格式时间参数"""
+    return datetime.fromisoformat(value) if value else None
+
+
 @api.route("/crashes")
 class Crashes(Resource):
     """崩溃样本列表"""
 
     def get(self):
-        """获取所有崩溃样本"""
+        """分页查询崩溃样本
+
+        参数: taskId、signal、bucket、crashType 过滤；since/until 为 ISO 格式时间；
+        sort 为排序字段（found_at/severity/size/signal/crash_type/task_id），
+        order 为 asc/desc；page 从 1 开始，pageSize 最大 500。
+        """
         try:
             task_id = request.args.get("taskId", type=int)
+            page = max(1, request.args.get("page", 1, type=int))
+            page_size = min(max(1, request.args.get("pageSize", 50, type=int)), 500)
+
+            try:
+                since = _parse_time(request.args.get("since"))
+                until = _parse_time(request.args.get("until"))
+            except ValueError:
+                return {"error": "时间格式错误"}, 400
+
+            tasks = {task.id: task for task in task_manager.get_all_tasks()
+                     if task_id is None or task.id == task_id}
+
+            # 只重新列出 mtime 发生变化的崩溃目录
+            crash_index.sync_tasks(list(tasks.values()))
+
+            rows, total = crash_index.query(
+                task_id=task_id,
+                signal=request.args.get("signal"),
+                bucket=request.args.get("bucket"),
+                crash_type=request.args.get("crashType"),
+                since=since,
+                until=until,
+                sort=request.args.get("sort", "found_at"),
+                descending=request.args.get("order", "desc") != "asc",
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
 
             crashes = []
+            for row in rows:
+                task = tasks.get(row["task_id"])
+                if not task:
+                    continue
+                info = crash_triage.crash_info(task, row)
+                crash = info.model_dump(mode="json")
+                crash["filename"] = row["filename"]
+                crash["size"] = row["size"]
+                crashes.append(crash)
+
+            return {"crashes": crashes, "total": total, "page": page, "page_size": page_size}, 200
 
-            if task_id:
-                # 获取指定任务的崩溃
-                crash_files = monitoring_service.get_crash_files(task_id)
-                task = task_manager.get_task(task_id)
+        except Exception as e:
+            current_app.logger.error(f"获取崩溃列表失败: {e}")
+            return {"error": str(e)}, 500
 
-                for i, cf in enumerate(crash_files, 1):
-                    crashes.append({
-                        "crash_id": f"C{task_id:03d}{i:04d}",
-                        "task_id": task_id,
-                        "task_name": task.name if task else "Unknown",
-                        "filename": cf["filename"],
-                        "crash_type": "Heap Overflow",  # 简化处理
-                        "signal": "SIGSEGV",
-                        "reproducible": True,
-                        "severity": 5,
-                        "sample_file": cf["filename"],
-                        "found_at": cf["mtime"],
-                        "stack_trace": None
-                    })
-            else:
-                # 获取所有任务的崩溃
-                tasks = task_manager.get_all_tasks()
-                for task in tasks:
-                    crash_files = monitoring_service.get_crash_files(task.id)
-
-                    for i, cf in enumerate(crash_files, 1):
-                        crashes.append({
-                            "crash_id": f"C{task.id:03d}{i:04d}",
-                            "task_id": task.id,
-                            "task_name": task.name,
-                            "filename": cf["filename"],
-                            "crash_type": "Heap Overflow",
-                            "signal": "SIGSEGV",
-                            "reproducible": True,
-                            "severity": 5,
-                            "sample_file": cf["filename"],
-                            "found_at": cf["mtime"],
-                            "stack_trace": None
-                        })
-
-            # 按时间倒序排序
-            crashes.sort(key=lambda x: x["found_at"], reverse=True)
-
-            return {"crashes": crashes, "total": len(crashes)}, 200
+
+@api.route("/crashes/buckets")
+class CrashBuckets(Resource):
+    """崩溃分桶"""
+
+    def get(self):
+        """按栈哈希汇总崩溃，同一个桶通常对应同一个缺陷"""
+        try:
+            task_id = request.args.get("taskId", type=int)
+
+            tasks = {task.id: task for task in task_manager.get_all_tasks()
+                     if task_id is None or task.id == task_id}
+            crash_index.sync_tasks(list(tasks.values()))
+
+            buckets = []
+            for bucket in crash_index.buckets(task_id):
+                task = tasks.get(bucket["task_id"])
+                if task:
+                    bucket["task_name"] = task.name
+                    buckets.append(bucket)
+
+            return {"buckets": buckets, "total": len(buckets)}, 200
 
         except Exception as e:
-            current_app.logger.error(f"获取崩溃列表失败: {e}")
+            current_app.logger.error(f"获取崩溃分桶失败: {e}")
             return {"error": str(e)}, 500
 
 
@@ -93,73 +126,210 @@ class CrashDownload(Resource):
     """下载崩溃样本"""
 
     def get(self, crash_id: str):
-        """下载崩溃样本文件"""
+        """下载崩溃样本文件，崩溃ID通过索引直接定位到文件"""
         try:
-            # 解析 crash_id 获取 task_id 和文件名
-            # 格式: C{task_id:03d}{index:04d}
-            task_id = int(crash_id[1:4])
+            row = crash_index.get_by_id(crash_id)
+            if not row:
+                return {"error": "崩溃不存在"}, 404
 
-            task = task_manager.get_task(task_id)
+            task = task_manager.get_task(row["task_id"])
             if not task:
                 return {"error": "任务不存在"}, 404
 
-            crash_dir = os.path.join(task.output_dir, "fuzzer0", "crashes")
-            crash_files = os.listdir(crash_dir) if os.path.exists(crash_dir) else []
-
-            if not crash_files:
-                return {"error": "没有崩溃文件"}, 404
-
-            # 获取第一个崩溃文件（简化处理）
-            filename = crash_files[0]
-            filepath = os.path.join(crash_dir, filename)
-
+            filepath = os.path.join(task.output_dir, row["sample"])
             if not os.path.exists(filepath):
                 return {"error": "文件不存在"}, 404
 
-            return send_file(filepath, as_attachment=True, download_name=filename)
+            return send_file(filepath, as_attachment=True, download_name=row["filename"])
 
         except Exception as e:
             current_app.logger.error(f"下载崩溃样本失败: {e}")
             return {"error": str(e)}, 500
 
 
+@api.route("/crashes/<crash_id>/minimized")
+class CrashMinimized(Resource):
+    """精简后的崩溃样本"""
+
+    def get(self, crash_id: str):
+        """下载 afl-tmin 精简后的样本"""
+        try:
+            row = crash_index.get_by_id(crash_id)
+            if not row:
+                return {"error": "崩溃不存在"}, 404
+
+            task = task_manager.get_task(row["task_id"])
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            filepath = crash_minimizer.minimized_path(task, row)
+            if not filepath or not os.path.exists(filepath):
+                return {"error": "样本尚未精简", "min_status": row["min_status"]}, 404
+
+            return send_file(filepath, as_attachment=True, download_name=f"{row['filename']}.min")
+
+        except Exception as e:
+            current_app.logger.error(f"下载精简样本失败: {e}")
+            return {"error": str(e)}, 500
+
+    def post(self, crash_id: str):
+        """手动请求精简样本（不要求是所在桶的第一个样本）"""
+        try:
+            row = crash_index.get_by_id(crash_id)
+            if not row:
+                return {"error": "崩溃不存在"}, 404
+
+            task = task_manager.get_task(row["task_id"])
+            if not task or not task.target_binary:
+                return {"error": "任务没有目标程序"}, 400
+
+            if not crash_minimizer.submit(task.id, row["sample"]):
+                return {"error": "样本正在精简"}, 409
+
+            return {"message": "已提交精简", "crash_id": crash_id}, 202
+
+        except Exception as e:
+            current_app.logger.error(f"提交样本精简失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/crashes/download")
+class CrashBulkDownload(Resource):
+    """批量下载崩溃样本"""
+
+    def post(self):
+        """打包下载一组崩溃样本
+
+        请求体: crash_ids 指定崩溃ID列表；未指定时按 taskId、signal、bucket、
+        crashType 过滤。format 为 tar（默认，tar.gz）或 zip。压缩包边生成边
+        发送，附带 manifest.json 记录每个样本的分析结果；已精简的样本同时
+        打包 minimized/ 下的精简版本。
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            archive_format = data.get("format", "tar")
+            if archive_format not in ("tar", "zip"):
+                return {"error": "不支持的压缩格式"}, 400
+
+            crash_ids = data.get("crash_ids")
+            if crash_ids is not None:
+                if not isinstance(crash_ids, list):
+                    return {"error": "crash_ids 必须是列表"}, 400
+                rows = iter(crash_index.get_many([str(crash_id) for crash_id in crash_ids]))
+            else:
+                task_id = data.get("taskId")
+                if task_id is not None:
+                    try:
+                        task_id = int(task_id)
+                    except (TypeError, ValueError):
+                        return {"error": "taskId 必须是整数"}, 400
+                tasks = [task for task in task_manager.get_all_tasks()
+                         if task_id is None or task.id == task_id]
+                crash_index.sync_tasks(tasks)
+                rows = crash_index.iter_rows(
+                    task_id=task_id,
+                    signal=data.get("signal"),
+                    bucket=data.get("bucket"),
+                    crash_type=data.get("crashType")
+                )
+
+            tasks = {task.id: task for task in task_manager.get_all_tasks()}
+            manifest = []
+
+            def members():
+                for row in rows:
+                    task = tasks.get(row["task_id"])
+                    if not task:
+                        continue
+                    manifest.append({
+                        "crash_id": row["crash_id"],
+                        "task_id": row["task_id"],
+                        "instance": row["instance"],
+                        "filename": row["filename"],
+                        "signal": row["signal"],
+                        "crash_type": row["crash_type"],
+                        "bucket": row["bucket"],
+                        "min_status": row["min_status"],
+                    })
+                    yield (
+                        f"task_{task.id}/{row['instance']}/{row['filename']}",
+                        os.path.join(task.output_dir, row["sample"])
+                    )
+                    if row["min_sample"]:
+                        yield (
+                            f"task_{task.id}/{row['instance']}/minimized/{row['filename']}",
+                            os.path.join(task.output_dir, row["min_sample"])
+                        )
+
+            def trailer():
+                return {"manifest.json": json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")}
+
+            if archive_format == "zip":
+                stream, mimetype, filename = stream_zip(members(), trailer), "application/zip", "crashes.zip"
+            else:
+                stream, mimetype, filename = stream_tar(members(), trailer), "application/gzip", "crashes.tar.gz"
+
+            return Response(
+                stream_with_context(stream),
+                mimetype=mimetype,
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
+
+        except Exception as e:
+            current_app.logger.error(f"批量下载崩溃样本失败: {e}")
+            return {"error": str(e)}, 500
+
+
 @api.route("/coverage")
 class Coverage(Resource):
     """覆盖率报告"""
 
     def get(self):
-        """获取覆盖率报告"""
+        """获取覆盖率报告
+
+        参数: taskId 指定任务；group 指定共享组时返回组内各任务覆盖的并集、
+        交集和各自独有的边数。白盒任务的边数来自 afl-showmap 记录的位图，
+        尚未追踪过的任务和黑盒任务使用 fuzzer_stats 中的 bitmap_cvg。
+        """
         try:
             task_id = request.args.get("taskId", type=int)
+            group = request.args.get("group")
 
-            coverage_data = []
+            if group:
+                coverage = coverage_service.group_coverage(group)
+                if coverage is None:
+                    return {"error": "共享组不存在或没有支持覆盖率统计的任务"}, 404
+                return coverage, 200
 
             if task_id:
                 # 获取指定任务的覆盖率
                 task = task_manager.get_task(task_id)
-                if task:
-                    coverage_data.append({
-                        "task_id": task.id,
-                        "task_name": task.name,
-                        "edge_coverage": task.coverage,
-                        "path_coverage": task.coverage * 0.8,  # 简化处理
-                        "unique_crashes": task.unique_crashes,
-                        "total_execs": task.exec_count,
-                        "duration": "Running" if task.task_status.value == "running" else "Completed"
-                    })
+                tasks = [task] if task else []
             else:
                 # 获取所有任务的覆盖率
                 tasks = task_manager.get_all_tasks()
-                for task in tasks:
-                    coverage_data.append({
-                        "task_id": task.id,
-                        "task_name": task.name,
-                        "edge_coverage": task.coverage,
-                        "path_coverage": task.coverage * 0.8,
-                        "unique_crashes": task.unique_crashes,
-                        "total_execs": task.exec_count,
-                        "duration": "Running" if task.task_status.value == "running" else "Completed"
+
+            coverage_data = []
+            for task in tasks:
+                item = {
+                    "task_id": task.id,
+                    "task_name": task.name,
+                    "edge_coverage": task.coverage,
+                    "edges": None,
+                    "inputs": None,
+                    "unique_crashes": task.unique_crashes,
+                    "total_execs": task.exec_count,
+                    "duration": "Running" if task.task_status.value == "running" else "Completed"
+                }
+                traced = coverage_service.task_coverage(task)
+                if traced and traced["inputs"]:
+                    item.update({
+                        "edge_coverage": traced["edge_coverage"],
+                        "edges": traced["edges"],
+                        "inputs": traced["inputs"],
+                        "intersection_edges": traced["intersection_edges"],
                     })
+                coverage_data.append(item)
 
             return {"coverage": coverage_data, "total": len(coverage_data)}, 200
 
@@ -0,0 +1,112 @@
+from flask import request, current_app
+from flask_restx import Namespace, Resource
+
+from config import settings
+from services import task_manager, seed_service, seed_store
+import os
+
+
+api = Namespace("seeds", description="种子集管理")
+
+
+@api.route("/sets")
+class SeedSets(Resource):
+    """命名种子集"""
+
+    def get(self):
+        """获取所有种子集"""
+        try:
+            sets = seed_store.list_sets()
+            return {"sets": sets, "total": len(sets)}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取种子集失败: {e}")
+            return {"error": str(e)}, 500
+
+    def post(self):
+        """把任务当前的种子保存为种子集
+
+        请求体: name 种子集名称，taskId 来源任务，description 描述（可选）。
+        上传文件直接创建种子集使用 /api/upload/seeds 的 seedSet 参数。
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            name = str(data.get("name", "")).strip()
+            task_id = data.get("taskId")
+
+            task = task_manager.get_task(task_id) if task_id is not None else None
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            added, duplicates = seed_store.save_set_from_dir(
+                name, os.path.join(settings.seeds_dir, f"task_{task.id}"), data.get("description", "")
+            )
+            return {"seed_set": seed_store.get_set(name), "added": added, "duplicates": duplicates}, 201
+
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            current_app.logger.error(f"创建种子集失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/sets/<name>")
+class SeedSet(Resource):
+    """种子集详情"""
+
+    def get(self, name: str):
+        """获取种子集的文件列表"""
+        try:
+            seed_set = seed_store.get_set(name)
+            if not seed_set:
+                return {"error": "种子集不存在"}, 404
+            return seed_set, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取种子集失败: {e}")
+            return {"error": str(e)}, 500
+
+    def delete(self, name: str):
+        """删除种子集，已使用它的任务不受影响"""
+        try:
+            if not seed_store.delete_set(name):
+                return {"error": "种子集不存在"}, 404
+            return {"message": "种子集已删除"}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"删除种子集失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/sets/<name>/apply")
+class SeedSetApply(Resource):
+    """使用种子集"""
+
+    def post(self, name: str):
+        """将种子集链接到任务的种子目录，不需要重新上传
+
+        请求体: taskId 目标任务，replace 为真时先清空任务已有的种子。
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            task_id = data.get("taskId")
+
+            task = task_manager.get_task(task_id) if task_id is not None else None
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            try:
+                added, duplicates = seed_service.apply_seed_set(task.id, name, bool(data.get("replace", False)))
+            except KeyError:
+                return {"error": "种子集不存在"}, 404
+
+            return {
+                "message": f"已添加 {added} 个种子文件",
+                "task_id": task.id,
+                "added": added,
+                "duplicates": duplicates
+            }, 200
+
+        except Exception as e:
+            current_app.logger.error(f"使用种子集失败: {e}")
+            return {"error": str(e)}, 500
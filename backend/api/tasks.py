@@ -1,6 +1,6 @@
+import os
 from datetime import datetime
 from typing import Optional
-import asyncio
 from flask import request, jsonify, current_app
 from flask_restx import Namespace, Resource
 
@@ -8,8 +8,13 @@ from models import (
     StartTaskRequest,
     TaskListResponse,
     FuzzStats,
+    TaskStatus,
 )
-from services import task_manager, monitoring_service
+from services import (
+    task_manager, monitoring_service, metrics_store, scheduler, fuzzer_logs, crash_index, crash_triage,
+    corpus_distiller, corpus_sync, coverage_service, build_queue, build_cache
+)
+from services.metrics import RESOLUTIONS as METRIC_RESOLUTIONS
 
 
 api = Namespace("tasks", description="任务管理")
@@ -55,6 +60,75 @@ class TaskList(Resource):
             return {"error": str(e)}, 500
 
 
+@api.route("/scheduler")
+class SchedulerStatus(Resource):
+    """调度器状态"""
+
+    def get(self):
+        """获取 CPU 核心分配和排队情况"""
+        try:
+            return scheduler.get_status(), 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取调度器状态失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/share-groups")
+class ShareGroupList(Resource):
+    """语料共享组"""
+
+    def get(self):
+        """获取所有共享组的成员和导入统计"""
+        try:
+            groups = [corpus_sync.get_stats(name) for name in corpus_sync.group_names()]
+            groups = [group for group in groups if group]
+            return {"groups": groups, "total": len(groups)}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取共享组失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/builds")
+class BuildList(Resource):
+    """编译队列"""
+
+    def get(self):
+        """获取排队中和编译中的任务"""
+        try:
+            builds = build_queue.list_jobs()
+            return {"builds": builds, "total": len(builds)}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取编译队列失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/builds/cache")
+class BuildCacheStats(Resource):
+    """编译缓存"""
+
+    def get(self):
+        """获取编译缓存的条目数、大小和命中统计"""
+        try:
+            return build_cache.get_stats(), 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取编译缓存统计失败: {e}")
+            return {"error": str(e)}, 500
+
+    def delete(self):
+        """清空编译缓存（已创建任务的目标程序不受影响）"""
+        try:
+            removed = build_cache.clear()
+            return {"message": "已清空编译缓存", "removed": removed}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"清空编译缓存失败: {e}")
+            return {"error": str(e)}, 500
+
+
 @api.route("/<int:task_id>")
 class TaskDetail(Resource):
     """任务详情"""
@@ -97,12 +171,27 @@ class TaskStart(Resource):
             data = StartTaskRequest(**request.json)
             fuzzer_count = data.fuzzer_count
 
-            # 启动任务（start_fuzz 现在是同步方法）
-            success = task_manager.start_fuzz(task_id, fuzzer_count)
+            # 交给调度器启动，核心不足时任务进入排队状态
+            success, error_msg = scheduler.submit(task_id, fuzzer_count)
             if not success:
-                return {"error": "任务启动失败"}, 400
+                return {"error": f"任务启动失败: {error_msg}"}, 400
 
-            return {"message": "任务已启动", "task_id": task_id, "fuzzer_count": fuzzer_count}, 200
+            task = task_manager.get_task(task_id)
+            if task.task_status == TaskStatus.QUEUED:
+                return {
+                    "message": "任务已进入排队",
+                    "task_id": task_id,
+                    "fuzzer_count": fuzzer_count,
+                    "queue_position": task.queue_position
+                }, 202
+
+            return {
+                "message": "任务已启动",
+                "task_id": task_id,
+                "fuzzer_count": fuzzer_count,
+                "fuzzer_variants": task.fuzzer_variants,
+                "cpu_cores": task.cpu_cores
+            }, 200
 
         except Exception as e:
             current_app.logger.error(f"启动任务失败: {e}")
@@ -152,6 +241,10 @@ class TaskStop(Resource):
     def post(self, task_id: int):
         """停止正在运行的任务"""
         try:
+            # 排队中的任务直接移出队列
+            if scheduler.cancel(task_id):
+                return {"message": "任务已取消排队"}, 200
+
             success = task_manager.stop_task(task_id)
             if not success:
                 return {"error": "任务停止失败"}, 400
@@ -174,11 +267,7 @@ class TaskStats(Resource):
             if not task:
                 return {"error": "任务不存在"}, 404
 
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            stats = loop.run_until_complete(monitoring_service.get_task_stats(task_id))
-            loop.close()
+            stats = monitoring_service.get_task_stats(task_id)
 
             return FuzzStats(
                 task_id=task_id,
@@ -193,7 +282,9 @@ class TaskStats(Resource):
                 edges_total=stats.get("edges_total", 0),
                 coverage=stats.get("coverage", task.coverage),
                 run_time=stats.get("run_time", "00:00:00"),
-                last_update=datetime.now()
+                last_update=datetime.now(),
+                instance_count=stats.get("instance_count", 0),
+                instances=stats.get("instances", [])
             ).model_dump(mode='json'), 200
 
         except Exception as e:
@@ -201,6 +292,178 @@ class TaskStats(Resource):
             return {"error": str(e)}, 500
 
 
+@api.route("/<int:task_id>/build")
+class TaskBuild(Resource):
+    """白盒任务的编译"""
+
+    def get(self, task_id: int):
+        """获取最近一次编译的状态、队列位置和编译输出"""
+        try:
+            if not task_manager.get_task(task_id):
+                return {"error": "任务不存在"}, 404
+
+            job = build_queue.get_job(task_id)
+            if not job:
+                return {"error": "没有编译记录"}, 404
+            return job, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取编译状态失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/build/cancel")
+class TaskBuildCancel(Resource):
+    """取消编译"""
+
+    def post(self, task_id: int):
+        """取消排队中或编译中的任务，终止编译进程"""
+        try:
+            if not task_manager.get_task(task_id):
+                return {"error": "任务不存在"}, 404
+
+            if not build_queue.cancel(task_id):
+                return {"error": "任务不在编译中"}, 400
+            return {"message": "已取消编译", "task_id": task_id}, 200
+
+        except Exception as e:
+            current_app.logger.error(f"取消编译失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/timeseries")
+class TaskTimeseries(Resource):
+    """任务统计的时间序列"""
+
+    def get(self, task_id: int):
+        """查询 plot_data 历史数据
+
+        参数: metrics 逗号分隔的指标名（默认全部），from / to 时间范围（unix
+        秒），resolution 为 raw / 1m / 10m / auto（默认），instance 指定实例
+        （默认汇总所有实例），maxPoints 最多返回的点数（默认 1000）。
+        """
+        try:
+            if not task_manager.get_task(task_id):
+                return {"error": "任务不存在"}, 404
+
+            metrics = request.args.get("metrics")
+            start = request.args.get("from", type=float)
+            end = request.args.get("to", type=float)
+            resolution = request.args.get("resolution", "auto")
+            if resolution != "auto" and resolution not in METRIC_RESOLUTIONS:
+                return {"error": f"不支持的分辨率: {resolution}"}, 400
+
+            return metrics_store.query(
+                task_id,
+                metrics=[m.strip() for m in metrics.split(",") if m.strip()] if metrics else None,
+                start=start,
+                end=end,
+                resolution=resolution,
+                instance=request.args.get("instance") or None,
+                max_points=max(1, min(request.args.get("maxPoints", 1000, type=int), 20000))
+            ), 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取时间序列失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/coverage")
+class TaskCoverage(Resource):
+    """基于 afl-showmap 的边覆盖"""
+
+    def get(self, task_id: int):
+        """获取任务语料覆盖的边数和各输入的覆盖
+
+        参数: page / pageSize 分页返回输入列表，sort 为 new_edges（默认，
+        按带来的新边数降序）、edges（按覆盖边数降序）或 id（按处理顺序）。
+        """
+        try:
+            task = task_manager.get_task(task_id)
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            coverage = coverage_service.task_coverage(task)
+            if coverage is None:
+                return {"error": "只有插桩编译的白盒任务支持覆盖率统计"}, 400
+
+            sort = request.args.get("sort", "new_edges")
+            if sort not in ("new_edges", "edges", "id"):
+                return {"error": f"不支持的排序字段: {sort}"}, 400
+            page = max(1, request.args.get("page", 1, type=int))
+            page_size = min(max(1, request.args.get("pageSize", 50, type=int)), 500)
+
+            items = [dict(item, index=index) for index, item in enumerate(coverage.pop("items"))]
+            if sort != "id":
+                items.sort(key=lambda item: item[sort], reverse=True)
+
+            coverage.update({
+                "items": items[(page - 1) * page_size:page * page_size],
+                "page": page,
+                "page_size": page_size,
+                "updating": coverage_service.is_updating(),
+            })
+            return coverage, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取覆盖率失败: {e}")
+            return {"error": str(e)}, 500
+
+    def post(self, task_id: int):
+        """在后台追踪语料中的新输入，更新覆盖位图"""
+        try:
+            task = task_manager.get_task(task_id)
+            if not task:
+                return {"error": "任务不存在"}, 404
+            if not coverage_service.supports(task):
+                return {"error": "只有插桩编译的白盒任务支持覆盖率统计"}, 400
+
+            if not coverage_service.trigger([task_id]):
+                return {"error": "覆盖率正在更新中"}, 409
+            return {"message": "已开始更新覆盖率", "task_id": task_id}, 202
+
+        except Exception as e:
+            current_app.logger.error(f"更新覆盖率失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/logs")
+class TaskLogs(Resource):
+    """任务输出日志"""
+
+    def get(self, task_id: int):
+        """获取 fuzzer 实例最近的输出
+
+        参数: instance 指定实例；offset 为上次返回的 next_offset，用于增量读取；
+        limit 限制每个实例返回的字节数；raw=1 时保留 ANSI 控制序列。
+        """
+        try:
+            if not task_manager.get_task(task_id):
+                return {"error": "任务不存在"}, 404
+
+            offset = request.args.get("offset", type=int)
+            limit = request.args.get("limit", type=int)
+            raw = request.args.get("raw", "0") in ("1", "true")
+
+            logs = fuzzer_logs.tail(
+                task_id,
+                instance=request.args.get("instance"),
+                since=offset,
+                limit=limit,
+                raw=raw
+            )
+
+            return {
+                "task_id": task_id,
+                "streaming": fuzzer_logs.is_streaming(task_id),
+                "logs": logs
+            }, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取任务日志失败: {e}")
+            return {"error": str(e)}, 500
+
+
 @api.route("/<int:task_id>/crashes")
 class TaskCrashes(Resource):
     """任务崩溃样本"""
@@ -208,27 +471,83 @@ class TaskCrashes(Resource):
     def get(self, task_id: int):
         """获取任务的崩溃样本列表"""
         try:
-            crash_files = monitoring_service.get_crash_files(task_id)
+            task = task_manager.get_task(task_id)
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            page = max(1, request.args.get("page", 1, type=int))
+            page_size = min(max(1, request.args.get("pageSize", 50, type=int)), 500)
+
+            crash_index.sync_task(task)
+            rows, total = crash_index.query(
+                task_id=task_id,
+                signal=request.args.get("signal"),
+                bucket=request.args.get("bucket"),
+                offset=(page - 1) * page_size,
+                limit=page_size
+            )
 
             crashes = []
-            for i, cf in enumerate(crash_files, 1):
+            for row in rows:
+                info = crash_triage.crash_info(task, row)
                 crashes.append({
-                    "crash_id": f"C{task_id:03d}{i:04d}",
+                    "crash_id": info.crash_id,
                     "task_id": task_id,
-                    "filename": cf["filename"],
-                    "size": cf["size"],
-                    "found_at": cf["mtime"],
-                    "reproducible": True,  # 假设都是可重现的
-                    "signal": "SIGSEGV"
+                    "instance": info.instance,
+                    "filename": row["filename"],
+                    "size": row["size"],
+                    "found_at": info.found_at.isoformat(),
+                    "reproducible": info.reproducible,
+                    "signal": info.signal,
+                    "exit_code": info.exit_code,
+                    "crash_type": info.crash_type,
+                    "severity": info.severity,
+                    "bucket": info.bucket,
+                    "triage_status": info.triage_status,
+                    "min_status": info.min_status,
+                    "min_size": info.min_size
                 })
 
-            return {"crashes": crashes, "total": len(crashes)}, 200
+            return {"crashes": crashes, "total": total, "page": page, "page_size": page_size}, 200
 
         except Exception as e:
             current_app.logger.error(f"获取崩溃样本失败: {e}")
             return {"error": str(e)}, 500
 
 
+@api.route("/<int:task_id>/crashes/triage")
+class TaskCrashTriage(Resource):
+    """崩溃样本分析"""
+
+    def post(self, task_id: int):
+        """重新分析任务的崩溃样本，force 为真时重新分析已有结果的样本"""
+        try:
+            task = task_manager.get_task(task_id)
+            if not task:
+                return {"error": "任务不存在"}, 404
+
+            if not task.target_binary:
+                return {"error": "任务没有目标程序"}, 400
+
+            data = request.get_json(silent=True) or {}
+            force = bool(data.get("force", False))
+
+            crash_index.sync_task(task)
+            if force:
+                submitted = sum(
+                    crash_triage.submit(task_id, os.path.join(task.output_dir, sample), force=True)
+                    for sample in crash_index.samples(task_id)
+                )
+            else:
+                submitted = crash_triage.submit_pending(task)
+
+            return {"message": "已提交分析", "submitted": submitted}, 202
+
+        except Exception as e:
+            current_app.logger.error(f"提交崩溃分析失败: {e}")
+            return {"error": str(e)}, 500
+
+
 @api.route("/<int:task_id>/crashes/<filename>")
 class CrashDownload(Resource):
     """下载崩溃样本"""
@@ -243,10 +562,15 @@ class CrashDownload(Resource):
             if not task:
                 return {"error": "任务不存在"}, 404
 
-            crash_dir = os.path.join(task.output_dir, "fuzzer0", "crashes")
-            filepath = os.path.join(crash_dir, filename)
+            # 不同实例的崩溃文件名可能相同，可通过 instance 参数指定实例
+            instance = request.args.get("instance")
+            filepath = None
+            for cf in monitoring_service.get_crash_files(task_id):
+                if cf["filename"] == filename and (instance is None or cf["instance"] == instance):
+                    filepath = cf["filepath"]
+                    break
 
-            if not os.path.exists(filepath):
+            if not filepath or not os.path.exists(filepath):
                 return {"error": "文件不存在"}, 404
 
             return send_file(filepath, as_attachment=True, download_name=filename)
@@ -268,6 +592,7 @@ class TaskCorpus(Resource):
             corpus = []
             for cf in corpus_files:
                 corpus.append({
+                    "instance": cf["instance"],
                     "filename": cf["filename"],
                     "size": cf["size"],
                     "mtime": cf["mtime"]
@@ -278,3 +603,102 @@ class TaskCorpus(Resource):
         except Exception as e:
             current_app.logger.error(f"获取语料库失败: {e}")
             return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/corpus/distill")
+class TaskCorpusDistill(Resource):
+    """语料精简"""
+
+    def get(self, task_id: int):
+        """获取最近一次语料精简的状态和精简前后的文件数、字节数"""
+        try:
+            if not task_manager.get_task(task_id):
+                return {"error": "任务不存在"}, 404
+
+            job = corpus_distiller.get_job(task_id)
+            if not job:
+                return {"error": "没有语料精简记录"}, 404
+            return job, 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取语料精简状态失败: {e}")
+            return {"error": str(e)}, 500
+
+    def post(self, task_id: int):
+        """提交语料精简，restart 为真时完成后用精简语料重新启动任务"""
+        try:
+            data = request.get_json(silent=True) or {}
+            job, error = corpus_distiller.submit(task_id, restart=bool(data.get("restart", False)))
+            if not job:
+                code = 404 if error == "任务不存在" else 400
+                return {"error": error}, code
+
+            return job, 202
+
+        except Exception as e:
+            current_app.logger.error(f"提交语料精简失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/corpus/distill/apply")
+class TaskCorpusDistillApply(Resource):
+    """使用精简语料"""
+
+    def post(self, task_id: int):
+        """以精简语料作为初始语料开始新一轮 fuzz，之前的输出移动到 sessions/ 下"""
+        try:
+            success, error = corpus_distiller.apply(task_id)
+            if not success:
+                return {"error": error}, 400
+
+            task = task_manager.get_task(task_id)
+            return {
+                "message": "已使用精简语料",
+                "task_id": task_id,
+                "seeds_dir": task.seeds_dir,
+                "status": task.task_status.value
+            }, 200
+
+        except Exception as e:
+            current_app.logger.error(f"使用精简语料失败: {e}")
+            return {"error": str(e)}, 500
+
+
+@api.route("/<int:task_id>/corpus/share")
+class TaskCorpusShare(Resource):
+    """跨任务语料共享"""
+
+    def get(self, task_id: int):
+        """获取任务所在共享组的统计"""
+        try:
+            task = task_manager.get_task(task_id)
+            if not task:
+                return {"error": "任务不存在"}, 404
+            if not task.share_group:
+                return {"error": "任务未加入共享组"}, 404
+
+            return corpus_sync.get_stats(task.share_group), 200
+
+        except Exception as e:
+            current_app.logger.error(f"获取共享组失败: {e}")
+            return {"error": str(e)}, 500
+
+    def put(self, task_id: int):
+        """加入共享组（{"group": 名称}），group 为空时退出共享"""
+        try:
+            data = request.get_json(silent=True) or {}
+            success, error = corpus_sync.set_group(task_id, data.get("group"))
+            if not success:
+                code = 404 if error == "任务不存在" else 400
+                return {"error": error}, code
+
+            task = task_manager.get_task(task_id)
+            return {
+                "message": f"已加入共享组 {task.share_group}" if task.share_group else "已退出共享组",
+                "task_id": task_id,
+                "share_group": task.share_group
+            }, 200
+
+        except Exception as e:
+            current_app.logger.error(f"设置共享组失败: {e}")
+            return {"error": str(e)}, 500
@@ -1,7 +1,8 @@
 import os
 import shutil
+import tarfile
 import tempfile
-import asyncio
+import zipfile
 from datetime import datetime
 from typing import List
 from werkzeug.utils import secure_filename
@@ -19,7 +20,9 @@ from models import (
     TaskStatus,
     InputType
 )
-from services import task_manager, compilation_service, seed_service
+from services import task_manager, compilation_service, seed_service, build_queue
+from services.compilation import BUILD_MODES, INSTRUMENTATION_MODES
+from services.uploads import save_stream
 
 
 api = Namespace("upload", description="文件上传和任务创建")
@@ -44,8 +47,8 @@ def save_upload_file(file, target_dir: str) -> str:
     # 构建完整路径
     filepath = os.path.join(target_dir, filename)
 
-    # 保存文件
-    file.save(filepath)
+    # 保存文件（接收时已写入磁盘的临时文件直接硬链接）
+    save_stream(file.stream, filepath)
 
     return filepath
 
@@ -55,7 +58,11 @@ class WhiteboxUpload(Resource):
     """白盒测试文件上传"""
 
     def post(self):
-        """上传 C/C++ 源代码并创建白盒测试任务"""
+        """上传 C/C++ 源代码并创建白盒测试任务
+
+        源代码提交到编译队列后立即返回，任务处于 compiling 状态；编译进度
+        通过 /api/tasks/:id/build 或 WebSocket 的 subscribe_build 获取。
+        """
 
         try:
             # 检查是否包含文件
@@ -72,6 +79,10 @@ class WhiteboxUpload(Resource):
             compile_args = request.form.get("compileArgs", "").strip()
             fuzz_args = request.form.get("fuzzArgs", "").strip()
             input_type_str = request.form.get("inputType", "stdin").strip()
+            build_mode = request.form.get("buildMode", "").strip() or None
+            instrumentation = request.form.get("instrumentation", "").strip() or None
+            variants_str = request.form.get("variants", "").strip()
+            variants = variants_str.split(",") if variants_str else None
 
             if not task_name:
                 return {"error": "任务名称不能为空"}, 400
@@ -79,75 +90,89 @@ class WhiteboxUpload(Resource):
             if not main_file:
                 return {"error": "请指定主程序文件"}, 400
 
-            # 验证文件类型
-            allowed_extensions = ["c", "cpp", "cc", "cxx", "h", "hpp"]
-            saved_files = []
-
-            for file in files:
-                if file.filename == "":
-                    continue
+            if build_mode and build_mode not in BUILD_MODES:
+                return {"error": f"不支持的编译方式: {build_mode}"}, 400
 
-                if not allowed_file(file.filename, allowed_extensions):
-                    return {"error": f"不支持的文件类型: {file.filename}"}, 400
+            if instrumentation and instrumentation not in INSTRUMENTATION_MODES:
+                return {"error": f"不支持的插桩方式: {instrumentation}"}, 400
 
-                # 保存到临时目录
-                temp_dir = os.path.join(settings.upload_dir, f"temp_{datetime.now().timestamp()}")
-                filepath = save_upload_file(file, temp_dir)
-                saved_files.append(filepath)
-
-            # 检查主文件是否存在
-            main_file_path = None
-            for f in saved_files:
-                if os.path.basename(f) == main_file:
-                    main_file_path = f
-                    break
-
-            if not main_file_path:
-                return {"error": f"未找到主程序文件: {main_file}"}, 400
-
-            # 创建任务
-            input_type = InputType(input_type_str) if input_type_str else InputType.STDIN
+            build_variants, error_msg = compilation_service.parse_variants(variants)
+            if error_msg:
+                return {"error": error_msg}, 400
 
-            task = task_manager.create_task(
-                name=task_name,
-                task_type=TaskType.WHITEBOX,
-                input_type=input_type,
-                compile_args=compile_args,
-                fuzz_args=fuzz_args,
-                source_files=saved_files,
-                elf_file=None
-            )
-
-            # 编译源代码
-            task_manager.update_task_status(task.id, TaskStatus.COMPILING, error_message="Compiling")
-
-            import asyncio
-            loop = asyncio.new_event_loop()
-            success, error_msg = loop.run_until_complete(compilation_service.compile_source(
-                task, saved_files, main_file, compile_args
-            ))
-            loop.close()
-
-            if not success:
-                task_manager.update_task_status(task.id, TaskStatus.FAILED, error_msg)
-                return {"error": f"编译失败: {error_msg}"}, 400
-
-            # 添加默认种子
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(seed_service.add_default_seeds(task.id))
-            loop.close()
+            # 验证文件类型
+            allowed_extensions = ["c", "cpp", "cc", "cxx", "h", "hpp"]
+            saved_files = []
 
-            # 清理临时文件
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            # 同一次上传的文件保存到同一个临时目录，编译结束后删除
+            temp_dir = os.path.join(settings.upload_dir, f"temp_{datetime.now().timestamp()}")
 
-            task_manager.update_task_status(task.id, TaskStatus.READY, error_message=None)
+            submitted = False
+            try:
+                for file in files:
+                    if file.filename == "":
+                        continue
+
+                    if not allowed_file(file.filename, allowed_extensions):
+                        return {"error": f"不支持的文件类型: {file.filename}"}, 400
+
+                    # 保存到临时目录
+                    filepath = save_upload_file(file, temp_dir)
+                    saved_files.append(filepath)
+
+                # 检查主文件是否存在
+                main_file_path = None
+                for f in saved_files:
+                    if os.path.basename(f) == main_file:
+                        main_file_path = f
+                        break
+
+                if not main_file_path:
+                    return {"error": f"未找到主程序文件: {main_file}"}, 400
+
+                # 插桩方式与源代码或编译变体不匹配（如使用 __AFL_LOOP 但 afl-clang-fast 不可用）时不创建任务
+                mode, error_msg = compilation_service.resolve_instrumentation(
+                    instrumentation or settings.default_instrumentation, saved_files
+                )
+                if not error_msg:
+                    error_msg = compilation_service.check_variants(mode, build_variants)
+                if error_msg:
+                    return {"error": error_msg}, 400
+
+                # 创建任务
+                input_type = InputType(input_type_str) if input_type_str else InputType.STDIN
+
+                task = task_manager.create_task(
+                    name=task_name,
+                    task_type=TaskType.WHITEBOX,
+                    input_type=input_type,
+                    compile_args=compile_args,
+                    fuzz_args=fuzz_args,
+                    source_files=saved_files,
+                    elf_file=None
+                )
+
+                # 提交编译，完成后添加默认种子，临时文件由编译队列清理
+                job, error_msg = build_queue.submit(
+                    task, saved_files, main_file, compile_args, cleanup_dir=temp_dir, build_mode=build_mode,
+                    instrumentation=instrumentation, variants=variants
+                )
+                submitted = job is not None
+                if not job:
+                    task_manager.update_task_status(task.id, TaskStatus.FAILED, error_msg)
+                    return {"error": f"编译失败: {error_msg}"}, 400
+            finally:
+                # 未提交编译时（参数错误、异常）删除已保存的文件
+                if not submitted:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
 
             return {
                 "task_id": task.id,
                 "task_name": task.name,
-                "message": "白盒测试任务创建成功"
-            }, 201
+                "status": TaskStatus.COMPILING.value,
+                "queue_position": job["queue_position"],
+                "message": "白盒测试任务已创建，正在编译"
+            }, 202
 
         except Exception as e:
             current_app.logger.error(f"白盒测试任务创建失败: {e}")
@@ -187,9 +212,7 @@ class BlackboxUpload(Resource):
             # 设置可执行权限并验证 ELF 文件有效性
             os.chmod(filepath, 0o755)
 
-            success, error_msg = asyncio.run(
-                compilation_service.validate_binary(filepath)
-            )
+            success, error_msg = compilation_service.validate_binary(filepath)
             if not success:
                 return {"error": f"ELF 文件验证失败: {error_msg}"}, 400
 
@@ -216,10 +239,7 @@ class BlackboxUpload(Resource):
             task.target_binary = target_filepath
 
             # 添加默认种子
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(seed_service.add_default_seeds(task.id))
-            loop.close()
+            seed_service.add_default_seeds(task.id)
 
             # 清理临时目录
             if os.path.exists(temp_dir):
@@ -243,46 +263,50 @@ class SeedsUpload(Resource):
     """种子文件上传"""
 
     def post(self):
-        """上传种子文件"""
+        """上传种子文件
+
+        files 为种子文件列表；archive 为种子压缩包（tar / tar.gz / zip），
+        服务端逐个解压并写入种子存储，适合一次上传大量种子。
+        """
 
         try:
+            files = [file for file in request.files.getlist("files") if file.filename]
+            archive = request.files.get("archive")
+
             # 检查是否包含文件
-            if "files" not in request.files:
+            if not files and not (archive and archive.filename):
                 return {"error": "没有上传文件"}, 400
 
-            files = request.files.getlist("files")
-            if not files or len(files) == 0:
-                return {"error": "没有选择文件"}, 400
-
-            # 获取任务ID（可选）
+            # 获取任务ID和种子集名称（可选）
             task_id_str = request.form.get("taskId", "").strip()
             task_id = int(task_id_str) if task_id_str else None
+            seed_set = request.form.get("seedSet", "").strip() or None
 
-            # 准备文件数据
-            file_data = []
-            for file in files:
-                if file.filename == "":
-                    continue
-                file_data.append((file.filename, file.read()))
-
-            # 如果没有指定任务，创建一个新的种子集
-            if task_id is None:
+            # 如果没有指定任务也没有指定种子集，创建一个新的种子集
+            if task_id is None and not seed_set:
                 task_id = task_manager.create_task_id()
                 # 创建一个占位任务
                 temp_dir = os.path.join(settings.seeds_dir, f"task_{task_id}")
                 os.makedirs(temp_dir, exist_ok=True)
 
-            # 保存种子文件
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            saved_count = loop.run_until_complete(seed_service.save_seeds(task_id, file_data))
-            loop.close()
+            # 文件内容以流的方式写入种子存储，内容重复的文件只保留一份
+            if archive and archive.filename:
+                entries = seed_service.iter_archive(archive.stream)
+            else:
+                entries = ((file.filename, file.stream) for file in files)
+
+            try:
+                result = seed_service.upload_seeds(entries, task_id=task_id, seed_set=seed_set)
+            except (ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+                return {"error": f"种子保存失败: {e}"}, 400
 
             return {
                 "task_id": task_id,
-                "saved_count": saved_count,
-                "message": f"成功上传 {saved_count} 个种子文件"
+                "seed_set": seed_set,
+                "saved_count": result["saved"],
+                "duplicate_count": result["duplicates"],
+                "skipped_count": result["skipped"],
+                "message": f"成功上传 {result['saved']} 个种子文件"
             }, 200
 
         except Exception as e:
@@ -1,15 +1,23 @@
+# Socket.IO 以 eventlet 运行：后台线程（文件监听、编译队列、崩溃分析等）中的
+# 推送需要在 eventlet 事件循环中执行才能保证送达，必须在导入其他模块前 patch
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, Blueprint
 from flask_cors import CORS
 from flask_restx import Api
 from flask_socketio import SocketIO
 from config import settings
-from api import upload_api, tasks_api, results_api
+from api import upload_api, tasks_api, results_api, seeds_api
+from services.uploads import UploadRequest
 
 
 def create_app(config_name=None):
     """创建 Flask 应用"""
 
     app = Flask(__name__)
+    # 上传文件接收时直接写入磁盘，不在内存中缓冲
+    app.request_class = UploadRequest
 
     # 加载配置
     app.config["DEBUG"] = settings.debug
@@ -42,6 +50,7 @@ def create_app(config_name=None):
     api.add_namespace(upload_api)
     api.add_namespace(tasks_api)
     api.add_namespace(results_api)
+    api.add_namespace(seeds_api)
 
     app.register_blueprint(api_bp)
 
@@ -0,0 +1,122 @@
+"""fuzzer_stats 解析基准：单次遍历解析与原来逐字段 re.search 的解析对比
+
+用法: cd backend && python benchmarks/bench_fuzzer_stats.py [次数]
+"""
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.monitoring import parse_fuzzer_stats  # noqa: E402
+
+
+# AFL 2.57b 实际写出的 fuzzer_stats（约 800 字节）
+TYPICAL_STATS = """\
+start_time        : 1700000000
+last_update       : 1700003600
+fuzzer_pid        : 4242
+cycles_done       : 12
+execs_done        : 15234567
+execs_per_sec     : 4231.55
+paths_total       : 873
+paths_favored     : 112
+paths_found       : 870
+paths_imported    : 0
+max_depth         : 14
+cur_path          : 517
+pending_favs      : 0
+pending_total     : 233
+variable_paths    : 0
+stability         : 100.00%
+bitmap_cvg        : 3.21%
+unique_crashes    : 7
+unique_hangs      : 1
+last_path         : 1700003412
+last_crash        : 1700003001
+last_hang         : 1700002100
+execs_since_crash : 1200443
+exec_timeout      : 20
+afl_banner        : target
+afl_version       : 2.57b
+target_mode       : default
+command_line      : afl-fuzz -i seeds -o outputs -M fuzzer0 -m none -t 1000+ -- ./target @@
+"""
+
+# 参数很多的目标程序，command_line 很长
+LONG_STATS = TYPICAL_STATS.replace(
+    "./target @@", "./target " + " ".join(f"--option-{i}=value" for i in range(4500)) + " @@"
+)
+
+
+def old_parse_fuzzer_stats(stats_file: str):
+    """优化前的解析方式（每个字段对整个文件执行一次 re.search）"""
+    stats = {}
+    with open(stats_file, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+
+    patterns = {
+        "run_time": r"run_time\s*:\s*(.+)",
+        "execs_done": r"execs_done\s*:\s*(\d+)",
+        "execs_per_sec": r"execs_per_sec\s*:\s*([\d.]+)",
+        "unique_crashes": r"unique_crashes\s*:\s*(\d+)",
+        "unique_hangs": r"unique_hangs\s*:\s*(\d+)",
+        "saved_crashes": r"saved_crashes\s*:\s*(\d+)",
+        "saved_hangs": r"saved_hangs\s*:\s*(\d+)",
+        "last_path": r"last_path\s*:\s*(.+)",
+        "last_crash": r"last_crash\s*:\s*(.+)",
+        "last_hang": r"last_hang\s*:\s*(.+)",
+        "paths_favored": r"paths_favored\s*:\s*(\d+)",
+        "paths_found": r"paths_found\s*:\s*(\d+)",
+        "paths_imported": r"paths_imported\s*:\s*(\d+)",
+        "max_depth": r"max_depth\s*:\s*(\d+)",
+        "cur_path": r"cur_path\s*:\s*(\d+)",
+        "map_size": r"map_size\s*:\s*(\d+)",
+        "map_density": r"map_density\s*:\s*([\d.]+)",
+        "cycles_done": r"cycles_done\s*:\s*(\d+)",
+        "cycles_wo_finds": r"cycles_wo_finds\s*:\s*(\d+)",
+        "timeout_time": r"timeout_time\s*:\s*(\d+)",
+        "edges_found": r"edges_found\s*:\s*(\d+)",
+        "edges_total": r"edges_total\s*:\s*(\d+)",
+    }
+
+    for key, pattern in patterns.items():
+        match = re.search(pattern, content)
+        if match:
+            value = match.group(1).strip()
+            try:
+                stats[key] = float(value) if "." in value else int(value)
+            except ValueError:
+                stats[key] = value
+    return stats
+
+
+def new_parse_fuzzer_stats(stats_file: str):
+    with open(stats_file, "r", encoding="utf-8", errors="ignore") as f:
+        return parse_fuzzer_stats(f)
+
+
+def bench(name: str, content: str, number: int):
+    with tempfile.NamedTemporaryFile("w", suffix="_fuzzer_stats", delete=False) as f:
+        f.write(content)
+    try:
+        results = {}
+        for label, func in (("old", old_parse_fuzzer_stats), ("new", new_parse_fuzzer_stats)):
+            runs = timeit.repeat(lambda: func(f.name), number=number, repeat=3)
+            results[label] = min(runs) / number * 1e6
+        print(f"{name:<10} {len(content):>8} B  old {results['old']:8.1f} us  "
+              f"new {results['new']:8.1f} us  x{results['old'] / results['new']:.1f}")
+    finally:
+        os.unlink(f.name)
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bench("typical", TYPICAL_STATS, number)
+    bench("long", LONG_STATS, max(1, number // 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""统计接口基准：GET /api/tasks/<id>/stats 和 /api/results/dashboard 的单次请求耗时
+
+同时测量原来每次调用服务方法时创建 asyncio 事件循环的额外开销。
+使用临时数据目录，不会修改开发环境中的任务。
+
+用法: cd backend && python benchmarks/bench_stats_api.py [请求数]
+"""
+import os
+import sys
+import asyncio
+import statistics
+import tempfile
+import timeit
+
+_DATA_DIR = tempfile.mkdtemp(prefix="afl_server_bench_")
+for _name in ("UPLOAD_DIR", "TASKS_DIR", "OUTPUTS_DIR", "CRASHES_DIR", "SEEDS_DIR", "SEED_STORE_DIR",
+              "MINIMIZE_CACHE_DIR", "COVERAGE_DIR", "BUILD_CACHE_DIR"):
+    os.environ[_name] = os.path.join(_DATA_DIR, _name.lower()[:-len("_dir")])
+os.environ["BASE_DIR"] = _DATA_DIR
+os.environ["CRASH_INDEX_PATH"] = os.path.join(_DATA_DIR, "crash_index.db")
+os.environ.setdefault("DEBUG", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from models import TaskType  # noqa: E402
+from services import task_manager  # noqa: E402
+from bench_fuzzer_stats import TYPICAL_STATS  # noqa: E402
+
+
+async def _noop():
+    return None
+
+
+def _event_loop_wrapper():
+    """优化前 REST 处理函数调用服务方法的方式"""
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_noop())
+    finally:
+        loop.close()
+
+
+def _median_us(func, number: int) -> float:
+    runs = timeit.repeat(func, number=number, repeat=3)
+    return statistics.median(runs) / number * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    task = task_manager.create_task("bench", TaskType.BLACKBOX)
+    instance_dir = os.path.join(task.output_dir, "fuzzer0")
+    for name in ("queue", "crashes", "hangs"):
+        os.makedirs(os.path.join(instance_dir, name), exist_ok=True)
+    with open(os.path.join(instance_dir, "fuzzer_stats"), "w") as f:
+        f.write(TYPICAL_STATS)
+
+    client = app.test_client()
+    for url in (f"/api/tasks/{task.id}/stats", "/api/results/dashboard"):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code, response.get_data(as_text=True))
+        print(f"GET {url:<28} {_median_us(lambda: client.get(url), number):8.1f} us")
+
+    print(f"{'new_event_loop + run':<32} {_median_us(_event_loop_wrapper, number):8.1f} us")
+    print(f"{'asyncio.run':<32} {_median_us(lambda: asyncio.run(_noop()), number):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,19 +16,84 @@ class Settings(BaseSettings):
     outputs_dir: str = os.path.join(base_dir, "outputs")
     crashes_dir: str = os.path.join(base_dir, "crashes")
     seeds_dir: str = os.path.join(base_dir, "seeds")
+    seed_store_dir: str = os.path.join(base_dir, "seed_store")  # 内容寻址的种子存储，需与 seeds_dir 位于同一文件系统
+    crash_index_path: str = os.path.join(base_dir, "crash_index.db")
+    minimize_cache_dir: str = os.path.join(base_dir, "minimized")
+    coverage_dir: str = os.path.join(base_dir, "coverage")
+    build_cache_dir: str = os.path.join(base_dir, "build_cache")  # 编译缓存，需与 tasks_dir 位于同一文件系统
 
     # AFL 配置
     # 使用本地 AFL 的路径（通过 afl-setup.sh 安装）
     afl_path: str = "/usr/local/bin/afl-fuzz"
     afl_gcc_path: str = "/usr/local/bin/afl-gcc"
     afl_gxx_path: str = "/usr/local/bin/afl-g++"
+    afl_clang_fast_path: str = "/usr/local/bin/afl-clang-fast"  # llvm_mode，需要 clang / llvm
+    afl_clang_fast_pp_path: str = "/usr/local/bin/afl-clang-fast++"
+    afl_tmin_path: str = "/usr/local/bin/afl-tmin"
+    afl_showmap_path: str = "/usr/local/bin/afl-showmap"
 
     qemu_mode: bool = True
     default_timeout: int = 1000  # ms
+    afl_memory_limit: str = "none"  # afl-fuzz 的 -m 参数（MB 或 none），ASan 变体的实例始终为 none
 
     # 资源限制
-    max_file_size: int = 100 * 1024 * 1024  # 100MB
+    max_file_size: int = 100 * 1024 * 1024  # 100MB，单个上传文件的上限
+    max_archive_size: int = 2 * 1024 * 1024 * 1024  # 种子压缩包的上传上限
+    max_upload_files: int = 10000  # 单个上传请求中的文件数上限，更多文件请使用压缩包
+    max_archive_entries: int = 200000  # 种子压缩包中的文件数上限
+    max_seed_size: int = 1024 * 1024  # 单个种子的上限，与 AFL 的 MAX_FILE 一致
     max_tasks: int = 10
+    scheduler_cores: int = 0  # 可用于 fuzz 的 CPU 核心数，0 表示全部
+    stats_cache_size: int = 4096  # fuzzer_stats 解析结果和目录计数缓存项上限
+
+    # 编译配置
+    build_workers: int = 2  # 同时运行的编译任务数
+    compile_timeout: float = 60.0  # 单次编译的超时，单位秒
+    build_log_size: int = 64 * 1024  # 每个编译任务保留的编译输出字符数
+    default_instrumentation: str = "auto"  # auto / afl-gcc / afl-clang-fast / afl-clang-fast-persistent
+    build_variants: str = "plain"  # 默认编译的变体（逗号分隔）：plain / asan / ubsan / cmplog，plain 始终编译
+    build_mode: str = "auto"  # single 一次编译所有源文件，objects 分文件并行编译后链接，auto 多个编译单元时使用 objects
+    build_jobs: int = 8  # 分文件编译时每个编译任务同时运行的编译器进程数上限（不超过 CPU 核心数）
+    build_cache_enabled: bool = True  # 相同的源代码、编译器和参数复用之前编译的目标程序
+    build_cache_size: int = 2 * 1024 * 1024 * 1024  # 编译缓存大小上限，超出时淘汰最久未使用的条目
+
+    # 监控配置
+    use_inotify: bool = True  # 使用 inotify 监听输出目录，不可用时自动退化为轮询
+    monitor_interval: float = 2.0  # 进程检查（以及轮询模式下统计刷新）的间隔，单位秒
+    watcher_debounce: float = 0.1  # 合并 inotify 事件的等待时间，单位秒
+    fuzzer_log_size: int = 64 * 1024  # 每个 fuzzer 实例保留的输出字节数，0 表示丢弃输出
+    afl_no_ui: bool = False  # 以 AFL_NO_UI 运行 afl-fuzz，只输出简单的进度信息
+    ws_delta_history: int = 32  # 每个 WebSocket 房间保留的增量条数，客户端落后更多时重新发送快照
+
+    # 时间序列配置（每个实例保留的数据点数）
+    metrics_raw_points: int = 2880  # 原始数据点，AFL 约每 5 秒写入一次，约 4 小时
+    metrics_1m_points: int = 10080  # 1 分钟降采样，7 天
+    metrics_10m_points: int = 8640  # 10 分钟降采样，60 天
+
+    # 崩溃分析配置
+    triage_workers: int = 1  # 同时重放崩溃样本的进程数
+    triage_timeout: float = 10.0  # 单个样本重放超时，单位秒
+    triage_nice: int = 19  # 重放进程的 nice 值，避免抢占 fuzzer
+    triage_stack_depth: int = 5  # 计算栈哈希使用的栈帧数
+    gdb_path: str = "gdb"  # 没有 sanitizer 报告时用于获取调用栈，未安装时跳过
+    minimize_enabled: bool = True  # 自动用 afl-tmin 精简每个崩溃桶的第一个样本
+    minimize_workers: int = 1  # 同时运行的 afl-tmin 进程数
+    minimize_timeout: float = 600.0  # 单个样本精简的总时长上限，单位秒
+    minimize_cache_size: int = 256 * 1024 * 1024  # 精简结果缓存大小上限，超出时淘汰最久未使用的结果
+
+    # 语料精简配置
+    distill_workers: int = 0  # 并行运行 afl-showmap 的进程数，0 表示使用调度器当前空闲的核心数
+    distill_interval: float = 0  # 运行中的任务自动精简语料的间隔，单位秒，0 表示关闭
+    distill_min_queue: int = 500  # 自动精简要求的最少语料数
+    distill_auto_restart: bool = False  # 自动精简完成后用精简语料重新启动任务
+
+    # 覆盖率配置
+    coverage_map_size: int = 65536  # AFL 位图大小（MAP_SIZE），与 afl-showmap 编译时的设置一致
+    coverage_workers: int = 0  # 并行运行 afl-showmap 的进程数，0 表示使用调度器当前空闲的核心数
+    coverage_interval: float = 300.0  # 运行中的任务更新覆盖位图的间隔，单位秒，0 表示只在请求时更新
+
+    # 跨任务语料共享配置
+    corpus_sync_interval: float = 60.0  # 共享组内同步新样本的间隔，单位秒，0 表示关闭
 
     # CORS
     cors_origins: list = ["http://localhost:5173", "http://127.0.0.1:5173", "*"]
@@ -56,6 +121,10 @@ settings = Settings()
 settings.afl_path = check_afl_command(settings.afl_path)
 settings.afl_gcc_path = check_afl_command(settings.afl_gcc_path)
 settings.afl_gxx_path = check_afl_command(settings.afl_gxx_path)
+settings.afl_clang_fast_path = check_afl_command(settings.afl_clang_fast_path)
+settings.afl_clang_fast_pp_path = check_afl_command(settings.afl_clang_fast_pp_path)
+settings.afl_tmin_path = check_afl_command(settings.afl_tmin_path)
+settings.afl_showmap_path = check_afl_command(settings.afl_showmap_path)
 
 # 创建必要的目录
 for dir_path in [
@@ -64,5 +133,8 @@ for dir_path in [
     settings.outputs_dir,
     settings.crashes_dir,
     settings.seeds_dir,
+    settings.minimize_cache_dir,
+    settings.coverage_dir,
+    settings.build_cache_dir,
 ]:
     os.makedirs(dir_path, exist_ok=True)
@@ -11,6 +11,7 @@ class TaskType(str, Enum):
 
 class TaskStatus(str, Enum):
     PENDING = "pending"
+    QUEUED = "queued"
     UPLOADING = "uploading"
     COMPILING = "compiling"
     READY = "ready"
@@ -27,6 +28,21 @@ class InputType(str, Enum):
     ARGS = "args"
 
 
+class InstrumentationMode(str, Enum):
+    AUTO = "auto"  # 按源代码选择：使用 __AFL_LOOP 时为持久模式，使用 __AFL_INIT 时为 afl-clang-fast，否则 afl-gcc
+    AFL_GCC = "afl-gcc"
+    CLANG_FAST = "afl-clang-fast"  # llvm_mode，forkserver 可延迟到 __AFL_INIT
+    PERSISTENT = "afl-clang-fast-persistent"  # llvm_mode 持久模式，源代码中用 __AFL_LOOP 循环处理输入
+    NONE = "none"  # AFL 编译器不可用时以系统编译器编译，没有插桩
+
+
+class BuildVariant(str, Enum):
+    PLAIN = "plain"  # 不带 sanitizer 的目标程序（target）
+    ASAN = "asan"  # AddressSanitizer（target.asan），需要 -m none
+    UBSAN = "ubsan"  # UndefinedBehaviorSanitizer，未定义行为触发 trap（target.ubsan）
+    CMPLOG = "cmplog"  # AFL++ CmpLog 插桩（target.cmplog），以 -c 参数配合 plain 目标程序运行
+
+
 class CreateWhiteboxTaskRequest(BaseModel):
     task_name: str = Field(..., min_length=1, max_length=100, description="任务名称")
     compile_args: str = Field(default="", description="编译参数")
@@ -48,9 +64,13 @@ class Task(BaseModel):
     task_status: TaskStatus = Field(default=TaskStatus.PENDING, description="任务状态")
     input_type: InputType = Field(default=InputType.STDIN, description="输入类型")
     compile_args: Optional[str] = None
+    # 实际使用的插桩方式，编译完成后记录
+    instrumentation: Optional[InstrumentationMode] = None
     fuzz_args: str = ""
     dependencies: Optional[str] = None
     target_binary: Optional[str] = None
+    # 编译变体 -> 目标程序路径（plain 即 target_binary）
+    variants: Dict[str, str] = {}
     source_files: List[str] = []
     elf_file: Optional[str] = None
     seeds_dir: Optional[str] = None
@@ -74,7 +94,19 @@ class Task(BaseModel):
 
     # 进程信息
     pid: Optional[int] = None
+    pids: List[int] = []
     fuzzer_count: int = 1
+    # 每个实例运行的编译变体，fuzzer_variants[i] 对应 fuzzerI
+    fuzzer_variants: List[str] = []
+    # 本轮 fuzz 中已退出的实例 -> 退出原因（返回码和最后几行输出）
+    instance_exits: Dict[str, str] = {}
+
+    # 调度信息
+    cpu_cores: List[int] = []
+    queue_position: Optional[int] = None
+
+    # 语料共享组，同组任务定期互相导入新样本
+    share_group: Optional[str] = None
 
     # 错误信息
     error_message: Optional[str] = None
@@ -112,19 +144,34 @@ class FuzzStats(BaseModel):
     run_time: str
     last_update: datetime
 
+    # 各 fuzzer 实例的统计明细
+    instance_count: int = 0
+    instances: List[Dict[str, Any]] = []
+
 
 class CrashInfo(BaseModel):
     crash_id: str
     task_id: int
     task_name: str
     crash_type: str
-    signal: str
+    signal: Optional[str] = None
     reproducible: bool
     severity: int
     sample_file: str
     stack_trace: Optional[str] = None
     found_at: datetime
 
+    # 崩溃分析结果
+    instance: Optional[str] = None
+    exit_code: Optional[int] = None
+    bucket: Optional[str] = None
+    frames: List[str] = []
+    triage_status: str = Field(default="pending", description="分析状态: pending / done / failed")
+
+    # afl-tmin 精简结果
+    min_status: Optional[str] = Field(default=None, description="精简状态: queued / running / done / diverged / failed / unsupported")
+    min_size: Optional[int] = None
+
 
 class DashboardStats(BaseModel):
     total_tasks: int
@@ -135,6 +182,8 @@ class DashboardStats(BaseModel):
     total_crashes: int
     total_executions: int
     avg_coverage: float
+    # 插桩方式 -> {tasks, running, avg_execs_per_sec}
+    instrumentation: Dict[str, Dict[str, Any]] = {}
 
 
 class StartTaskRequest(BaseModel):
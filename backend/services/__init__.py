@@ -1,11 +1,37 @@
 # 服务模块初始化
+from services.watcher import task_watcher
+from services.fuzzer_logs import fuzzer_logs
 from services.task_manager import task_manager
 from services.monitoring import monitoring_service
+from services.metrics import metrics_store
+from services.seed_store import seed_store
+from services.build_cache import build_cache
 from services.compilation import compilation_service, seed_service
+from services.builder import build_queue
+from services.scheduler import scheduler
+from services.crash_index import crash_index
+from services.triage import crash_triage
+from services.minimizer import crash_minimizer
+from services.distiller import corpus_distiller
+from services.corpus_sync import corpus_sync
+from services.coverage import coverage_service
 
 __all__ = [
     "task_manager",
     "monitoring_service",
+    "metrics_store",
     "compilation_service",
     "seed_service",
+    "build_queue",
+    "seed_store",
+    "build_cache",
+    "scheduler",
+    "task_watcher",
+    "fuzzer_logs",
+    "crash_index",
+    "crash_triage",
+    "crash_minimizer",
+    "corpus_distiller",
+    "corpus_sync",
+    "coverage_service",
 ]
@@ -0,0 +1,78 @@
+import io
+import os
+import time
+import tarfile
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+
+# (压缩包内路径, 本地文件路径)
+ArchiveMember = Tuple[str, str]
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """只写缓冲区 - tarfile/zipfile 写入后由生成器取出已写入的数据"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_tar(members: Iterable[ArchiveMember],
+               trailer: Optional[Callable[[], Dict[str, bytes]]] = None) -> Iterator[bytes]:
+    """以流的方式生成 tar.gz，内存占用与单个文件大小相关
+
+    trailer 在所有文件写入后调用，返回的 {路径: 内容} 追加到压缩包末尾。
+    """
+    buffer = _ChunkBuffer()
+    with tarfile.open(fileobj=buffer, mode="w|gz") as tar:
+        for arcname, path in members:
+            try:
+                tar.add(path, arcname=arcname, recursive=False)
+            except OSError:
+                continue
+            yield buffer.take()
+
+        for arcname, content in (trailer() if trailer else {}).items():
+            info = tarfile.TarInfo(arcname)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(content))
+
+    yield buffer.take()
+
+
+def stream_zip(members: Iterable[ArchiveMember],
+               trailer: Optional[Callable[[], Dict[str, bytes]]] = None) -> Iterator[bytes]:
+    """以流的方式生成 zip（输出不可回写，使用数据描述符记录大小）"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, path in members:
+            if not os.path.isfile(path):
+                continue
+            try:
+                archive.write(path, arcname=arcname)
+            except OSError:
+                continue
+            yield buffer.take()
+
+        for arcname, content in (trailer() if trailer else {}).items():
+            archive.writestr(arcname, content)
+
+    yield buffer.take()
@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+
+# 影响 afl-gcc / afl-clang 插桩结果的环境变量，计入缓存键
+_INSTRUMENTATION_ENV = (
+    "AFL_HARDEN", "AFL_USE_ASAN", "AFL_USE_MSAN", "AFL_USE_UBSAN", "AFL_INST_RATIO",
+    "AFL_DONT_OPTIMIZE", "AFL_CC", "AFL_CXX", "AFL_AS", "AFL_PATH", "AFL_LLVM_LAF_ALL",
+)
+
+
+class BuildCache:
+    """编译缓存 - 按输入内容寻址保存插桩后的目标程序和目标文件
+
+    目标程序的缓存键是以下内容的 sha256：编译器（实际路径和 --version
+    输出）、插桩方式、编译命令（源文件和输出路径换成文件名）、所有上传
+    文件的文件名和内容，以及影响插桩的 AFL_* 环境变量。分文件编译时每个
+    目标文件另按预处理结果寻址，头文件的修改体现在预处理结果中。命中时
+    把缓存的文件硬链接到目标位置（跨文件系统时复制）。缓存总大小超过
+    build_cache_size 时按最近使用时间（条目目录的 mtime）淘汰最久未使用
+    的条目；已经链接出去的文件不受淘汰影响。
+    """
+
+    def __init__(self, root: str):
+        self._lock = threading.Lock()
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # 编译器路径 -> ((mtime, 大小), 版本信息)
+        self._versions: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def key(self, compiler: str, mode: str, command: List[str], source_files: List[str]) -> str:
+        """计算缓存键，command 中的源文件路径和输出路径应已替换为文件名"""
+        digest = hashlib.sha256()
+        for part in (self._compiler_identity(compiler), mode, "\0".join(command)):
+            digest.update(part.encode("utf-8", "replace") + b"\n")
+
+        for path in sorted(source_files, key=os.path.basename):
+            digest.update(os.path.basename(path).encode("utf-8", "replace") + b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            digest.update(b"\n")
+
+        self._update_env(digest)
+        return digest.hexdigest()
+
+    def object_key(self, compiler: str, mode: str, command: List[str], preprocessed: bytes) -> str:
+        """目标文件的缓存键：编译器、插桩方式、编译参数和预处理结果"""
+        digest = hashlib.sha256()
+        for part in (self._compiler_identity(compiler), mode, "\0".join(command)):
+            digest.update(part.encode("utf-8", "replace") + b"\n")
+        digest.update(preprocessed)
+        self._update_env(digest)
+        return digest.hexdigest()
+
+    def fetch(self, key: str, dest: str, name: str = "target") -> bool:
+        """缓存命中时把文件链接到 dest 并更新最近使用时间，未命中返回 False"""
+        if not settings.build_cache_enabled:
+            return False
+
+        entry = self._entry_dir(key)
+        target = os.path.join(entry, name)
+        try:
+            self._link(target, dest)
+            os.utime(entry)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return False
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return True
+
+    def store(self, key: str, binary: str, info: Optional[Dict] = None, name: str = "target"):
+        """保存编译结果（硬链接，不复制），之后按大小上限淘汰旧条目"""
+        if not settings.build_cache_enabled:
+            return
+
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            os.utime(entry)
+            return
+
+        # 先在临时目录中准备好条目再改名，并发编译相同输入时只保留一个
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp_")
+        try:
+            self._link(binary, os.path.join(tmp, name))
+            with open(os.path.join(tmp, "info.json"), "w") as f:
+                json.dump(dict(info or {}, key=key, created_at=datetime.now().isoformat()), f, indent=2)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._stats["stores"] += 1
+        self.evict()
+
+    def evict(self, limit: Optional[int] = None) -> int:
+        """淘汰最久未使用的条目，直到总大小不超过 limit（默认 build_cache_size），返回淘汰数"""
+        limit = settings.build_cache_size if limit is None else limit
+        entries, total = self._entries()
+        evicted = 0
+        for mtime, size, entry in sorted(entries):
+            if total <= limit:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._stats["evictions"] += evicted
+        return evicted
+
+    def get_stats(self) -> Dict:
+        """缓存条目数、总大小和自服务启动以来的命中统计"""
+        entries, total = self._entries()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "enabled": settings.build_cache_enabled,
+            "entries": len(entries),
+            "bytes": total,
+            "limit": settings.build_cache_size,
+            "hit_rate": round(stats["hits"] / lookups * 100, 2) if lookups else 0.0,
+        })
+        return stats
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        return self.evict(limit=-1)
+
+    def _entries(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """所有条目的 (最近使用时间, 大小, 目录) 和总大小"""
+        entries, total = [], 0
+        for name in os.listdir(self.root):
+            if name.startswith("."):
+                continue
+            entry = os.path.join(self.root, name)
+            try:
+                mtime = os.stat(entry).st_mtime
+                size = sum(
+                    os.path.getsize(os.path.join(entry, filename))
+                    for filename in os.listdir(entry) if filename != "info.json"
+                )
+            except OSError:
+                continue
+            entries.append((mtime, size, entry))
+            total += size
+        return entries, total
+
+    def _compiler_identity(self, compiler: str) -> str:
+        """编译器的实际路径和版本信息，按 (mtime, 大小) 缓存"""
+        path = shutil.which(compiler) or compiler
+        path = os.path.realpath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return path
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        cached = self._versions.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        try:
+            result = subprocess.run(
+                [compiler, "--version"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                timeout=10
+            )
+            version = result.stdout
+        except (OSError, subprocess.TimeoutExpired):
+            version = ""
+
+        identity = f"{path}\n{version}"
+        self._versions[path] = (stamp, identity)
+        return identity
+
+    def temp_dir(self, prefix: str = "build_") -> str:
+        """在缓存目录下创建临时目录（与条目位于同一文件系统，编译结果可以硬链接入库）"""
+        return tempfile.mkdtemp(dir=self.root, prefix=f".{prefix}")
+
+    def _update_env(self, digest):
+        for name in _INSTRUMENTATION_ENV:
+            if name in os.environ:
+                digest.update(f"{name}={os.environ[name]}\n".encode("utf-8", "replace"))
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _link(self, source: str, dest: str):
+        """硬链接，dest 已存在时替换；无法硬链接（跨文件系统）时复制"""
+        tmp = f"{dest}.tmp"
+        try:
+            os.link(source, tmp)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copy2(source, tmp)
+        os.replace(tmp, dest)
+
+
+# 全局实例
+build_cache = BuildCache(settings.build_cache_dir)
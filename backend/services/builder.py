@@ -0,0 +1,277 @@
+import os
+import json
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models import Task, TaskStatus
+from services.task_manager import task_manager
+from services.compilation import compilation_service, seed_service
+
+
+# 编译事件回调 (task_id, 事件类型 status / output, 数据)
+BuildListener = Callable[[int, str, Dict], None]
+
+
+class BuildQueue:
+    """编译队列 - 白盒任务的源代码在有限大小的线程池中异步编译
+
+    上传接口提交编译后立即返回，任务保持 COMPILING 状态直到编译结束。
+    编译器输出逐行通知监听器（WebSocket 推送），并保留最近
+    build_log_size 个字符；排队或编译中的任务可以取消，正在运行的
+    编译进程会被终止。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.build_workers),
+            thread_name_prefix="build"
+        )
+        # task_id -> 最近一次编译
+        self._jobs: Dict[int, Dict] = {}
+        # task_id -> 正在运行的编译进程
+        self._processes: Dict[int, List[subprocess.Popen]] = {}
+        self._listeners: List[BuildListener] = []
+        self._recover_interrupted()
+
+    def add_listener(self, listener: BuildListener):
+        """注册编译事件监听器"""
+        self._listeners.append(listener)
+
+    def submit(
+        self,
+        task: Task,
+        source_files: List[str],
+        main_file: str,
+        compile_args: str = "",
+        cleanup_dir: Optional[str] = None,
+        build_mode: Optional[str] = None,
+        instrumentation: Optional[str] = None,
+        variants: Optional[List[str]] = None
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """提交编译，返回 (编译任务, 错误信息)
+
+        编译成功后添加默认种子；无论编译结果如何，结束后删除 cleanup_dir
+        （上传的临时目录）。
+        """
+        with self._lock:
+            current = self._jobs.get(task.id)
+            if current and current["status"] in ("queued", "running"):
+                return None, "任务正在编译"
+
+            job = {
+                "task_id": task.id,
+                "status": "queued",
+                "main_file": main_file,
+                "source_files": [os.path.basename(path) for path in source_files],
+                "compile_args": compile_args,
+                "build_mode": build_mode or settings.build_mode,
+                "instrumentation": instrumentation or settings.default_instrumentation,
+                "variants": [variant.value for variant in compilation_service.parse_variants(variants)[0]],
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "output": "",
+                "truncated": False,
+                "error": None,
+            }
+            self._jobs[task.id] = job
+
+        task_manager.update_task_status(task.id, TaskStatus.COMPILING, error_message=None)
+        self._save_job(job)
+        self._notify_status(job)
+        self._executor.submit(self._run, task.id, source_files, main_file, compile_args, cleanup_dir,
+                              build_mode, instrumentation, variants)
+        return self.get_job(task.id), None
+
+    def get_job(self, task_id: int) -> Optional[Dict]:
+        """获取任务最近一次编译的状态和输出（服务重启后从文件读取）"""
+        with self._lock:
+            job = self._jobs.get(task_id)
+            if job:
+                return self._with_position(job)
+
+        try:
+            with open(self._job_file(task_id), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list_jobs(self) -> List[Dict]:
+        """排队中和编译中的任务，按提交顺序排列（不含输出）"""
+        with self._lock:
+            jobs = [
+                self._with_position(job) for job in self._jobs.values()
+                if job["status"] in ("queued", "running")
+            ]
+        for job in jobs:
+            job.pop("output")
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def cancel(self, task_id: int) -> bool:
+        """取消排队中或编译中的任务，终止正在运行的编译进程"""
+        with self._lock:
+            job = self._jobs.get(task_id)
+            if not job or job["status"] not in ("queued", "running"):
+                return False
+            queued = job["status"] == "queued"
+            job["status"] = "cancelled"
+            processes = list(self._processes.get(task_id, []))
+
+        # 编译中的任务由工作线程在编译进程退出后结束
+        for process in processes:
+            compilation_service.kill_compiler(process)
+
+        # 排队中的编译由工作线程开始时跳过，这里直接结束
+        if queued:
+            self._finish(job, "cancelled", "编译已取消")
+        return True
+
+    def _run(self, task_id: int, source_files: List[str], main_file: str, compile_args: str,
+             cleanup_dir: Optional[str], build_mode: Optional[str], instrumentation: Optional[str],
+             variants: Optional[List[str]]):
+        """执行编译，结束（包括失败、取消和排队中被取消）后删除上传的临时目录"""
+        try:
+            self._build(task_id, source_files, main_file, compile_args, build_mode, instrumentation, variants)
+        finally:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _build(self, task_id: int, source_files: List[str], main_file: str, compile_args: str,
+               build_mode: Optional[str], instrumentation: Optional[str], variants: Optional[List[str]]):
+        with self._lock:
+            job = self._jobs.get(task_id)
+            if not job or job["status"] != "queued":
+                return
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            self._processes[task_id] = []
+
+        self._save_job(job)
+        self._notify_status(job)
+
+        try:
+            task = task_manager.get_task(task_id)
+            if not task:
+                self._finish(job, "cancelled", "任务不存在")
+                return
+
+            success, error = compilation_service.compile_source(
+                task, source_files, main_file, compile_args,
+                on_output=lambda line: self._append_output(job, line),
+                on_process=lambda process: self._register(task_id, job, process),
+                build_mode=build_mode,
+                instrumentation=instrumentation,
+                variants=variants
+            )
+
+            if job["status"] == "cancelled":
+                self._finish(job, "cancelled", "编译已取消")
+            elif not success:
+                self._finish(job, "failed", error)
+            else:
+                # 添加默认种子
+                seed_service.add_default_seeds(task_id)
+                self._finish(job, "done", None)
+
+        except Exception as e:
+            print(f"编译失败 task_{task_id}: {e}")
+            self._finish(job, "failed", str(e))
+        finally:
+            with self._lock:
+                self._processes.pop(task_id, None)
+
+    def _register(self, task_id: int, job: Dict, process: subprocess.Popen):
+        """记录编译进程；已取消时立即终止"""
+        with self._lock:
+            self._processes.setdefault(task_id, []).append(process)
+            cancelled = job["status"] == "cancelled"
+        if cancelled:
+            compilation_service.kill_compiler(process)
+
+    def _append_output(self, job: Dict, line: str):
+        with self._lock:
+            output = job["output"] + line
+            if len(output) > settings.build_log_size:
+                output = output[-settings.build_log_size:]
+                job["truncated"] = True
+            job["output"] = output
+
+        self._notify(job["task_id"], "output", {"data": line})
+
+    def _finish(self, job: Dict, status: str, error: Optional[str]):
+        """记录编译结果并更新任务状态，任务已删除时只更新记录"""
+        with self._lock:
+            if job["finished_at"]:
+                return
+            job["status"] = status
+            job["error"] = error
+            job["finished_at"] = datetime.now().isoformat()
+
+        if task_manager.get_task(job["task_id"]):
+            if status == "done":
+                task_manager.update_task_status(job["task_id"], TaskStatus.READY, error_message=None)
+            else:
+                task_manager.update_task_status(job["task_id"], TaskStatus.FAILED, error)
+            self._save_job(job)
+        self._notify_status(job)
+
+    def _recover_interrupted(self):
+        """服务重启前未完成的编译标记为失败"""
+        for task in task_manager.get_all_tasks():
+            if task.task_status != TaskStatus.COMPILING:
+                continue
+            task_manager.update_task_status(task.id, TaskStatus.FAILED, "服务重启，编译中断")
+            try:
+                with open(self._job_file(task.id), "r") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            job["status"] = "failed"
+            job["error"] = "服务重启，编译中断"
+            self._save_job(job)
+
+    def _with_position(self, job: Dict) -> Dict:
+        """复制编译任务，排队中的附带队列位置（从 1 开始）"""
+        result = dict(job)
+        result["queue_position"] = None
+        if job["status"] == "queued":
+            result["queue_position"] = 1 + sum(
+                1 for other in self._jobs.values()
+                if other["status"] == "queued" and other["created_at"] < job["created_at"]
+            )
+        return result
+
+    def _notify_status(self, job: Dict):
+        status = self.get_job(job["task_id"]) or dict(job)
+        status.pop("output", None)
+        self._notify(job["task_id"], "status", status)
+
+    def _notify(self, task_id: int, kind: str, data: Dict):
+        for listener in list(self._listeners):
+            try:
+                listener(task_id, kind, data)
+            except Exception as e:
+                print(f"编译事件监听器执行失败: {e}")
+
+    def _save_job(self, job: Dict):
+        path = self._job_file(job["task_id"])
+        if not os.path.isdir(os.path.dirname(path)):
+            return
+        try:
+            with open(path, "w") as f:
+                json.dump(job, f, indent=2)
+        except OSError as e:
+            print(f"保存编译记录失败: {e}")
+
+    def _job_file(self, task_id: int) -> str:
+        return os.path.join(settings.tasks_dir, f"task_{task_id}", "build.json")
+
+
+# 全局实例
+build_queue = BuildQueue()
@@ -1,11 +1,62 @@
 import os
+import re
+import bz2
+import signal
+import gzip
+import lzma
 import subprocess
 import shutil
-from typing import List, Optional
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
 from config import settings
-from models import Task, TaskType, InputType, TaskStatus
+from models import Task, TaskType, InputType, TaskStatus, InstrumentationMode, BuildVariant
+from services.build_cache import build_cache
+from services.seed_store import seed_store
+from services.uploads import HashingFile
+
+
+# 种子内容：bytes 或可读取的文件流
+SeedContent = Union[bytes, IO[bytes], None]
+
+# 编译方式：single 一次编译所有源文件，objects 分文件并行编译后链接，auto 按编译单元数选择
+BUILD_MODES = ("auto", "single", "objects")
+
+# 编译单元的扩展名，头文件只通过 #include 参与编译
+_UNIT_EXTENSIONS = (".c", ".cpp", ".cc", ".cxx")
+
+# 可选的插桩方式（none 只在 AFL 编译器不可用时使用）
+INSTRUMENTATION_MODES = tuple(mode.value for mode in InstrumentationMode if mode != InstrumentationMode.NONE)
+
+# 编译变体的附加编译参数和编译环境变量
+# UBSan 使用 trap 结束进程，afl-fuzz 按信号识别崩溃，不依赖 UBSAN_OPTIONS
+_VARIANT_FLAGS = {
+    BuildVariant.PLAIN: [],
+    BuildVariant.ASAN: ["-fsanitize=address"],
+    BuildVariant.UBSAN: ["-fsanitize=undefined", "-fsanitize-undefined-trap-on-error"],
+    BuildVariant.CMPLOG: [],
+}
+_VARIANT_ENV = {
+    BuildVariant.CMPLOG: {"AFL_LLVM_CMPLOG": "1"},
+}
+
+# afl-fuzz 用法说明中的 -c 选项（AFL++ 的 CmpLog 目标程序），AFL 2.57b 没有该选项
+_CMPLOG_OPTION = re.compile(rb"^\s*-c\s", re.MULTILINE)
+
+# 需要 afl-clang-fast 的源代码标记：持久模式循环和延迟 forkserver
+_PERSISTENT_MARKER = b"__AFL_LOOP"
+_DEFERRED_MARKER = b"__AFL_INIT"
+
+# 只在链接时使用的参数
+_LINK_FLAG_PREFIXES = ("-l", "-L", "-Wl,")
+
+# 编译输出回调（逐行）和编译进程启动回调（用于取消编译）
+OutputCallback = Callable[[str], None]
+ProcessCallback = Callable[[subprocess.Popen], None]
 
 
 class CompilationService:
@@ -14,6 +65,8 @@ class CompilationService:
     def __init__(self):
         # 检查 AFL 编译器是否可用
         self._check_afl_compilers()
+        # CmpLog 的编译（AFL_LLVM_CMPLOG）和运行（afl-fuzz -c）都需要 AFL++
+        self.cmplog_supported = self._probe_cmplog()
 
     def _check_afl_compilers(self):
         """检查 AFL 编译器是否可用"""
@@ -21,83 +74,413 @@ class CompilationService:
             if not os.path.exists(compiler):
                 print(f"警告: {compiler} 不存在，将尝试使用系统默认编译器")
 
-    async def compile_source(
+    def _probe_cmplog(self) -> bool:
+        """检查 afl-fuzz 的用法说明中是否有 -c 选项（即是否为 AFL++）"""
+        try:
+            result = subprocess.run(
+                [settings.afl_path, "-h"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                timeout=10
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return bool(_CMPLOG_OPTION.search(result.stdout))
+
+    def compile_source(
         self,
         task: Task,
         source_files: List[str],
         main_file: str,
-        compile_args: str = ""
+        compile_args: str = "",
+        on_output: Optional[OutputCallback] = None,
+        on_process: Optional[ProcessCallback] = None,
+        build_mode: Optional[str] = None,
+        instrumentation: Optional[str] = None,
+        variants: Optional[List[str]] = None
     ) -> tuple[bool, Optional[str]]:
-        """编译源代码生成可执行文件"""
+        """编译源代码生成可执行文件
 
-        # 确定使用的编译器
-        is_cpp = any(f.endswith((".cpp", ".cc", ".cxx")) for f in source_files)
-        compiler = settings.afl_gxx_path if is_cpp else settings.afl_gcc_path
+        编译器的输出逐行传给 on_output；on_process 在编译进程启动后调用，
+        调用方可以据此终止编译。相同的源代码、编译器和编译参数命中编译
+        缓存时不再编译，直接链接缓存的目标程序。
 
-        # 如果 AFL 编译器不可用，使用系统编译器
-        if not os.path.exists(compiler):
-            compiler = "g++" if is_cpp else "gcc"
+        build_mode 为 single 时所有源文件由一次编译器调用编译；objects 时
+        每个编译单元并行编译为目标文件（按预处理结果缓存）后再链接；auto
+        （默认，见 settings.build_mode）在有多个编译单元时使用 objects。
 
-        # 输出文件路径
-        task_dir = os.path.join(settings.tasks_dir, f"task_{task.id}")
-        output_file = os.path.join(task_dir, "target")
+        instrumentation 为插桩方式（默认见 settings.default_instrumentation），
+        实际使用的方式记录在 task.instrumentation 中。
 
-        # 构建编译命令
-        compile_command = [compiler]
+        variants 为要编译的变体（默认见 settings.build_variants），plain 输出到
+        任务目录的 target，其他变体输出到 target.<变体>，记录在 task.variants 中。
+        """
+        variants, error = self.parse_variants(variants)
+        if error:
+            return False, error
 
-        # 添加编译参数
-        if compile_args:
-            compile_command.extend(compile_args.split())
+        # 确定插桩方式和使用的编译器
+        is_cpp = any(f.endswith((".cpp", ".cc", ".cxx")) for f in source_files)
+        mode, error = self.resolve_instrumentation(
+            instrumentation or settings.default_instrumentation, source_files
+        )
+        if error:
+            return False, error
+        error = self.check_variants(mode, variants)
+        if error:
+            return False, error
+
+        if mode == InstrumentationMode.AFL_GCC:
+            compiler = settings.afl_gxx_path if is_cpp else settings.afl_gcc_path
+            # 如果 AFL 编译器不可用，使用系统编译器
+            if not os.path.exists(compiler):
+                compiler = "g++" if is_cpp else "gcc"
+                mode = InstrumentationMode.NONE
+        else:
+            compiler = settings.afl_clang_fast_pp_path if is_cpp else settings.afl_clang_fast_path
+
+        # 输出文件路径
+        task_dir = os.path.join(settings.tasks_dir, f"task_{task.id}")
 
-        # 添加基础编译参数
-        compile_command.extend([
-            "-g",  # 生成调试信息
-            "-O2",  # 优化级别
-            "-o", output_file
-        ])
+        # 编译单元（头文件只通过 #include 参与编译）
+        units = [f for f in source_files if f.endswith(_UNIT_EXTENSIONS)]
+        build_mode = build_mode or settings.build_mode
+        if build_mode not in BUILD_MODES:
+            return False, f"不支持的编译方式: {build_mode}"
+        if build_mode == "auto":
+            build_mode = "objects" if len(units) > 1 else "single"
 
-        # 添加源文件
-        compile_command.extend(source_files)
+        # 编译参数和基础编译参数（-g 生成调试信息，-O2 优化级别）
+        flags = compile_args.split() if compile_args else []
+        flags.extend(["-g", "-O2"])
 
         # 添加 AFL 标志（如果使用 AFL 编译器）
-        if os.path.exists(compiler):
-            compile_command.append("-fno-omit-frame-pointer")
+        if mode != InstrumentationMode.NONE:
+            flags.append("-fno-omit-frame-pointer")
+        if on_output:
+            on_output(f"插桩方式: {mode.value}\n")
 
         try:
-            # 执行编译
-            process = subprocess.Popen(
-                compile_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
-            stdout, stderr = process.communicate(timeout=60)
-
-            if process.returncode != 0:
-                error_msg = stderr or stdout or "编译失败"
-                return False, error_msg
-
-            # 检查输出文件是否生成
-            if not os.path.exists(output_file):
-                return False, "编译成功但未找到输出文件"
-
-            # 设置可执行权限
-            os.chmod(output_file, 0o755)
+            binaries = {}
+            for variant in variants:
+                output_file = os.path.join(
+                    task_dir, "target" if variant == BuildVariant.PLAIN else f"target.{variant.value}"
+                )
+                if on_output and len(variants) > 1:
+                    on_output(f"编译变体 {variant.value}\n")
+                success, error = self._build_variant(
+                    compiler, mode, variant, build_mode, flags + _VARIANT_FLAGS[variant],
+                    source_files, units, output_file, main_file, compile_args, on_output, on_process
+                )
+                if not success:
+                    if len(variants) > 1:
+                        error = f"变体 {variant.value}: {error}"
+                    return False, error
+                binaries[variant.value] = output_file
 
             # 更新任务信息
-            task.target_binary = output_file
+            task.target_binary = binaries[BuildVariant.PLAIN.value]
+            task.variants = binaries
+            task.instrumentation = mode
             task.task_status = TaskStatus.READY
 
             return True, None
 
-        except subprocess.TimeoutExpired:
-            process.kill()
-            return False, "编译超时"
         except Exception as e:
             return False, str(e)
 
-    async def validate_binary(self, binary_path: str) -> tuple[bool, Optional[str]]:
+    def _build_variant(
+        self,
+        compiler: str,
+        mode: InstrumentationMode,
+        variant: BuildVariant,
+        build_mode: str,
+        flags: List[str],
+        source_files: List[str],
+        units: List[str],
+        output_file: str,
+        main_file: str,
+        compile_args: str,
+        on_output: Optional[OutputCallback],
+        on_process: Optional[ProcessCallback]
+    ) -> Tuple[bool, Optional[str]]:
+        """编译一个变体的目标程序，命中编译缓存时直接链接缓存的文件"""
+        env = dict(os.environ, **_VARIANT_ENV[variant]) if variant in _VARIANT_ENV else None
+
+        # 构建编译命令，链接参数（-l / -L / -Wl,）放在源文件之后
+        compile_flags = [flag for flag in flags if not flag.startswith(_LINK_FLAG_PREFIXES)]
+        link_flags = [flag for flag in flags if flag.startswith(_LINK_FLAG_PREFIXES)]
+        compile_command = [compiler, *compile_flags, "-o", output_file, *source_files, *link_flags]
+
+        # 缓存键中的路径只保留文件名，上传的临时目录每次不同
+        cache_key = build_cache.key(
+            compiler,
+            f"{mode.value}/{variant.value}/{build_mode}",
+            [os.path.basename(part) if part == output_file or part in source_files else part
+             for part in compile_command],
+            source_files
+        )
+        if build_cache.fetch(cache_key, output_file):
+            if on_output:
+                on_output(f"使用编译缓存 {cache_key[:16]}\n")
+            return True, None
+
+        # 目标程序可能是缓存条目的硬链接，先删除，避免编译时覆盖缓存内容
+        if os.path.exists(output_file):
+            os.unlink(output_file)
+
+        # 执行编译
+        if build_mode == "objects":
+            success, error = self._build_objects(
+                compiler, f"{mode.value}/{variant.value}", compile_flags, link_flags, units, output_file,
+                on_output, on_process, env
+            )
+            if not success:
+                return False, error
+        else:
+            returncode, output = self._run_compiler(compile_command, on_output, on_process, env)
+            if returncode is None:
+                return False, "编译超时"
+            if returncode != 0:
+                return False, output or "编译失败"
+
+        # 检查输出文件是否生成
+        if not os.path.exists(output_file):
+            return False, "编译成功但未找到输出文件"
+
+        # 设置可执行权限
+        os.chmod(output_file, 0o755)
+        build_cache.store(cache_key, output_file, {
+            "compiler": compiler,
+            "build_mode": build_mode,
+            "instrumentation": mode.value,
+            "variant": variant.value,
+            "main_file": main_file,
+            "source_files": [os.path.basename(path) for path in source_files],
+            "compile_args": compile_args,
+        })
+        return True, None
+
+    def parse_variants(self, variants: Optional[List[str]]) -> Tuple[List[BuildVariant], Optional[str]]:
+        """解析编译变体（默认见 settings.build_variants），plain 始终编译且排在最前"""
+        if variants is None:
+            variants = settings.build_variants.split(",")
+
+        result = [BuildVariant.PLAIN]
+        for name in variants:
+            name = name.strip()
+            if not name:
+                continue
+            try:
+                variant = BuildVariant(name)
+            except ValueError:
+                return [], f"不支持的编译变体: {name}"
+            if variant not in result:
+                result.append(variant)
+        return result, None
+
+    def check_variants(self, mode: InstrumentationMode, variants: List[BuildVariant]) -> Optional[str]:
+        """CmpLog 插桩由 AFL++ 的 afl-clang-fast 提供，运行时需要 AFL++ 的 afl-fuzz -c"""
+        if BuildVariant.CMPLOG not in variants:
+            return None
+        if not self.cmplog_supported:
+            return f"cmplog 变体需要 AFL++，{settings.afl_path} 不支持 -c 选项"
+        if mode not in (InstrumentationMode.CLANG_FAST, InstrumentationMode.PERSISTENT):
+            return "cmplog 变体需要使用 afl-clang-fast 插桩"
+        return None
+
+    def resolve_instrumentation(
+        self, requested: str, source_files: List[str]
+    ) -> Tuple[Optional[InstrumentationMode], Optional[str]]:
+        """确定插桩方式，返回 (插桩方式, 错误信息)
+
+        auto 按源代码选择：出现 __AFL_LOOP 时使用持久模式，出现 __AFL_INIT
+        时使用 afl-clang-fast，否则使用 afl-gcc。这两个宏只有 afl-clang-fast
+        支持，afl-clang-fast 不可用或显式指定 afl-gcc 时报错。
+        """
+        if requested not in INSTRUMENTATION_MODES:
+            return None, f"不支持的插桩方式: {requested}"
+
+        persistent, deferred = self.detect_afl_markers(source_files)
+        mode = InstrumentationMode(requested)
+        if mode == InstrumentationMode.AUTO:
+            if persistent:
+                mode = InstrumentationMode.PERSISTENT
+            elif deferred:
+                mode = InstrumentationMode.CLANG_FAST
+            else:
+                mode = InstrumentationMode.AFL_GCC
+
+        if mode == InstrumentationMode.AFL_GCC:
+            if persistent or deferred:
+                return None, "源代码使用了 __AFL_LOOP / __AFL_INIT，需要使用 afl-clang-fast 编译"
+            return mode, None
+
+        if mode == InstrumentationMode.PERSISTENT and not persistent:
+            return None, "持久模式需要在源代码中使用 __AFL_LOOP 循环处理输入"
+
+        is_cpp = any(f.endswith((".cpp", ".cc", ".cxx")) for f in source_files)
+        compiler = settings.afl_clang_fast_pp_path if is_cpp else settings.afl_clang_fast_path
+        if not os.path.exists(compiler):
+            return None, f"{mode.value} 插桩需要 {compiler}，该编译器不存在"
+        return mode, None
+
+    def detect_afl_markers(self, source_files: List[str]) -> Tuple[bool, bool]:
+        """检查源文件（包括头文件）中是否出现 __AFL_LOOP 和 __AFL_INIT"""
+        persistent = deferred = False
+        for path in source_files:
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            persistent = persistent or _PERSISTENT_MARKER in content
+            deferred = deferred or _DEFERRED_MARKER in content
+        return persistent, deferred
+
+    def _build_objects(
+        self,
+        compiler: str,
+        mode: str,
+        compile_flags: List[str],
+        link_flags: List[str],
+        units: List[str],
+        output_file: str,
+        on_output: Optional[OutputCallback],
+        on_process: Optional[ProcessCallback],
+        env: Optional[Dict[str, str]] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """每个编译单元并行编译为目标文件，再链接为 output_file
+
+        目标文件按预处理结果缓存：预处理输出包含所有 #include 的头文件内容，
+        修改头文件会使包含它的编译单元重新编译，其他编译单元直接复用缓存。
+        链接参数只在链接时使用，放在目标文件之后。
+        """
+        if not units:
+            return False, "没有可编译的源文件"
+
+        jobs = max(1, min(os.cpu_count() or 1, settings.build_jobs, len(units)))
+        failed = threading.Event()
+        build_dir = build_cache.temp_dir()
+
+        def compile_unit(index: int, source: str) -> Tuple[Optional[str], Optional[str]]:
+            """返回 (目标文件路径, 错误信息)"""
+            if failed.is_set():
+                return None, None
+            name = os.path.basename(source)
+            preprocessed = os.path.join(build_dir, f"{index}_{name}.i")
+            obj = os.path.join(build_dir, f"{index}_{name}.o")
+            progress = f"[{index + 1}/{len(units)}]"
+
+            returncode, output = self._run_compiler(
+                [compiler, *compile_flags, "-E", source, "-o", preprocessed], None, on_process, env
+            )
+            if returncode != 0:
+                failed.set()
+                return None, output or f"预处理 {name} 失败"
+
+            # 预处理结果中的行标记带有源文件所在的临时目录，替换后再计算缓存键
+            with open(preprocessed, "rb") as f:
+                content = f.read().replace(os.path.dirname(source).encode(), b"")
+            os.unlink(preprocessed)
+            key = build_cache.object_key(compiler, mode, compile_flags, content)
+
+            if build_cache.fetch(key, obj, name="object.o"):
+                if on_output:
+                    on_output(f"{progress} {name}: 使用缓存的目标文件 {key[:16]}\n")
+                return obj, None
+
+            if on_output:
+                on_output(f"{progress} 编译 {name}\n")
+            returncode, output = self._run_compiler(
+                [compiler, *compile_flags, "-c", source, "-o", obj], on_output, on_process, env
+            )
+            if returncode is None:
+                failed.set()
+                return None, f"编译 {name} 超时"
+            if returncode != 0:
+                failed.set()
+                return None, output or f"编译 {name} 失败"
+
+            build_cache.store(key, obj, {"compiler": compiler, "source": name}, name="object.o")
+            return obj, None
+
+        try:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="build-object") as pool:
+                results = list(pool.map(compile_unit, range(len(units)), units))
+
+            errors = [error for _, error in results if error]
+            if errors:
+                return False, "\n".join(errors)
+            if failed.is_set():
+                return False, "编译失败"
+
+            if on_output:
+                on_output(f"链接 {os.path.basename(output_file)}\n")
+            returncode, output = self._run_compiler(
+                [compiler, *compile_flags, "-o", output_file, *(obj for obj, _ in results), *link_flags],
+                on_output, on_process, env
+            )
+            if returncode is None:
+                return False, "链接超时"
+            if returncode != 0:
+                return False, output or "链接失败"
+            return True, None
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _run_compiler(
+        self,
+        command: List[str],
+        on_output: Optional[OutputCallback] = None,
+        on_process: Optional[ProcessCallback] = None,
+        env: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[int], str]:
+        """运行编译命令，返回 (退出码, 合并的 stdout/stderr)，超时返回 (None, 输出)"""
+        process = subprocess.Popen(
+            command,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            # 编译器驱动会启动 cc1 / as / ld 等子进程，终止时需要结束整个进程组
+            start_new_session=True
+        )
+        if on_process:
+            on_process(process)
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self.kill_compiler(process)
+
+        timer = threading.Timer(settings.compile_timeout, kill)
+        timer.daemon = True
+        timer.start()
+        lines = []
+        try:
+            for line in process.stdout:
+                lines.append(line)
+                if on_output:
+                    on_output(line)
+            process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+
+        return (None if timed_out.is_set() else process.returncode), "".join(lines)
+
+    def kill_compiler(self, process: subprocess.Popen):
+        """强制结束编译进程组"""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def validate_binary(self, binary_path: str) -> tuple[bool, Optional[str]]:
         """验证二进制文件是否有效"""
         if not os.path.exists(binary_path):
             return False, "文件不存在"
@@ -133,51 +516,124 @@ class SeedService:
     def __init__(self):
         pass
 
-    async def save_seeds(
+    def save_seeds(
         self,
         task_id: int,
-        files: List[tuple[str, bytes]],
+        files: Iterable[Tuple[str, SeedContent]],
         replace: bool = False
-    ) -> int:
-        """保存种子文件"""
-        task_seeds_dir = os.path.join(settings.seeds_dir, f"task_{task_id}")
-
-        # 如果替换模式，清空目录
-        if replace and os.path.exists(task_seeds_dir):
-            shutil.rmtree(task_seeds_dir)
-            os.makedirs(task_seeds_dir)
-
-        # 如果目录不存在，创建
-        if not os.path.exists(task_seeds_dir):
-            os.makedirs(task_seeds_dir)
-
-        saved_count = 0
-
-        for filename, content in files:
-            # 验证文件名
-            safe_filename = self._sanitize_filename(filename)
-            if not safe_filename:
-                continue
+    ) -> Tuple[int, int]:
+        """保存种子文件，返回 (新增数, 重复数)
 
-            filepath = os.path.join(task_seeds_dir, safe_filename)
+        内容存入种子存储后硬链接到任务的种子目录，与目录中已有种子内容
+        相同的文件不重复保存。
+        """
+        result = self.upload_seeds(files, task_id=task_id, replace=replace)
+        return result["saved"], result["duplicates"]
 
-            try:
-                with open(filepath, "wb") as f:
-                    f.write(content)
-                saved_count += 1
-            except Exception as e:
-                print(f"保存种子文件失败: {e}")
-                continue
-
-        return saved_count
-
-    async def add_default_seeds(self, task_id: int):
+    def upload_seeds(
+        self,
+        files: Iterable[Tuple[str, SeedContent]],
+        task_id: Optional[int] = None,
+        seed_set: Optional[str] = None,
+        replace: bool = False
+    ) -> Dict[str, int]:
+        """把种子保存到任务的种子目录和/或命名种子集
+
+        files 中的内容可以是 bytes 或文件流，文件流分块写入存储，不整体
+        读入内存。超过 max_seed_size 的文件被跳过（afl-fuzz 会拒绝超过
+        1MB 的初始样本）。返回 saved / duplicates / skipped 计数。
+        """
+        task_seeds_dir = os.path.join(settings.seeds_dir, f"task_{task_id}") if task_id is not None else None
+        # 替换模式先清空目录：清空时会回收只被该目录引用的内容，若在入库之后
+        # 清空，与原有种子相同的新内容会被一并回收
+        if replace and task_seeds_dir and os.path.exists(task_seeds_dir):
+            seed_store.clear_dir(task_seeds_dir)
+
+        entries, skipped = [], 0
+        try:
+            for filename, content in files:
+                if content is None:
+                    skipped += 1
+                    continue
+                try:
+                    if isinstance(content, HashingFile):
+                        # 接收时已落盘并计算哈希，直接链接
+                        digest = seed_store.put_stream(content, settings.max_seed_size)
+                    else:
+                        # 其他来源（压缩包中的文件）最多读取 max_seed_size 字节，
+                        # 先计算哈希，重复的内容不写磁盘
+                        if not isinstance(content, (bytes, bytearray)):
+                            content = content.read(settings.max_seed_size + 1)
+                        if len(content) > settings.max_seed_size:
+                            raise ValueError("文件过大")
+                        digest = seed_store.put(bytes(content))
+                except ValueError:
+                    skipped += 1
+                    continue
+                entries.append((self._sanitize_filename(filename), digest))
+
+            saved = duplicates = 0
+            if seed_set:
+                saved, duplicates = seed_store.save_set(seed_set, entries)
+            if task_seeds_dir:
+                saved, duplicates = seed_store.add_files(task_seeds_dir, entries)
+        finally:
+            # 出错中断或全部重复时，回收没有被任何目录引用的内容
+            seed_store.release((digest for _, digest in entries), pinned=True)
+
+        return {"saved": saved, "duplicates": duplicates, "skipped": skipped}
+
+    def iter_archive(self, stream: IO[bytes]) -> Iterator[Tuple[str, Optional[IO[bytes]]]]:
+        """逐个读取 tar（gz/bz2/xz 压缩）或 zip 压缩包中的文件，返回 (文件名, 内容流)
+
+        tar 以流模式读取；zip 需要随机访问，上传的压缩包已落盘因此可以直接
+        定位。目录结构被展开（afl-fuzz 只读取输入目录的第一层），声明大小
+        超过 max_seed_size 的文件内容为 None。文件数超过 max_archive_entries
+        时抛出 ValueError。
+        """
+        count = 0
+        if zipfile.is_zipfile(stream):
+            stream.seek(0)
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    count += 1
+                    if count > settings.max_archive_entries:
+                        raise ValueError("压缩包中的文件数超过限制")
+                    if info.file_size > settings.max_seed_size:
+                        yield info.filename, None
+                        continue
+                    with archive.open(info) as f:
+                        yield info.filename, f
+            return
+
+        # tarfile 流模式自带的解压在压缩率高时反复复制缓冲区，改用
+        # gzip/bz2/lzma 的文件对象解压，tarfile 只读取未压缩的数据流
+        stream.seek(0)
+        magic = stream.read(6)
+        stream.seek(0)
+        if magic.startswith(b"\x1f\x8b"):
+            stream = gzip.GzipFile(fileobj=stream)
+        elif magic.startswith(b"BZh"):
+            stream = bz2.BZ2File(stream)
+        elif magic == b"\xfd7zXZ\x00":
+            stream = lzma.LZMAFile(stream)
+
+        with tarfile.open(fileobj=stream, mode="r|") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                count += 1
+                if count > settings.max_archive_entries:
+                    raise ValueError("压缩包中的文件数超过限制")
+                if member.size > settings.max_seed_size:
+                    yield member.name, None
+                    continue
+                yield member.name, archive.extractfile(member)
+
+    def add_default_seeds(self, task_id: int):
         """添加默认种子文件"""
-        task_seeds_dir = os.path.join(settings.seeds_dir, f"task_{task_id}")
-
-        if not os.path.exists(task_seeds_dir):
-            os.makedirs(task_seeds_dir)
-
         # 根据输入类型添加不同的默认种子
         default_seeds = {
             "stdin": [
@@ -199,12 +655,11 @@ class SeedService:
         task = task_manager.get_task(task_id)
         input_type = (task.input_type.value if task else "stdin").lower()
 
-        seeds = default_seeds.get(input_type, default_seeds["stdin"])
+        self.save_seeds(task_id, default_seeds.get(input_type, default_seeds["stdin"]))
 
-        for filename, content in seeds:
-            filepath = os.path.join(task_seeds_dir, filename)
-            with open(filepath, "wb") as f:
-                f.write(content)
+    def apply_seed_set(self, task_id: int, name: str, replace: bool = False) -> Tuple[int, int]:
+        """将命名种子集链接到任务的种子目录，返回 (新增数, 重复数)"""
+        return seed_store.apply_set(name, os.path.join(settings.seeds_dir, f"task_{task_id}"), replace)
 
     def _sanitize_filename(self, filename: str) -> str:
         """清理文件名，移除不安全字符"""
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import settings
+from models import Task, TaskType, TaskStatus
+from services.task_manager import task_manager, SHARED_CORPUS_DIR
+from services.watcher import task_watcher
+
+
+# 共享组名称：字母、数字、下划线、点和横线
+_GROUP_NAME = re.compile(r"^[\w.-]{1,64}$")
+
+# AFL 样本文件名中的编号（id:000123,...）
+_CASE_ID = re.compile(r"^id:(\d{6,})")
+
+# 刚创建的样本可能还没写完，等待这么久之后再读取
+_SETTLE_SECONDS = 1.0
+
+
+def _case_id(name: str) -> Optional[int]:
+    match = _CASE_ID.match(name)
+    return int(match.group(1)) if match else None
+
+
+class _Group:
+    """共享组的内容索引和统计"""
+
+    def __init__(self):
+        # sha1 -> (样本路径, 来源任务)
+        self.sources: Dict[bytes, Tuple[str, int]] = {}
+        # sha1 -> 已拥有该内容的任务
+        self.holders: Dict[bytes, Set[int]] = {}
+        # queue 目录 -> (inode, 已处理的最大编号)，目录被移走（重新开始 fuzz）后 inode 变化
+        self.scanned: Dict[str, Tuple[int, int]] = {}
+        # task_id -> 贡献给组内的新样本数 / 分发给该任务的样本数
+        self.exported: Counter = Counter()
+        self.delivered: Counter = Counter()
+        self.rounds = 0
+        self.last_sync: Optional[str] = None
+
+
+class CorpusSync:
+    """跨任务语料共享 - 同一共享组的任务定期互相导入新发现的样本
+
+    每轮同步先扫描组内各任务实例 queue/ 中新增的样本（同步来的副本除外），
+    按 sha1 去重后建立组内索引；再把其他任务的新样本硬链接到每个正在运行
+    的白盒任务的 shared_corpus/queue/ 中，按顺序编号。afl-fuzz 的 -M/-S 同步
+    会像读取其他实例一样读取这个目录，只保留带来新覆盖的样本（保存为
+    id:...,sync:shared_corpus,...），因此导入数即被 AFL 接受的样本数。黑盒
+    任务以 dumb 模式运行、不进行同步，只能向组内提供样本。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[str, _Group] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._last_run = 0.0
+        task_watcher.add_tick_listener(self._check_schedule)
+
+    def members(self, group: str) -> List[Task]:
+        return sorted(
+            (task for task in task_manager.get_all_tasks() if task.share_group == group),
+            key=lambda task: task.id
+        )
+
+    def group_names(self) -> List[str]:
+        return sorted({task.share_group for task in task_manager.get_all_tasks() if task.share_group})
+
+    def set_group(self, task_id: int, group: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """加入（group 为空时退出）共享组，返回 (是否成功, 错误信息)"""
+        group = (group or "").strip() or None
+        if group and not _GROUP_NAME.match(group):
+            return False, "共享组名称只能包含字母、数字、下划线、点和横线"
+        if not task_manager.set_share_group(task_id, group):
+            return False, "任务不存在"
+
+        if group:
+            # 新成员加入后立即同步一次，不等待下一个周期
+            self.trigger()
+        return True, None
+
+    def get_stats(self, group: str) -> Optional[Dict]:
+        """共享组的成员和各成员的贡献、分发、导入样本数"""
+        members = self.members(group)
+        if not members:
+            return None
+
+        state = self._groups.get(group) or _Group()
+        result = []
+        for task in members:
+            result.append({
+                "task_id": task.id,
+                "name": task.name,
+                "status": task.task_status.value,
+                "receives": task.type == TaskType.WHITEBOX,
+                "exported": state.exported[task.id],
+                "delivered": state.delivered[task.id],
+                "imported": self._count_imported(task),
+            })
+
+        return {
+            "group": group,
+            "members": result,
+            "unique_inputs": len(state.sources),
+            "imported": sum(member["imported"] for member in result),
+            "rounds": state.rounds,
+            "last_sync": state.last_sync,
+            "interval": settings.corpus_sync_interval,
+        }
+
+    def trigger(self) -> bool:
+        """在后台线程中同步所有共享组，已有同步在进行时返回 False"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._last_run = time.time()
+            self._thread = threading.Thread(target=self.sync_all, name="corpus-sync", daemon=True)
+            self._thread.start()
+        return True
+
+    def sync_all(self):
+        for group in self.group_names():
+            try:
+                self.sync_group(group)
+            except Exception as e:
+                print(f"语料共享组 {group} 同步失败: {e}")
+
+        # 清理已经没有成员的组
+        active = set(self.group_names())
+        for group in list(self._groups):
+            if group not in active:
+                del self._groups[group]
+
+    def sync_group(self, name: str):
+        """扫描组内各任务的新样本，并分发给其他正在运行的白盒任务"""
+        from services import monitoring_service
+
+        members = self.members(name)
+        group = self._groups.setdefault(name, _Group())
+
+        for task in members:
+            for _, path in monitoring_service.discover_instances(task.output_dir):
+                self._scan(group, task.id, os.path.join(path, "queue"), export=True)
+            # 已分发给该任务的样本（服务重启后据此恢复索引）
+            self._scan(group, task.id, self._shared_queue(task), export=False)
+
+        for task in members:
+            if task.type == TaskType.WHITEBOX and task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED):
+                pending = [digest for digest, holders in group.holders.items() if task.id not in holders]
+                if pending:
+                    group.delivered[task.id] += self._deliver(group, task, pending)
+
+        group.rounds += 1
+        group.last_sync = datetime.now().isoformat()
+
+    def _scan(self, group: _Group, task_id: int, queue_dir: str, export: bool):
+        """按编号增量读取 queue 目录中的新样本并加入组内索引"""
+        try:
+            st = os.stat(queue_dir)
+        except OSError:
+            return
+
+        inode, last = group.scanned.get(queue_dir, (st.st_ino, -1))
+        if inode != st.st_ino:
+            last = -1
+
+        cases = []
+        for name in os.listdir(queue_dir):
+            case = _case_id(name)
+            if case is not None and case > last:
+                cases.append((case, name))
+
+        now = time.time()
+        for case, name in sorted(cases):
+            path = os.path.join(queue_dir, name)
+            try:
+                if now - os.stat(path).st_mtime < _SETTLE_SECONDS:
+                    break
+                # 从其他实例或共享组同步来的副本不是该任务自己的发现
+                if not (export and ",sync:" in name):
+                    with open(path, "rb") as f:
+                        digest = hashlib.sha1(f.read()).digest()
+                    holders = group.holders.get(digest)
+                    if holders is None:
+                        group.sources[digest] = (path, task_id)
+                        group.holders[digest] = {task_id}
+                        if export:
+                            group.exported[task_id] += 1
+                    else:
+                        holders.add(task_id)
+            except OSError:
+                pass
+            last = case
+
+        group.scanned[queue_dir] = (st.st_ino, last)
+
+    def _deliver(self, group: _Group, task: Task, digests: List[bytes]) -> int:
+        """把样本按顺序编号链接到任务的 shared_corpus/queue/，返回分发数量"""
+        queue_dir = self._shared_queue(task)
+        os.makedirs(queue_dir, exist_ok=True)
+
+        # AFL 按编号记录已同步的位置，新文件的编号必须大于已有文件
+        next_case = max((_case_id(name) or 0 for name in os.listdir(queue_dir)), default=-1) + 1
+        delivered = 0
+        for digest in digests:
+            source, origin = group.sources[digest]
+            dest = os.path.join(queue_dir, f"id:{next_case:06d},task:{origin}")
+            # 以 . 开头的临时文件会被 AFL 忽略，链接完成后再改名
+            tmp = os.path.join(queue_dir, f".{next_case:06d}.tmp")
+            try:
+                os.link(source, tmp)
+            except FileNotFoundError:
+                # 来源任务已删除或重新开始，从索引中移除
+                del group.sources[digest]
+                del group.holders[digest]
+                continue
+            except OSError:
+                shutil.copyfile(source, tmp)
+            os.rename(tmp, dest)
+            group.holders[digest].add(task.id)
+            next_case += 1
+            delivered += 1
+
+        # 自己写入的样本不需要再扫描
+        group.scanned[queue_dir] = (os.stat(queue_dir).st_ino, next_case - 1)
+        return delivered
+
+    def _count_imported(self, task: Task) -> int:
+        """统计 AFL 从共享目录中接受的样本数"""
+        from services import monitoring_service
+
+        marker = f",sync:{SHARED_CORPUS_DIR},"
+        count = 0
+        for _, path in monitoring_service.discover_instances(task.output_dir):
+            try:
+                count += sum(1 for name in os.listdir(os.path.join(path, "queue")) if marker in name)
+            except OSError:
+                continue
+        return count
+
+    def _shared_queue(self, task: Task) -> str:
+        return os.path.join(task.output_dir, SHARED_CORPUS_DIR, "queue")
+
+    def _check_schedule(self):
+        """按 corpus_sync_interval 定时同步"""
+        if settings.corpus_sync_interval <= 0:
+            return
+        if time.time() - self._last_run >= settings.corpus_sync_interval and self.group_names():
+            self.trigger()
+
+
+# 全局实例
+corpus_sync = CorpusSync()
@@ -0,0 +1,413 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from models import Task, TaskType, TaskStatus, InputType
+from services.task_manager import task_manager, SHARED_CORPUS_DIR
+from services.watcher import task_watcher
+
+
+# AFL 样本文件名中的编号（id:000123,...）
+_CASE_ID = re.compile(r"^id:(\d{6,})")
+
+# 每个字节中置位的个数，用于统计压缩位图的边数
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(packed: np.ndarray):
+    """压缩位图（最后一维为字节）中置位的个数"""
+    return _POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+
+
+class CoverageMap:
+    """一个任务的语料在某个目标程序下的覆盖位图
+
+    每个输入的边位图（MAP_SIZE 位，np.packbits 压缩为 MAP_SIZE/8 字节）按
+    处理顺序追加到 bitmaps.bin，输入信息追加到 inputs.jsonl。读取时用
+    memmap 映射为 (输入数, 行字节数) 的矩阵，并集 / 交集沿行做 bitwise_or /
+    bitwise_and 归约。new_edges 为输入加入时带来的、之前所有输入都没有覆盖
+    的边数。
+    """
+
+    def __init__(self, directory: str, map_size: int):
+        self.directory = directory
+        self.row_bytes = map_size // 8
+        self.lock = threading.Lock()
+        self._bitmaps_file = os.path.join(directory, "bitmaps.bin")
+        self._inputs_file = os.path.join(directory, "inputs.jsonl")
+        self._state_file = os.path.join(directory, "state.json")
+        os.makedirs(directory, exist_ok=True)
+
+        self.inputs = self._load_inputs()
+        rows = self.rows()
+        self.union = np.bitwise_or.reduce(rows, axis=0) if len(rows) else np.zeros(self.row_bytes, dtype=np.uint8)
+        # queue 目录 -> (inode, 已处理的最大编号)
+        self.scanned: Dict[str, Tuple[int, int]] = {}
+        try:
+            with open(self._state_file, "r") as f:
+                self.scanned = {path: tuple(value) for path, value in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+
+    def rows(self) -> np.ndarray:
+        if not self.inputs:
+            return np.zeros((0, self.row_bytes), dtype=np.uint8)
+        return np.memmap(self._bitmaps_file, dtype=np.uint8, mode="r", shape=(len(self.inputs), self.row_bytes))
+
+    def append(self, traced: List[Tuple[Dict, Optional[np.ndarray]]], scanned: Dict[str, Tuple[int, int]]):
+        """按顺序加入新追踪的输入，追踪失败的输入记录为空位图，不再重试"""
+        with open(self._bitmaps_file, "ab") as bitmaps, open(self._inputs_file, "a") as inputs:
+            for info, row in traced:
+                if row is None:
+                    row = np.zeros(self.row_bytes, dtype=np.uint8)
+                    info["failed"] = True
+                info["edges"] = int(_popcount(row))
+                info["new_edges"] = int(_popcount(row & ~self.union))
+                self.union |= row
+
+                bitmaps.write(row.tobytes())
+                inputs.write(json.dumps(info) + "\n")
+                self.inputs.append(info)
+
+        self.scanned.update(scanned)
+        with open(self._state_file, "w") as f:
+            json.dump(self.scanned, f)
+
+    def intersection(self, chunk: int = 4096) -> np.ndarray:
+        """所有（追踪成功的）输入都覆盖的边，分块归约，不把全部位图读入内存"""
+        rows = self.rows()
+        traced = np.array([not info.get("failed") for info in self.inputs], dtype=bool)
+        if not traced.any():
+            return np.zeros(self.row_bytes, dtype=np.uint8)
+
+        result = np.full(self.row_bytes, 0xFF, dtype=np.uint8)
+        for start in range(0, len(rows), chunk):
+            block = rows[start:start + chunk][traced[start:start + chunk]]
+            if len(block):
+                result &= np.bitwise_and.reduce(block, axis=0)
+        return result
+
+    def _load_inputs(self) -> List[Dict]:
+        """读取输入信息；两个文件长度不一致（写入中断）时截断到一致"""
+        inputs = []
+        try:
+            with open(self._inputs_file, "r") as f:
+                for line in f:
+                    try:
+                        inputs.append(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+
+        try:
+            rows = os.path.getsize(self._bitmaps_file) // self.row_bytes
+        except FileNotFoundError:
+            rows = 0
+
+        count = min(len(inputs), rows)
+        if count != len(inputs) or count != rows:
+            inputs = inputs[:count]
+            with open(self._inputs_file, "w") as f:
+                f.writelines(json.dumps(info) + "\n" for info in inputs)
+            with open(self._bitmaps_file, "ab") as f:
+                f.truncate(count * self.row_bytes)
+        return inputs
+
+
+class CoverageService:
+    """覆盖率服务 - 用 afl-showmap 记录语料中每个输入的边位图
+
+    按编号增量处理各实例 queue/ 中的新输入（从同任务其他实例同步来的副本
+    除外），afl-showmap -b 输出原始位图，非零字节即命中的边。位图按
+    (目标程序, 任务) 保存：每次编译的插桩编号不同，比较共享组内各任务的
+    覆盖时，所有成员的语料都用组内同一个目标程序重新追踪。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (目标程序摘要, task_id) -> 位图
+        self._maps: Dict[Tuple[str, int], CoverageMap] = {}
+        self._binary_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._last_run = 0.0
+        task_watcher.add_tick_listener(self._check_schedule)
+
+    def supports(self, task: Task) -> bool:
+        # afl-showmap 需要插桩才能记录覆盖
+        return task.type == TaskType.WHITEBOX and bool(task.target_binary) and os.path.exists(task.target_binary)
+
+    def get_map(self, task: Task, reference: Optional[Task] = None) -> CoverageMap:
+        """任务语料在 reference（默认为任务自身）的目标程序下的位图"""
+        digest = self._binary_digest((reference or task).target_binary)
+        key = (digest, task.id)
+        with self._lock:
+            cmap = self._maps.get(key)
+            if cmap is None:
+                directory = os.path.join(settings.coverage_dir, digest, f"task_{task.id}")
+                cmap = self._maps[key] = CoverageMap(directory, settings.coverage_map_size)
+        return cmap
+
+    def update(self, task: Task, reference: Optional[Task] = None) -> int:
+        """追踪任务语料中的新输入，返回本次处理的数量"""
+        reference = reference or task
+        cmap = self.get_map(task, reference)
+        with cmap.lock:
+            pending, scanned = self._collect(task, cmap)
+            if not pending:
+                cmap.scanned.update(scanned)
+                return 0
+
+            with tempfile.TemporaryDirectory(prefix="coverage_") as trace_dir:
+                with ThreadPoolExecutor(max_workers=self._workers(), thread_name_prefix="coverage-showmap") as pool:
+                    rows = list(pool.map(
+                        lambda item: self._trace(reference, item[1], os.path.join(trace_dir, str(item[0]))),
+                        enumerate(path for _, path in pending)
+                    ))
+            cmap.append([(info, row) for (info, _), row in zip(pending, rows)], scanned)
+            return len(pending)
+
+    def task_coverage(self, task: Task) -> Optional[Dict]:
+        """任务的边数、交集和各输入的覆盖（不触发追踪）"""
+        if not self.supports(task):
+            return None
+
+        cmap = self.get_map(task)
+        with cmap.lock:
+            edges = int(_popcount(cmap.union))
+            return {
+                "task_id": task.id,
+                "map_size": settings.coverage_map_size,
+                "inputs": len(cmap.inputs),
+                "edges": edges,
+                "edge_coverage": round(edges / settings.coverage_map_size * 100, 2),
+                "intersection_edges": int(_popcount(cmap.intersection())),
+                "items": list(cmap.inputs),
+            }
+
+    def group_coverage(self, group: str) -> Optional[Dict]:
+        """共享组的并集、交集和各成员独有的边数（不触发追踪）"""
+        from services import corpus_sync
+
+        members = [task for task in corpus_sync.members(group) if self.supports(task)]
+        if not members:
+            return None
+
+        reference = members[0]
+        unions = []
+        for task in members:
+            cmap = self.get_map(task, reference)
+            with cmap.lock:
+                unions.append((len(cmap.inputs), cmap.union.copy()))
+        matrix = np.stack([union for _, union in unions])
+
+        # 每条边被多少个成员覆盖
+        hits = np.unpackbits(matrix, axis=1).sum(axis=0)
+        only_one = np.packbits(hits == 1)
+        union = np.bitwise_or.reduce(matrix, axis=0)
+        intersection = np.bitwise_and.reduce(matrix, axis=0)
+
+        return {
+            "group": group,
+            "reference_task_id": reference.id,
+            "map_size": settings.coverage_map_size,
+            "union_edges": int(_popcount(union)),
+            "intersection_edges": int(_popcount(intersection)),
+            "members": [
+                {
+                    "task_id": task.id,
+                    "name": task.name,
+                    "inputs": inputs,
+                    "edges": int(_popcount(row)),
+                    "unique_edges": int(_popcount(row & only_one)),
+                }
+                for task, (inputs, row) in zip(members, unions)
+            ],
+        }
+
+    def trigger(self, task_ids: Optional[List[int]] = None) -> bool:
+        """在后台线程中更新位图（默认为所有运行中的白盒任务和共享组），已在更新时返回 False"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._last_run = time.time()
+            self._thread = threading.Thread(target=self._update_all, args=(task_ids,),
+                                            name="coverage", daemon=True)
+            self._thread.start()
+        return True
+
+    def is_updating(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def evict_task(self, task_id: int):
+        """删除任务时删除它在各目标程序下的位图"""
+        with self._lock:
+            for key in [key for key in self._maps if key[1] == task_id]:
+                del self._maps[key]
+        if os.path.isdir(settings.coverage_dir):
+            for digest in os.listdir(settings.coverage_dir):
+                shutil.rmtree(os.path.join(settings.coverage_dir, digest, f"task_{task_id}"), ignore_errors=True)
+
+    def _update_all(self, task_ids: Optional[List[int]]):
+        from services import corpus_sync
+
+        if task_ids is None:
+            tasks = [task for task in task_manager.get_all_tasks() if task.task_status == TaskStatus.RUNNING]
+        else:
+            tasks = [task_manager.get_task(task_id) for task_id in task_ids]
+
+        groups = set()
+        for task in tasks:
+            if not task or not self.supports(task):
+                continue
+            try:
+                self.update(task)
+            except Exception as e:
+                print(f"更新覆盖位图失败 task_{task.id}: {e}")
+            if task.share_group:
+                groups.add(task.share_group)
+
+        # 共享组成员的语料用组内同一个目标程序追踪
+        for group in groups:
+            members = [task for task in corpus_sync.members(group) if self.supports(task)]
+            for task in members[1:]:
+                try:
+                    self.update(task, members[0])
+                except Exception as e:
+                    print(f"更新共享组覆盖位图失败 task_{task.id}: {e}")
+
+    def _collect(self, task: Task, cmap: CoverageMap) -> Tuple[List[Tuple[Dict, str]], Dict[str, Tuple[int, int]]]:
+        """各实例 queue/ 中尚未处理的输入，返回 ([(输入信息, 路径)], 新的读取位置)
+
+        读取位置在追踪结果写入后才更新，追踪中断时下次重新处理。
+        """
+        from services import monitoring_service
+
+        pending, scanned = [], {}
+        for instance, path in monitoring_service.discover_instances(task.output_dir):
+            queue_dir = os.path.join(path, "queue")
+            try:
+                st = os.stat(queue_dir)
+            except OSError:
+                continue
+
+            inode, last = cmap.scanned.get(queue_dir, (st.st_ino, -1))
+            if inode != st.st_ino:
+                # 重新开始 fuzz 后的新目录
+                last = -1
+
+            cases = []
+            for name in os.listdir(queue_dir):
+                match = _CASE_ID.match(name)
+                if match and int(match.group(1)) > last:
+                    cases.append((int(match.group(1)), name))
+
+            for case, name in sorted(cases):
+                last = case
+                # 同任务其他实例同步来的副本不会带来新的边，共享组导入的样本保留
+                if ",sync:" in name and f",sync:{SHARED_CORPUS_DIR}," not in name:
+                    continue
+                pending.append(({"instance": instance, "filename": name}, os.path.join(queue_dir, name)))
+            scanned[queue_dir] = (st.st_ino, last)
+
+        return pending, scanned
+
+    def _trace(self, reference: Task, filepath: str, output: str) -> Optional[np.ndarray]:
+        """用 afl-showmap -b 记录输入的位图，返回压缩后的边位图"""
+        target, stdin_file = self._target_command(reference, filepath)
+        command = [
+            settings.afl_showmap_path, "-q", "-b",
+            "-m", "none",
+            "-t", str(settings.default_timeout),
+            "-o", output,
+            "--", *target,
+        ]
+
+        stdin = open(stdin_file, "rb") if stdin_file else subprocess.DEVNULL
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=os.path.dirname(output)
+            )
+            try:
+                os.setpriority(os.PRIO_PROCESS, process.pid, settings.triage_nice)
+            except (OSError, AttributeError):
+                pass
+            try:
+                process.wait(timeout=settings.default_timeout / 1000 * 2 + 10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                return None
+        except OSError as e:
+            print(f"无法启动 afl-showmap: {e}")
+            return None
+        finally:
+            if stdin_file:
+                stdin.close()
+
+        # 崩溃和超时的输入同样输出位图，退出码不需要检查
+        try:
+            trace = np.fromfile(output, dtype=np.uint8)
+            os.unlink(output)
+        except OSError:
+            return None
+        if len(trace) != settings.coverage_map_size:
+            return None
+        return np.packbits(trace != 0)
+
+    def _target_command(self, task: Task, filepath: str) -> Tuple[List, Optional[str]]:
+        """按输入类型构建目标程序命令，返回 (命令, 作为 stdin 的文件)"""
+        if task.input_type == InputType.FILE:
+            return [task.target_binary, filepath], None
+        if task.input_type == InputType.ARGS:
+            with open(filepath, "rb") as f:
+                return [task.target_binary, f.read().replace(b"\0", b"")], None
+        return [task.target_binary], filepath
+
+    def _binary_digest(self, path: str) -> str:
+        """目标程序内容的摘要，按 (mtime, size) 缓存"""
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._binary_digests.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self._binary_digests[path] = (stamp, digest.hexdigest()[:16])
+        return self._binary_digests[path][1]
+
+    def _workers(self) -> int:
+        if settings.coverage_workers > 0:
+            return settings.coverage_workers
+
+        from services import scheduler
+        return max(1, len(scheduler.free_cores()))
+
+    def _check_schedule(self):
+        """按 coverage_interval 定时更新运行中任务的位图"""
+        if settings.coverage_interval <= 0:
+            return
+        if time.time() - self._last_run >= settings.coverage_interval:
+            self.trigger()
+
+
+# 全局实例
+coverage_service = CoverageService()
@@ -0,0 +1,379 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from models import Task
+from services.watcher import task_watcher
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crashes (
+    id INTEGER PRIMARY KEY,
+    crash_id TEXT NOT NULL UNIQUE,
+    task_id INTEGER NOT NULL,
+    sample TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    found_at REAL NOT NULL,
+    triage_status TEXT NOT NULL DEFAULT 'pending',
+    signal TEXT,
+    exit_code INTEGER,
+    reproducible INTEGER,
+    crash_type TEXT,
+    severity INTEGER,
+    bucket TEXT,
+    frames TEXT,
+    stack_trace TEXT,
+    triaged_at TEXT,
+    min_status TEXT,
+    min_sample TEXT,
+    min_size INTEGER,
+    UNIQUE (task_id, sample)
+);
+CREATE INDEX IF NOT EXISTS idx_crashes_task_time ON crashes (task_id, found_at);
+CREATE INDEX IF NOT EXISTS idx_crashes_time ON crashes (found_at);
+CREATE INDEX IF NOT EXISTS idx_crashes_signal ON crashes (signal, found_at);
+CREATE INDEX IF NOT EXISTS idx_crashes_bucket ON crashes (bucket, found_at);
+CREATE INDEX IF NOT EXISTS idx_crashes_pending ON crashes (triage_status, task_id);
+CREATE INDEX IF NOT EXISTS idx_crashes_task_bucket ON crashes (task_id, bucket, min_status);
+
+CREATE TABLE IF NOT EXISTS scanned_dirs (
+    task_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (task_id, path)
+);
+"""
+
+# 允许排序的字段
+SORT_FIELDS = ("found_at", "severity", "size", "signal", "crash_type", "task_id")
+
+
+def make_crash_id(task_id: int, instance: str, filename: str) -> str:
+    """由任务、实例和 AFL 样本编号计算稳定的崩溃ID
+
+    AFL 的样本编号（文件名中的 id:NNNNNN）在实例内唯一且不会改变，
+    因此ID不依赖列表顺序，也不受任务数量和崩溃数量的位数限制。
+    """
+    afl_id = filename.split(",", 1)[0]
+    digest = hashlib.sha1(f"{task_id}/{instance}/{afl_id}".encode("utf-8")).hexdigest()
+    return digest[:20]
+
+
+class CrashIndex:
+    """崩溃索引 - 在 SQLite 中记录所有任务的崩溃样本及其分析结果
+
+    新样本由文件监听增量写入；查询前按目录 mtime 校验各实例的 crashes/
+    目录，只有变化的目录才重新列出。列表查询走索引分页，开销与页大小
+    而不是崩溃总数相关。
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        task_watcher.add_listener(self._on_watch_event)
+
+    def _on_watch_event(self, task_id: int, kind: str, paths: List[str]):
+        """新崩溃样本写入索引"""
+        if kind != "crashes" or not paths:
+            return
+
+        from services.task_manager import task_manager
+
+        task = task_manager.get_task(task_id)
+        if task:
+            self.add_files(task, paths)
+
+    def add_files(self, task: Task, paths: List[str]) -> int:
+        """将样本文件加入索引，返回新增数量"""
+        rows = []
+        for path in paths:
+            row = self._file_row(task, path)
+            if row:
+                rows.append(row)
+
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO crashes (crash_id, task_id, sample, instance, filename, size, found_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def _file_row(self, task: Task, path: str) -> Optional[Tuple]:
+        filename = os.path.basename(path)
+        if not filename.startswith("id:"):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        sample = os.path.relpath(path, task.output_dir)
+        instance = os.path.dirname(os.path.dirname(sample)) or "."
+        return (make_crash_id(task.id, instance, filename), task.id, sample, instance, filename,
+                st.st_size, st.st_mtime)
+
+    def sync_task(self, task: Task) -> int:
+        """按目录 mtime 增量同步任务的崩溃目录，返回新增数量"""
+        from services import monitoring_service
+
+        added = 0
+        for _, path in monitoring_service.discover_instances(task.output_dir):
+            crash_dir = os.path.join(path, "crashes")
+            try:
+                mtime_ns = os.stat(crash_dir).st_mtime_ns
+            except OSError:
+                continue
+
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT mtime_ns FROM scanned_dirs WHERE task_id = ? AND path = ?",
+                    (task.id, crash_dir)
+                ).fetchone()
+            if row and row["mtime_ns"] == mtime_ns:
+                continue
+
+            added += self.add_files(task, [os.path.join(crash_dir, name) for name in os.listdir(crash_dir)])
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scanned_dirs (task_id, path, mtime_ns) VALUES (?, ?, ?)",
+                    (task.id, crash_dir, mtime_ns)
+                )
+        return added
+
+    def sync_tasks(self, tasks: List[Task]) -> int:
+        return sum(self.sync_task(task) for task in tasks)
+
+    def get(self, task_id: int, sample: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM crashes WHERE task_id = ? AND sample = ?", (task_id, sample)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_by_id(self, crash_id: str) -> Optional[Dict]:
+        """按崩溃ID查找（唯一索引）"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM crashes WHERE crash_id = ?", (crash_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_many(self, crash_ids: List[str]) -> List[Dict]:
+        """按崩溃ID批量查找，按传入顺序返回存在的记录"""
+        rows = {}
+        for start in range(0, len(crash_ids), 500):
+            batch = crash_ids[start:start + 500]
+            with self._lock:
+                for row in self._conn.execute(
+                    f"SELECT * FROM crashes WHERE crash_id IN ({','.join('?' * len(batch))})", batch
+                ):
+                    rows[row["crash_id"]] = self._to_dict(row)
+        return [rows[crash_id] for crash_id in crash_ids if crash_id in rows]
+
+    def update_triage(self, task_id: int, sample: str, result: Dict, status: str = "done"):
+        """写入样本的分析结果，分析出错时 status 为 failed"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE crashes SET triage_status = ?, signal = ?, exit_code = ?, reproducible = ?, "
+                "crash_type = ?, severity = ?, bucket = ?, frames = ?, stack_trace = ?, triaged_at = ? "
+                "WHERE task_id = ? AND sample = ?",
+                (
+                    status, result["signal"], result["exit_code"], int(result["reproducible"]),
+                    result["crash_type"], result["severity"], result["bucket"],
+                    json.dumps(result["frames"]), result["stack_trace"], result["triaged_at"],
+                    task_id, sample,
+                )
+            )
+
+    def claim_minimization(self, task_id: int, sample: str, bucket: Optional[str]) -> bool:
+        """将样本标记为所在桶的精简代表，桶内已有样本被精简过时返回 False
+
+        bucket 为空时不检查桶（手动请求精简单个样本）。
+        """
+        with self._lock, self._conn:
+            if bucket is None:
+                cursor = self._conn.execute(
+                    "UPDATE crashes SET min_status = 'queued' WHERE task_id = ? AND sample = ? "
+                    "AND (min_status IS NULL OR min_status NOT IN ('queued', 'running'))",
+                    (task_id, sample)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE crashes SET min_status = 'queued' WHERE task_id = ? AND sample = ? "
+                    "AND NOT EXISTS (SELECT 1 FROM crashes WHERE task_id = ? AND bucket = ? "
+                    "AND min_status IS NOT NULL)",
+                    (task_id, sample, task_id, bucket)
+                )
+            return cursor.rowcount > 0
+
+    def update_minimization(self, task_id: int, sample: str, status: str,
+                            min_sample: Optional[str] = None, min_size: Optional[int] = None):
+        """写入样本的精简状态和结果"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE crashes SET min_status = ?, min_sample = ?, min_size = ? WHERE task_id = ? AND sample = ?",
+                (status, min_sample, min_size, task_id, sample)
+            )
+
+    def interrupted_minimizations(self) -> List[Tuple[int, str]]:
+        """获取排队或运行中的精简（服务重启时中断）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, sample FROM crashes WHERE min_status IN ('queued', 'running')"
+            ).fetchall()
+        return [(row["task_id"], row["sample"]) for row in rows]
+
+    def pending_samples(self, task_id: int, limit: int) -> List[str]:
+        """获取尚未分析的样本"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sample FROM crashes WHERE triage_status = 'pending' AND task_id = ? LIMIT ?",
+                (task_id, limit)
+            ).fetchall()
+        return [row["sample"] for row in rows]
+
+    def samples(self, task_id: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT sample FROM crashes WHERE task_id = ?", (task_id,)).fetchall()
+        return [row["sample"] for row in rows]
+
+    def query(
+        self,
+        task_id: Optional[int] = None,
+        signal: Optional[str] = None,
+        bucket: Optional[str] = None,
+        crash_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        sort: str = "found_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 50
+    ) -> Tuple[List[Dict], int]:
+        """分页查询崩溃，返回 (当前页, 总数)"""
+        conditions, params = [], []
+        for column, value in (("task_id", task_id), ("signal", signal),
+                              ("bucket", bucket), ("crash_type", crash_type)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("found_at >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            conditions.append("found_at < ?")
+            params.append(until.timestamp())
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if sort not in SORT_FIELDS:
+            sort = "found_at"
+        order = "DESC" if descending else "ASC"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM crashes {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM crashes {where} ORDER BY {sort} {order}, id {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        return [self._to_dict(row) for row in rows], total
+
+    def iter_rows(self, batch_size: int = 500, **filters) -> Iterator[Dict]:
+        """按发现时间顺序分批遍历满足条件的崩溃，新增的崩溃排在末尾不影响遍历"""
+        offset = 0
+        while True:
+            rows, _ = self.query(descending=False, offset=offset, limit=batch_size, **filters)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            offset += batch_size
+
+    def buckets(self, task_id: Optional[int] = None) -> List[Dict]:
+        """按栈哈希汇总已分析的崩溃"""
+        where, params = "WHERE bucket IS NOT NULL", []
+        if task_id is not None:
+            where += " AND task_id = ?"
+            params.append(task_id)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, bucket, crash_type, signal, MAX(severity) AS severity, frames, "
+                "COUNT(*) AS count, MIN(found_at) AS first_seen, MAX(found_at) AS last_seen, "
+                "MIN(sample) AS sample "
+                f"FROM crashes {where} GROUP BY task_id, bucket "
+                "ORDER BY severity DESC, count DESC",
+                params
+            ).fetchall()
+
+        return [{
+            "task_id": row["task_id"],
+            "bucket": row["bucket"],
+            "crash_type": row["crash_type"],
+            "signal": row["signal"],
+            "severity": row["severity"],
+            "frames": json.loads(row["frames"] or "[]"),
+            "count": row["count"],
+            "first_seen": datetime.fromtimestamp(row["first_seen"]).isoformat(),
+            "last_seen": datetime.fromtimestamp(row["last_seen"]).isoformat(),
+            "sample": row["sample"],
+        } for row in rows]
+
+    def relocate_task(self, task_id: int, prefix: str, entries: List[str]):
+        """任务输出目录下的 entries 移动到 prefix 子目录后更新样本路径
+
+        实例名随路径变化（与 _file_row 的推导一致），崩溃ID也随之重新计算，
+        新一轮 fuzz 从 id:000000 开始的样本不会与之前的冲突。
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, sample, filename, min_sample FROM crashes WHERE task_id = ?", (task_id,)
+            ).fetchall()
+            updates = []
+            for row in rows:
+                if row["sample"].split(os.sep, 1)[0] not in entries:
+                    continue
+                sample = os.path.join(prefix, row["sample"])
+                instance = os.path.dirname(os.path.dirname(sample))
+                updates.append((
+                    make_crash_id(task_id, instance, row["filename"]), sample, instance,
+                    os.path.join(prefix, row["min_sample"]) if row["min_sample"] else None,
+                    row["id"],
+                ))
+            self._conn.executemany(
+                "UPDATE crashes SET crash_id = ?, sample = ?, instance = ?, min_sample = ? WHERE id = ?",
+                updates
+            )
+            self._conn.execute("DELETE FROM scanned_dirs WHERE task_id = ?", (task_id,))
+
+    def delete_task(self, task_id: int):
+        """删除任务的所有索引记录"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM crashes WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM scanned_dirs WHERE task_id = ?", (task_id,))
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict:
+        data = dict(row)
+        data["found_at"] = datetime.fromtimestamp(data["found_at"])
+        data["frames"] = json.loads(data["frames"] or "[]")
+        if data["reproducible"] is not None:
+            data["reproducible"] = bool(data["reproducible"])
+        return data
+
+
+# 全局实例
+crash_index = CrashIndex(settings.crash_index_path)
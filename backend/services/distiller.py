@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import settings
+from models import Task, TaskType, TaskStatus, InputType
+from services.task_manager import task_manager
+from services.watcher import task_watcher
+
+
+# 精简结果保存在 tasks/task_N/distilled/<job_id>/
+DISTILLED_DIR = "distilled"
+
+
+class CorpusDistiller:
+    """语料精简服务 - 从各实例的 queue/ 中挑选保持覆盖不变的最小语料集
+
+    选择算法与 AFL 自带的 afl-cmin 相同：用 afl-showmap -Z 记录每个样本
+    命中的元组（边 + 命中次数分组），每个元组取包含它的最小样本，从最
+    少见的元组开始依次选入，已覆盖的元组跳过。afl-cmin 脚本逐个串行执行
+    afl-showmap，这里改为线程池并行执行，耗时随空闲核心数下降。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # task_id -> 最近一次精简任务
+        self._jobs: Dict[int, Dict] = {}
+        # task_id -> 最近一次精简开始的时间戳，用于定时精简
+        self._last_run: Dict[int, float] = {}
+        task_watcher.add_tick_listener(self._check_schedule)
+
+    def get_job(self, task_id: int) -> Optional[Dict]:
+        """获取任务最近一次精简的状态（服务重启后从文件读取）"""
+        with self._lock:
+            job = self._jobs.get(task_id)
+        if job:
+            return dict(job)
+
+        try:
+            with open(self._job_file(task_id), "r") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job.get("status") in ("queued", "running"):
+            job["status"] = "failed"
+            job["error"] = "服务重启，精简中断"
+        return job
+
+    def submit(self, task_id: int, restart: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+        """提交精简，返回 (精简任务, 错误信息)
+
+        restart 为真时，精简完成后用精简语料作为初始语料重新启动任务。
+        """
+        task = task_manager.get_task(task_id)
+        if not task:
+            return None, "任务不存在"
+        if task.type != TaskType.WHITEBOX or not task.target_binary:
+            # afl-showmap 需要插桩才能记录覆盖，黑盒任务以 dumb 模式运行
+            return None, "只有插桩的白盒任务支持语料精简"
+
+        with self._lock:
+            current = self._jobs.get(task_id)
+            if current and current["status"] in ("queued", "running"):
+                return None, "任务正在精简语料"
+
+            job_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+            job = {
+                "job_id": job_id,
+                "task_id": task_id,
+                "status": "queued",
+                "restart": restart,
+                "applied": False,
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "progress": {"traced": 0, "total": 0},
+                "before": None,
+                "after": None,
+                "tuples": None,
+                "corpus_dir": os.path.join(self._task_dir(task_id), DISTILLED_DIR, job_id),
+                "error": None,
+            }
+            self._jobs[task_id] = job
+            self._last_run[task_id] = time.time()
+
+        self._save_job(job)
+        threading.Thread(target=self._run, args=(task, job), name=f"distill-{task_id}", daemon=True).start()
+        return dict(job), None
+
+    def apply(self, task_id: int) -> Tuple[bool, Optional[str]]:
+        """以最近一次的精简结果作为初始语料开始新一轮 fuzz
+
+        运行中的任务会先停止再重新提交给调度器；未运行的任务只更换语料并
+        恢复为就绪状态。
+        """
+        from services import scheduler
+
+        job = self.get_job(task_id)
+        if not job or job["status"] != "done" or not os.path.isdir(job["corpus_dir"]):
+            return False, "没有可用的精简结果"
+
+        task = task_manager.get_task(task_id)
+        if not task:
+            return False, "任务不存在"
+        if task.task_status == TaskStatus.QUEUED:
+            return False, "任务正在排队"
+
+        active = task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED)
+        fuzzer_count = task.fuzzer_count or 1
+        if active and not task_manager.stop_task(task_id):
+            return False, "停止任务失败"
+        if not task_manager.reseed(task_id, job["corpus_dir"]):
+            return False, "更换初始语料失败"
+
+        job["applied"] = True
+        with self._lock:
+            if self._jobs.get(task_id, {}).get("job_id") == job["job_id"]:
+                self._jobs[task_id]["applied"] = True
+        self._save_job(job)
+
+        if active:
+            return scheduler.submit(task_id, fuzzer_count)
+        return True, None
+
+    def _run(self, task: Task, job: Dict):
+        job["status"] = "running"
+        self._save_job(job)
+        try:
+            self.distill(task, job)
+            job["status"] = "done"
+            self._cleanup(task, job)
+        except Exception as e:
+            print(f"语料精简失败 task_{task.id}: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+            shutil.rmtree(job["corpus_dir"], ignore_errors=True)
+        job["finished_at"] = datetime.now().isoformat()
+        self._save_job(job)
+
+        if job["status"] == "done" and job["restart"]:
+            ok, error = self.apply(task.id)
+            if not ok:
+                print(f"使用精简语料重新启动任务失败 task_{task.id}: {error}")
+
+    def distill(self, task: Task, job: Dict):
+        """记录每个样本的元组并选出精简语料，写入 job["corpus_dir"]"""
+        inputs, before = self.collect_inputs(task)
+        job["before"] = before
+        job["progress"]["total"] = len(inputs)
+        if not inputs:
+            raise RuntimeError("语料为空")
+
+        traces: Dict[str, Set[int]] = {}
+        with tempfile.TemporaryDirectory(prefix="distill_") as trace_dir:
+            with ThreadPoolExecutor(max_workers=self._workers(), thread_name_prefix="distill-showmap") as pool:
+                futures = {
+                    pool.submit(self._trace, task, path, os.path.join(trace_dir, str(i))): path
+                    for i, path in enumerate(inputs)
+                }
+                for future, path in futures.items():
+                    tuples = future.result()
+                    if tuples:
+                        traces[path] = tuples
+                    job["progress"]["traced"] += 1
+
+        if not traces:
+            raise RuntimeError("没有样本产生覆盖信息，请确认目标程序已插桩")
+
+        selected = self._select(traces)
+        os.makedirs(job["corpus_dir"], exist_ok=True)
+        total_bytes = 0
+        for i, path in enumerate(selected):
+            name = f"{i:06d},{os.path.basename(os.path.dirname(os.path.dirname(path)))}"
+            shutil.copyfile(path, os.path.join(job["corpus_dir"], name))
+            total_bytes += os.path.getsize(path)
+
+        job["tuples"] = len(set().union(*traces.values()))
+        job["after"] = {"files": len(selected), "bytes": total_bytes}
+
+    def collect_inputs(self, task: Task) -> Tuple[List[str], Dict]:
+        """收集所有实例 queue/ 中的样本，内容相同的只保留一个
+
+        返回 (样本路径, 精简前的文件数和字节数)。从其他实例同步来的副本
+        （文件名带 sync:）不计入。
+        """
+        from services import monitoring_service
+
+        inputs, seen = [], set()
+        files = total_bytes = 0
+        for _, path in monitoring_service.discover_instances(task.output_dir):
+            queue_dir = os.path.join(path, "queue")
+            if not os.path.isdir(queue_dir):
+                continue
+            for entry in os.scandir(queue_dir):
+                if not entry.name.startswith("id:") or ",sync:" in entry.name or not entry.is_file():
+                    continue
+                files += 1
+                total_bytes += entry.stat().st_size
+                with open(entry.path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).digest()
+                if digest not in seen:
+                    seen.add(digest)
+                    inputs.append(entry.path)
+
+        return inputs, {"files": files, "bytes": total_bytes, "unique": len(inputs)}
+
+    def _workers(self) -> int:
+        if settings.distill_workers > 0:
+            return settings.distill_workers
+
+        from services import scheduler
+        return max(1, len(scheduler.free_cores()))
+
+    def _target_command(self, task: Task, filepath: str) -> Tuple[List, Optional[str]]:
+        """按输入类型构建目标程序命令，返回 (命令, 作为 stdin 的文件)"""
+        if task.input_type == InputType.FILE:
+            return [task.target_binary, filepath], None
+        if task.input_type == InputType.ARGS:
+            with open(filepath, "rb") as f:
+                return [task.target_binary, f.read().replace(b"\0", b"")], None
+        return [task.target_binary], filepath
+
+    def _trace(self, task: Task, filepath: str, trace_file: str) -> Optional[Set[int]]:
+        """用 afl-showmap -Z 记录样本命中的元组，崩溃或超时的样本返回 None"""
+        target, stdin_file = self._target_command(task, filepath)
+        command = [
+            settings.afl_showmap_path, "-q", "-Z",
+            "-m", "none",
+            "-t", str(settings.default_timeout),
+            "-o", trace_file,
+            "--", *target,
+        ]
+
+        stdin = open(stdin_file, "rb") if stdin_file else subprocess.DEVNULL
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=os.path.dirname(trace_file)
+            )
+            try:
+                os.setpriority(os.PRIO_PROCESS, process.pid, settings.triage_nice)
+            except (OSError, AttributeError):
+                pass
+            try:
+                # afl-showmap 自己会按 -t 结束目标程序，这里只防止 afl-showmap 本身卡住
+                process.wait(timeout=settings.default_timeout / 1000 * 2 + 10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                return None
+        finally:
+            if stdin_file:
+                stdin.close()
+
+        try:
+            with open(trace_file, "r") as f:
+                tuples = {int(line) for line in f if line.strip()}
+            os.unlink(trace_file)
+        except (OSError, ValueError):
+            return None
+        return tuples or None
+
+    def _select(self, traces: Dict[str, Set[int]]) -> List[str]:
+        """afl-cmin 的选择算法：每个元组取包含它的最小样本，从最少见的元组开始选入"""
+        sizes = {path: os.path.getsize(path) for path in traces}
+
+        popularity = Counter()
+        best: Dict[int, str] = {}
+        for path in sorted(traces, key=lambda p: (sizes[p], p)):
+            for value in traces[path]:
+                popularity[value] += 1
+                best.setdefault(value, path)
+
+        selected, covered = [], set()
+        for value, _ in sorted(popularity.items(), key=lambda item: (item[1], item[0])):
+            if value in covered:
+                continue
+            path = best[value]
+            selected.append(path)
+            covered |= traces[path]
+        return selected
+
+    def _cleanup(self, task: Task, job: Dict):
+        """删除之前的精简结果（正在作为初始语料使用的除外）"""
+        distilled_dir = os.path.dirname(job["corpus_dir"])
+        for name in os.listdir(distilled_dir):
+            path = os.path.join(distilled_dir, name)
+            if path not in (job["corpus_dir"], task.seeds_dir):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _check_schedule(self):
+        """定时为运行中、语料足够多的任务提交精简"""
+        if settings.distill_interval <= 0:
+            return
+
+        now = time.time()
+        for task in task_manager.get_all_tasks():
+            if task.task_status != TaskStatus.RUNNING or task.type != TaskType.WHITEBOX:
+                continue
+            last = self._last_run.get(task.id) or (task.started_at.timestamp() if task.started_at else now)
+            if now - last < settings.distill_interval or task.corpus_count < settings.distill_min_queue:
+                continue
+            self.submit(task.id, restart=settings.distill_auto_restart)
+
+    def _task_dir(self, task_id: int) -> str:
+        return os.path.join(settings.tasks_dir, f"task_{task_id}")
+
+    def _job_file(self, task_id: int) -> str:
+        return os.path.join(self._task_dir(task_id), "distill.json")
+
+    def _save_job(self, job: Dict):
+        try:
+            with open(self._job_file(job["task_id"]), "w") as f:
+                json.dump(job, f, indent=2)
+        except OSError as e:
+            print(f"保存语料精简状态失败: {e}")
+
+
+# 全局实例
+corpus_distiller = CorpusDistiller()
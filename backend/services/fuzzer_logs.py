@@ -0,0 +1,193 @@
+import os
+import re
+import selectors
+import threading
+from typing import Dict, IO, List, Optional, Tuple
+
+from config import settings
+
+
+# ANSI 颜色和光标控制序列（AFL 的 ACTF/OKF 输出带颜色）
+_ANSI_ESCAPE = re.compile(rb"\x1b(?:\[[0-9;?]*[ -/]*[@-~]|[()][0-9A-Za-z]|[@-Z\\-_])")
+
+
+def strip_ansi(data: bytes) -> bytes:
+    """去除 ANSI 控制序列"""
+    return _ANSI_ESCAPE.sub(b"", data)
+
+
+class RingBuffer:
+    """固定容量的字节环形缓冲区
+
+    只保留最近 capacity 字节；offset 为累计写入的字节数，读取方记录
+    上次读到的 offset 即可增量读取，被覆盖的部分直接跳过。
+    """
+
+    def __init__(self, capacity: int):
+        self._lock = threading.Lock()
+        self._data = bytearray(capacity)
+        self._capacity = capacity
+        self.offset = 0
+
+    @property
+    def start_offset(self) -> int:
+        """缓冲区中最早一个字节的偏移量"""
+        return max(0, self.offset - self._capacity)
+
+    def write(self, data: bytes):
+        with self._lock:
+            total = len(data)
+            if total >= self._capacity:
+                data = data[-self._capacity:]
+            pos = (self.offset + total - len(data)) % self._capacity
+            first = min(len(data), self._capacity - pos)
+            self._data[pos:pos + first] = data[:first]
+            self._data[:len(data) - first] = data[first:]
+            self.offset += total
+
+    def read(self, since: Optional[int] = None, limit: Optional[int] = None) -> Tuple[int, bytes]:
+        """读取 since 之后的数据，返回 (实际起始偏移量, 数据)
+
+        since 为空时读取全部缓冲内容；limit 限制返回的字节数（保留最新的部分）。
+        """
+        with self._lock:
+            start = self.start_offset if since is None else min(max(since, self.start_offset), self.offset)
+            if limit is not None and self.offset - start > limit:
+                start = self.offset - limit
+
+            pos = start % self._capacity
+            length = self.offset - start
+            if pos + length <= self._capacity:
+                data = bytes(self._data[pos:pos + length])
+            else:
+                data = bytes(self._data[pos:]) + bytes(self._data[:length - (self._capacity - pos)])
+            return start, data
+
+
+class FuzzerLogs:
+    """Fuzzer 输出收集服务 - 持续读取各实例的 stdout/stderr 并保留最近的输出
+
+    afl-fuzz 的输出管道如果没人读取，写满后会阻塞 fuzzer。所有实例的管道
+    由一个后台线程通过 selector 非阻塞读取，写入每个实例的环形缓冲区。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # task_id -> {实例名: 环形缓冲区}
+        self._buffers: Dict[int, Dict[str, RingBuffer]] = {}
+        # 仍未关闭的管道数，task_id -> 数量
+        self._open_streams: Dict[int, int] = {}
+        # 每次 reset 加 1，读取方据此判断缓冲区已重建、偏移量需要从 0 开始
+        self._generations: Dict[int, int] = {}
+        self._selector = selectors.DefaultSelector()
+        # 用于在注册新管道时唤醒后台线程
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._thread: Optional[threading.Thread] = None
+
+    def reset(self, task_id: int):
+        """清空任务的日志（任务重新启动或删除时）"""
+        with self._lock:
+            self._buffers.pop(task_id, None)
+            self._generations[task_id] = self._generations.get(task_id, 0) + 1
+
+    def generation(self, task_id: int) -> int:
+        """任务输出缓冲区的代号，任务重新启动后改变"""
+        with self._lock:
+            return self._generations.get(task_id, 0)
+
+    def attach(self, task_id: int, instance: str, stream: IO[bytes]):
+        """开始读取实例的输出管道"""
+        buffer = RingBuffer(settings.fuzzer_log_size)
+        with self._lock:
+            self._buffers.setdefault(task_id, {})[instance] = buffer
+            self._open_streams[task_id] = self._open_streams.get(task_id, 0) + 1
+
+        os.set_blocking(stream.fileno(), False)
+        self._selector.register(stream, selectors.EVENT_READ, (task_id, buffer))
+        self._ensure_thread()
+        os.write(self._wakeup_w, b"\0")
+
+    def is_streaming(self, task_id: int) -> bool:
+        """任务是否还有未关闭的输出管道"""
+        with self._lock:
+            return self._open_streams.get(task_id, 0) > 0
+
+    def instances(self, task_id: int) -> List[str]:
+        with self._lock:
+            return list(self._buffers.get(task_id, {}))
+
+    def tail(self, task_id: int, instance: Optional[str] = None, since: Optional[int] = None,
+             limit: Optional[int] = None, raw: bool = False) -> List[Dict]:
+        """读取任务各实例的输出
+
+        since 为上次返回的 next_offset，用于增量读取；truncated 表示
+        since 之后有部分输出已被覆盖。
+        """
+        with self._lock:
+            buffers = dict(self._buffers.get(task_id, {}))
+
+        logs = []
+        for name, buffer in buffers.items():
+            if instance is not None and name != instance:
+                continue
+            start, data = buffer.read(since, limit)
+            next_offset = start + len(data)
+            if not raw:
+                data = strip_ansi(data)
+            logs.append({
+                "instance": name,
+                "offset": start,
+                "next_offset": next_offset,
+                "truncated": since is not None and start > since,
+                "data": data.decode("utf-8", "replace"),
+            })
+        return logs
+
+    def last_lines(self, task_id: int, count: int = 5, instance: Optional[str] = None) -> str:
+        """获取任务（或其中一个实例）输出的最后几行，用于记录进程异常退出的原因"""
+        lines = []
+        for log in self.tail(task_id, instance=instance, limit=4096):
+            lines.extend(line for line in log["data"].splitlines() if line.strip())
+        return "\n".join(lines[-count:])
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="fuzzer-logs", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wakeup_r:
+                    try:
+                        os.read(self._wakeup_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                task_id, buffer = key.data
+                try:
+                    data = os.read(key.fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    data = b""
+
+                if data:
+                    buffer.write(data)
+                    continue
+
+                # EOF：实例已退出
+                self._selector.unregister(key.fileobj)
+                key.fileobj.close()
+                with self._lock:
+                    self._open_streams[task_id] = self._open_streams.get(task_id, 1) - 1
+                    if self._open_streams[task_id] <= 0:
+                        del self._open_streams[task_id]
+
+
+# 全局实例
+fuzzer_logs = FuzzerLogs()
@@ -0,0 +1,410 @@
+import os
+import math
+import threading
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from services.task_manager import task_manager
+from services.watcher import task_watcher
+
+
+# 保存的指标，plot_data 中没有的列为 NaN
+METRICS = (
+    "cycles_done",
+    "cur_path",
+    "paths_total",
+    "pending_total",
+    "pending_favs",
+    "map_size",
+    "unique_crashes",
+    "unique_hangs",
+    "max_depth",
+    "execs_per_sec",
+    "total_execs",
+    "edges_found",
+)
+
+# plot_data 列名（AFL 2.x / AFL++）-> 指标名
+_COLUMN_ALIASES = {
+    "cur_item": "cur_path",
+    "corpus_count": "paths_total",
+    "saved_crashes": "unique_crashes",
+    "saved_hangs": "unique_hangs",
+}
+
+# 降采样时取桶内平均值的指标，其余取桶内最后一个值（累计量）
+_MEAN_INDEXES = [METRICS.index("execs_per_sec")]
+
+# 汇总多个实例时求和的指标，其余取最大值
+_SUM_METRICS = {"execs_per_sec", "unique_crashes", "unique_hangs", "total_execs", "paths_total", "pending_total"}
+
+# 分辨率 -> 桶宽（秒），raw 为 AFL 写入的原始数据点（约每 5 秒一个）
+RESOLUTIONS = {"raw": 0, "1m": 60, "10m": 600}
+
+
+class _Ring:
+    """定长环形缓冲区，按列存储（时间为 double，指标为 float）
+
+    容量未满时数组按需增长，短时间运行的任务不会预先占用全部空间。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.times = array("d")
+        self.columns = [array("f") for _ in METRICS]
+        self._start = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, t: float, values: List[float]):
+        if len(self.times) < self.capacity:
+            self.times.append(t)
+            for column, value in zip(self.columns, values):
+                column.append(value)
+            return
+
+        i = self._start
+        self.times[i] = t
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        self._start = (i + 1) % self.capacity
+
+    def _physical(self, i: int) -> int:
+        return (self._start + i) % len(self.times)
+
+    def time_at(self, i: int) -> float:
+        return self.times[self._physical(i)]
+
+    def oldest(self) -> Optional[float]:
+        return self.time_at(0) if self.times else None
+
+    def is_full(self) -> bool:
+        return len(self.times) >= self.capacity
+
+    def bisect(self, t: float) -> int:
+        """第一个时间 >= t 的逻辑下标"""
+        lo, hi = 0, len(self.times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time_at(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slice(self, start: float, end: float, indexes: List[int]) -> Tuple[List[float], List[List[float]]]:
+        """返回 [start, end] 内的时间和指定指标列"""
+        lo, hi = self.bisect(start), self.bisect(math.nextafter(end, math.inf))
+        positions = [self._physical(i) for i in range(lo, hi)]
+        return ([self.times[p] for p in positions],
+                [[self.columns[m][p] for p in positions] for m in indexes])
+
+
+class _Downsampler:
+    """把原始数据点合并为固定宽度的桶，桶结束时写入环形缓冲区"""
+
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.ring = _Ring(capacity)
+        self._bucket: Optional[float] = None
+        self._sums = [0.0] * len(_MEAN_INDEXES)
+        self._last: List[float] = []
+        self._count = 0
+
+    def add(self, t: float, values: List[float]):
+        bucket = t - t % self.width
+        if bucket != self._bucket:
+            if self._bucket is not None:
+                self.ring.append(*self.current())
+            self._bucket = bucket
+            self._sums = [0.0] * len(_MEAN_INDEXES)
+            self._count = 0
+        self._count += 1
+        self._last = values
+        for j, i in enumerate(_MEAN_INDEXES):
+            self._sums[j] += values[i]
+
+    def current(self) -> Optional[Tuple[float, List[float]]]:
+        """尚未结束的桶"""
+        if self._bucket is None:
+            return None
+        values = list(self._last)
+        for j, i in enumerate(_MEAN_INDEXES):
+            values[i] = self._sums[j] / self._count
+        return self._bucket, values
+
+
+class _Series:
+    """一个 AFL 实例的时间序列：原始数据和各分辨率的降采样"""
+
+    def __init__(self):
+        self.raw = _Ring(settings.metrics_raw_points)
+        self.downsampled = {
+            "1m": _Downsampler(RESOLUTIONS["1m"], settings.metrics_1m_points),
+            "10m": _Downsampler(RESOLUTIONS["10m"], settings.metrics_10m_points),
+        }
+        self.last_time: Optional[float] = None
+
+    def add(self, t: float, values: List[float]):
+        # 重新读取文件（服务重启、输出目录重建）时跳过已有的数据点
+        if self.last_time is not None and t <= self.last_time:
+            return
+        self.last_time = t
+        self.raw.append(t, values)
+        for downsampler in self.downsampled.values():
+            downsampler.add(t, values)
+
+    def covers(self, resolution: str, start: float) -> bool:
+        """该分辨率是否还保留着 start 之后的全部数据"""
+        ring = self._ring(resolution)
+        return not ring.is_full() or ring.oldest() <= start
+
+    def count(self, resolution: str, start: float, end: float) -> int:
+        ring = self._ring(resolution)
+        return ring.bisect(math.nextafter(end, math.inf)) - ring.bisect(start) + 1
+
+    def query(self, resolution: str, start: float, end: float,
+              indexes: List[int]) -> Tuple[List[float], List[List[float]]]:
+        if resolution == "raw":
+            return self.raw.slice(start, end, indexes)
+
+        downsampler = self.downsampled[resolution]
+        # 包含 start 所在的桶
+        times, columns = downsampler.ring.slice(start - start % downsampler.width, end, indexes)
+        current = downsampler.current()
+        if current and start - downsampler.width < current[0] <= end:
+            times.append(current[0])
+            for column, i in zip(columns, indexes):
+                column.append(current[1][i])
+        return times, columns
+
+    def _ring(self, resolution: str) -> _Ring:
+        return self.raw if resolution == "raw" else self.downsampled[resolution].ring
+
+
+class _PlotReader:
+    """增量读取 plot_data：记录读取位置，每次只解析新追加的完整行"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.inode: Optional[int] = None
+        self.offset = 0
+        # 从一行中按 METRICS 顺序取值
+        self.columns: Optional[itemgetter] = None
+        self.width = 0
+        self.time_offset = 0.0
+
+    def read(self) -> Iterator[Tuple[float, List[float]]]:
+        """逐行返回新增的数据点 (时间, 指标值)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            # 文件被替换（重新开始 fuzz），从头读取
+            self.inode, self.offset, self.columns = st.st_ino, 0, None
+        if st.st_size == self.offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # 最后一行可能还没写完，留到下次读取
+                    break
+                self.offset += len(raw)
+                line = raw.decode("utf-8", "replace")
+                if line.startswith("#"):
+                    if not self._parse_header(line):
+                        # 还不能确定时间基准，下次从头读取
+                        self.offset, self.columns = 0, None
+                        return
+                    continue
+                point = self._parse_line(line)
+                if point:
+                    yield point
+
+    def _parse_header(self, line: str) -> bool:
+        """解析表头，第一列为时间；AFL++ 的 fuzzer_stats 还没有写入时返回 False"""
+        names = [_COLUMN_ALIASES.get(name.strip(), name.strip()) for name in line[1:].split(",")]
+        # 缺少的列取行末追加的 NaN
+        self.columns = itemgetter(*[names.index(name) if name in names else -1 for name in METRICS])
+        self.width = len(names)
+        self.time_offset = 0.0
+        if names[0] == "relative_time":
+            # AFL++ 记录相对启动时间的秒数
+            self.time_offset = self._start_time()
+            return self.time_offset > 0
+        return True
+
+    def _parse_line(self, line: str) -> Optional[Tuple[float, List[float]]]:
+        if not self.columns:
+            return None
+        # float() 忽略首尾空白，map_size 等字段需要去掉百分号
+        try:
+            fields = list(map(float, line.replace("%", "").split(",")))
+        except ValueError:
+            return None
+        if len(fields) != self.width:
+            return None
+        fields.append(math.nan)
+        return fields[0] + self.time_offset, list(self.columns(fields))
+
+    def _start_time(self) -> float:
+        from services import monitoring_service
+
+        stats = monitoring_service._read_fuzzer_stats(os.path.join(os.path.dirname(self.path), "fuzzer_stats"))
+        return float(stats.get("start_time", 0) or 0)
+
+
+class MetricsStore:
+    """任务统计的时间序列存储
+
+    fuzzer_stats 变化时增量读取各实例的 plot_data，数据点写入按列存储的
+    环形缓冲区，同时降采样为 1 分钟和 10 分钟的桶（速率取平均值，累计量
+    取最后一个值）。原始数据只保留最近一段时间，长时间运行的任务查询
+    较早的时间范围时使用降采样数据，内存占用与运行时长无关。服务重启后
+    第一次读取时从头解析 plot_data 重建。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (task_id, 实例名) -> 时间序列
+        self._series: Dict[Tuple[int, str], _Series] = {}
+        # plot_data 路径 -> 读取位置
+        self._readers: Dict[str, _PlotReader] = {}
+        task_watcher.add_listener(self._on_watch_event)
+
+    def refresh(self, task_id: int):
+        """读取任务各实例 plot_data 新增的数据点"""
+        from services import monitoring_service
+
+        task = task_manager.get_task(task_id)
+        if not task:
+            return
+
+        with self._lock:
+            for instance, path in monitoring_service.discover_instances(task.output_dir):
+                plot_file = os.path.join(path, "plot_data")
+                reader = self._readers.get(plot_file)
+                if reader is None:
+                    reader = self._readers[plot_file] = _PlotReader(plot_file)
+                for t, values in reader.read():
+                    series = self._series.get((task_id, instance))
+                    if series is None:
+                        series = self._series[(task_id, instance)] = _Series()
+                    series.add(t, values)
+
+    def query(
+        self,
+        task_id: int,
+        metrics: Optional[List[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = "auto",
+        instance: Optional[str] = None,
+        max_points: int = 1000
+    ) -> Dict:
+        """查询时间范围内的指标
+
+        resolution 为 auto 时选择能覆盖整个范围且点数不超过 max_points 的
+        最细分辨率。未指定 instance 时汇总所有实例：速率和计数求和，其余
+        取最大值。仍超过 max_points 时等间隔抽取。
+        """
+        metrics = [name for name in (metrics or METRICS) if name in METRICS]
+        indexes = [METRICS.index(name) for name in metrics]
+        start = start if start is not None else 0.0
+        end = end if end is not None else math.inf
+
+        self.refresh(task_id)
+        with self._lock:
+            series = {
+                name: s for (tid, name), s in self._series.items()
+                if tid == task_id and (instance is None or name == instance)
+            }
+            if resolution not in RESOLUTIONS:
+                resolution = self._choose_resolution(list(series.values()), start, end, max_points)
+
+            results = [s.query(resolution, start, end, indexes) for s in series.values()]
+
+        if len(results) == 1:
+            times, columns = results[0]
+        else:
+            times, columns = self._merge(results, metrics)
+
+        if len(times) > max_points > 0:
+            step = math.ceil(len(times) / max_points)
+            times = times[::step]
+            columns = [column[::step] for column in columns]
+
+        return {
+            "task_id": task_id,
+            "resolution": resolution,
+            "instances": sorted(series),
+            "time": times,
+            "series": {
+                name: [None if math.isnan(v) else round(v, 2) for v in column]
+                for name, column in zip(metrics, columns)
+            },
+        }
+
+    def evict_task(self, task_id: int):
+        """删除任务时清理时间序列"""
+        task = task_manager.get_task(task_id)
+        with self._lock:
+            for key in [key for key in self._series if key[0] == task_id]:
+                del self._series[key]
+            if task and task.output_dir:
+                prefix = os.path.join(task.output_dir, "")
+                for path in [path for path in self._readers if path.startswith(prefix)]:
+                    del self._readers[path]
+
+    def _choose_resolution(self, series: List[_Series], start: float, end: float, max_points: int) -> str:
+        if not series:
+            return "raw"
+        for resolution, width in RESOLUTIONS.items():
+            if not all(s.covers(resolution, start) for s in series):
+                continue
+            # 降采样的桶在各实例间对齐，原始数据点合并后约为各实例点数之和
+            counts = [s.count(resolution, start, end) for s in series]
+            if (max(counts) if width else sum(counts)) <= max_points:
+                return resolution
+        return "10m"
+
+    def _merge(self, results: List[Tuple[List[float], List[List[float]]]],
+               metrics: List[str]) -> Tuple[List[float], List[List[float]]]:
+        """按时间合并多个实例：每个时间点取各实例在该时刻之前的最新值再汇总"""
+        times = sorted({t for result_times, _ in results for t in result_times})
+        positions = [0] * len(results)
+        merged = [[] for _ in metrics]
+
+        for t in times:
+            current = []
+            for i, (result_times, columns) in enumerate(results):
+                while positions[i] < len(result_times) and result_times[positions[i]] <= t:
+                    positions[i] += 1
+                if positions[i]:
+                    current.append([column[positions[i] - 1] for column in columns])
+
+            for m, name in enumerate(metrics):
+                values = [row[m] for row in current if not math.isnan(row[m])]
+                if not values:
+                    merged[m].append(math.nan)
+                elif name in _SUM_METRICS:
+                    merged[m].append(sum(values))
+                else:
+                    merged[m].append(max(values))
+
+        return times, merged
+
+    def _on_watch_event(self, task_id: int, kind: str, paths: List[str]):
+        # AFL 在更新 fuzzer_stats 的同时追加 plot_data
+        if kind == "stats":
+            self.refresh(task_id)
+
+
+# 全局实例
+metrics_store = MetricsStore()
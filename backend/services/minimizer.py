@@ -0,0 +1,285 @@
+import os
+import shutil
+import signal
+import hashlib
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from models import Task, InputType
+from services.task_manager import task_manager
+from services.crash_index import crash_index
+from services.triage import crash_triage
+
+
+# 精简后的样本保存在实例目录下与 crashes/ 并列的目录中，
+# 文件名与原样本相同（不放入 crashes/，避免被当作新的崩溃）
+MINIMIZED_DIR = "minimized"
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CrashMinimizer:
+    """崩溃样本精简服务 - 用 afl-tmin 精简每个崩溃桶的代表样本
+
+    每个桶只精简第一个分析完成且可复现的样本。afl-tmin 由有限大小的线程池
+    运行，并以 SCHED_IDLE（不支持时退化为 nice）调度，只使用 fuzzer 空闲的
+    CPU。结果按 (样本内容, 目标程序, 输入方式) 缓存，同样的输入不会精简两次；
+    缓存超过 minimize_cache_size 时按最近使用时间（文件 mtime）淘汰最久未
+    使用的结果，已经链接到实例目录的文件不受淘汰影响。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.minimize_workers),
+            thread_name_prefix="crash-minimizer"
+        )
+        # 已提交但尚未完成的样本 (task_id, 相对于输出目录的路径)
+        self._pending = set()
+        # 正在使用的缓存项 -> [锁, 使用者数]，避免不同任务中相同的样本同时精简；
+        # 没有使用者时删除，正在使用的缓存项不会被淘汰
+        self._key_locks: Dict[str, list] = {}
+        # 目标程序路径 -> ((大小, mtime), 内容哈希)
+        self._binary_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        crash_triage.add_listener(self._on_triaged)
+
+        for task_id, sample in crash_index.interrupted_minimizations():
+            self._submit(task_id, sample)
+
+    def _on_triaged(self, task: Task, sample: str, result: Dict):
+        """样本分析完成后，桶内还没有精简过的样本时提交精简"""
+        if not settings.minimize_enabled or not result["reproducible"] or not result["bucket"]:
+            return
+        if crash_index.claim_minimization(task.id, sample, result["bucket"]):
+            self._submit(task.id, sample)
+
+    def submit(self, task_id: int, sample: str) -> bool:
+        """手动请求精简样本，不检查桶内是否已有精简结果"""
+        if not crash_index.claim_minimization(task_id, sample, None):
+            return False
+        return self._submit(task_id, sample)
+
+    def _submit(self, task_id: int, sample: str) -> bool:
+        with self._lock:
+            if (task_id, sample) in self._pending:
+                return False
+            self._pending.add((task_id, sample))
+        self._executor.submit(self._run, task_id, sample)
+        return True
+
+    def minimized_path(self, task: Task, row: Dict) -> Optional[str]:
+        """精简后样本的本地路径，尚未精简时返回 None"""
+        if not row.get("min_sample"):
+            return None
+        return os.path.join(task.output_dir, row["min_sample"])
+
+    def _run(self, task_id: int, sample: str):
+        try:
+            task = task_manager.get_task(task_id)
+            filepath = os.path.join(task.output_dir, sample) if task else None
+            if not task or not task.target_binary or not os.path.exists(filepath):
+                crash_index.update_minimization(task_id, sample, "failed")
+                return
+            if task.input_type == InputType.ARGS:
+                # afl-tmin 只支持 stdin 和文件输入
+                crash_index.update_minimization(task_id, sample, "unsupported")
+                return
+
+            crash_index.update_minimization(task_id, sample, "running")
+            status, min_sample, min_size = self.minimize(task, sample)
+            crash_index.update_minimization(task_id, sample, status, min_sample, min_size)
+        except Exception as e:
+            print(f"崩溃样本精简失败 {sample}: {e}")
+            crash_index.update_minimization(task_id, sample, "failed")
+        finally:
+            with self._lock:
+                self._pending.discard((task_id, sample))
+
+    def minimize(self, task: Task, sample: str) -> Tuple[str, Optional[str], Optional[int]]:
+        """精简样本并保存到实例的 minimized/ 目录，返回 (状态, 相对路径, 大小)
+
+        精简结果会重新分析：afl-tmin 在崩溃模式下接受任何崩溃，桶发生变化
+        （精简成了另一个缺陷）时状态为 diverged，结果仍然保留。
+        """
+        filepath = os.path.join(task.output_dir, sample)
+        key = self._cache_key(task, filepath)
+        cached = os.path.join(settings.minimize_cache_dir, key)
+
+        instance_dir = os.path.dirname(os.path.dirname(sample))
+        min_sample = os.path.join(instance_dir, MINIMIZED_DIR, os.path.basename(sample))
+
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if os.path.exists(cached):
+                    os.utime(cached)
+                elif self._run_tmin(task, filepath, cached):
+                    self.evict()
+                else:
+                    return "failed", None, None
+                self._link(cached, os.path.join(task.output_dir, min_sample))
+                min_size = os.path.getsize(cached)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+        original = crash_index.get(task.id, sample)
+        result = crash_triage.analyze(task, os.path.join(task.output_dir, min_sample))
+        status = "done" if original and result["bucket"] == original["bucket"] else "diverged"
+        return status, min_sample, min_size
+
+    def evict(self, limit: Optional[int] = None) -> int:
+        """淘汰最久未使用的缓存结果，直到总大小不超过 limit（默认 minimize_cache_size），返回淘汰数"""
+        limit = settings.minimize_cache_size if limit is None else limit
+        entries, total = self._entries()
+        evicted = 0
+        for mtime, size, key in sorted(entries):
+            if total <= limit:
+                break
+            with self._lock:
+                # 正在生成或链接的缓存项留到下次淘汰
+                if key in self._key_locks:
+                    continue
+                try:
+                    os.unlink(os.path.join(settings.minimize_cache_dir, key))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def _entries(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """缓存中的 (mtime, 大小, 缓存键) 列表和总大小"""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(settings.minimize_cache_dir)
+        except FileNotFoundError:
+            return entries, total
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(os.path.join(settings.minimize_cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        return entries, total
+
+    def _cache_key(self, task: Task, filepath: str) -> str:
+        binary = task_manager.sample_binary(task, filepath)
+        key = f"{_file_digest(filepath)}:{self._binary_digest(binary)}:{task.input_type.value}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _binary_digest(self, path: str) -> str:
+        """目标程序的内容哈希，按大小和 mtime 缓存"""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        cached = self._binary_digests.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        digest = _file_digest(path)
+        self._binary_digests[path] = (stamp, digest)
+        return digest
+
+    def _tmin_command(self, task: Task, filepath: str, output: str) -> List[str]:
+        command = [
+            settings.afl_tmin_path,
+            "-i", filepath,
+            "-o", output,
+            "-m", "none",
+            "-t", str(settings.default_timeout),
+            "--", task_manager.sample_binary(task, filepath),
+        ]
+        if task.input_type == InputType.FILE:
+            command.append("@@")
+        return command
+
+    def _tmin_env(self) -> Dict[str, str]:
+        env = os.environ.copy()
+        # afl-tmin 通过信号判断崩溃，sanitizer 需要以 abort 结束
+        env.setdefault("ASAN_OPTIONS", "abort_on_error=1:symbolize=0:detect_leaks=0:allocator_may_return_null=1")
+        env.setdefault("UBSAN_OPTIONS", "halt_on_error=1:abort_on_error=1")
+        return env
+
+    def _run_tmin(self, task: Task, filepath: str, cached: str) -> bool:
+        """运行 afl-tmin，成功时将结果写入缓存"""
+        with tempfile.TemporaryDirectory(prefix="tmin_") as cwd:
+            output = os.path.join(cwd, "minimized")
+            try:
+                process = subprocess.Popen(
+                    self._tmin_command(task, filepath, output),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    cwd=cwd,
+                    env=self._tmin_env(),
+                    start_new_session=True
+                )
+            except OSError as e:
+                print(f"无法启动 afl-tmin: {e}")
+                return False
+            self._lower_priority(process.pid)
+
+            try:
+                _, stderr = process.communicate(timeout=settings.minimize_timeout)
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                process.communicate()
+                print(f"afl-tmin 超时: {filepath}")
+                return False
+
+            if process.returncode != 0 or not os.path.exists(output):
+                print(f"afl-tmin 执行失败 {filepath}: {stderr[-500:].decode('utf-8', 'replace')}")
+                return False
+
+            # 同一文件系统内原子替换，其他读者不会看到写了一半的缓存
+            tmp = f"{cached}.tmp"
+            shutil.copyfile(output, tmp)
+            os.replace(tmp, cached)
+            return True
+
+    def _lower_priority(self, pid: int):
+        """afl-tmin 及其 fork 出的目标进程只在 CPU 空闲时运行"""
+        try:
+            os.sched_setscheduler(pid, os.SCHED_IDLE, os.sched_param(0))
+        except (OSError, AttributeError):
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, settings.triage_nice)
+            except (OSError, AttributeError):
+                pass
+
+    def _link(self, source: str, dest: str):
+        """从缓存硬链接到实例目录，跨文件系统时复制"""
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # 已经链接过（rename 到同一 inode 时不会删除临时文件）
+        if os.path.exists(dest) and os.path.samefile(source, dest):
+            return
+        tmp = f"{dest}.tmp"
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, dest)
+
+
+# 全局实例
+crash_minimizer = CrashMinimizer()
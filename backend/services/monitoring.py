@@ -1,31 +1,179 @@
 import os
 import json
-import re
 import subprocess
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 
 from config import settings
-from services.task_manager import task_manager
+from services.task_manager import task_manager, SHARED_CORPUS_DIR
+
+
+def _float(value: str) -> float:
+    # stability / bitmap_cvg 等字段带有百分号
+    return float(value.rstrip("%"))
+
+
+def _infer(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value.rstrip("%"))
+    except ValueError:
+        return value
+
+
+# AFL / AFL++ fuzzer_stats 字段类型，未列出的字段按内容推断
+_STATS_FIELD_TYPES = {
+    "start_time": int,
+    "last_update": int,
+    "run_time": _infer,
+    "fuzzer_pid": int,
+    "cycles_done": int,
+    "cycles_wo_finds": int,
+    "time_wo_finds": int,
+    "execs_done": int,
+    "execs_per_sec": _float,
+    "execs_ps_last_min": _float,
+    "paths_total": int,
+    "paths_favored": int,
+    "paths_found": int,
+    "paths_imported": int,
+    "corpus_count": int,
+    "corpus_favored": int,
+    "corpus_found": int,
+    "corpus_imported": int,
+    "corpus_variable": int,
+    "max_depth": int,
+    "cur_path": int,
+    "cur_item": int,
+    "pending_favs": int,
+    "pending_total": int,
+    "variable_paths": int,
+    "stability": _float,
+    "bitmap_cvg": _float,
+    "map_size": int,
+    "map_density": _float,
+    "unique_crashes": int,
+    "unique_hangs": int,
+    "saved_crashes": int,
+    "saved_hangs": int,
+    "last_path": int,
+    "last_find": int,
+    "last_crash": int,
+    "last_hang": int,
+    "execs_since_crash": int,
+    "exec_timeout": int,
+    "timeout_time": int,
+    "slowest_exec_ms": int,
+    "peak_rss_mb": int,
+    "edges_found": int,
+    "edges_total": int,
+    "var_byte_count": int,
+    "havoc_expansion": int,
+    "testcache_size": int,
+    "testcache_count": int,
+    "testcache_evict": int,
+    "afl_banner": str,
+    "afl_version": str,
+    "target_mode": str,
+    "command_line": str,
+}
+
+
+def parse_fuzzer_stats(lines: Iterable[str]) -> Dict:
+    """单次遍历解析 fuzzer_stats 的 "key : value" 行
+
+    AFL stats 格式示例:
+    run_time                : 0 days, 00 hrs, 32 min, 15 sec
+    execs_done              : 1523456
+    execs_per_sec           : 789.12
+    stability               : 100.00%
+    """
+    stats = {}
+    field_types = _STATS_FIELD_TYPES
+
+    for line in lines:
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+        if not key:
+            continue
+
+        convert = field_types.get(key, _infer)
+        try:
+            stats[key] = convert(value)
+        except ValueError:
+            # 例如 "peak_rss_mb : not available while afl is running"
+            stats[key] = value
+
+    return stats
+
+
+class StatCache:
+    """以 stat 结果校验的 LRU 缓存
+
+    文件内容缓存以 (st_mtime_ns, st_size) 作为校验值，目录计数以目录的
+    st_mtime_ns 作为校验值（增删目录项会更新目录 mtime），校验值不变时
+    直接返回缓存结果，不再重新读取和解析。
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, validator: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == validator:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, validator: Tuple, value):
+        with self._lock:
+            self._entries[key] = (validator, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def evict_prefix(self, path_prefix: str):
+        """移除某个目录下所有路径的缓存项"""
+        prefix = os.path.join(path_prefix, "")
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path_prefix or k[0].startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
 
 
 class MonitoringService:
     """监控服务 - 负责 AFL 统计数据的采集和解析"""
 
     def __init__(self):
-        self._stats_cache = {}
+        self._stat_cache = StatCache(settings.stats_cache_size)
 
-    async def get_task_stats(self, task_id: int) -> Optional[Dict]:
-        """获取任务统计数据"""
+    def get_task_stats(self, task_id: int) -> Optional[Dict]:
+        """获取任务统计数据（汇总所有 fuzzer 实例）"""
         task = task_manager.get_task(task_id)
         if not task:
             return None
 
-        # 尝试读取 AFL 的统计文件
-        stats_file = os.path.join(task.output_dir, "fuzzer0", "fuzzer_stats")
+        instances = self.discover_instances(task.output_dir)
 
-        if not os.path.exists(stats_file):
+        if not any(os.path.exists(os.path.join(path, "fuzzer_stats")) for _, path in instances):
             # 返回默认值
             return {
                 "exec_count": task.exec_count,
@@ -40,104 +188,141 @@ class MonitoringService:
             }
 
         try:
-            stats = self._parse_fuzzer_stats(stats_file)
-
-            # 统计队列中的样本数量
-            queue_dir = os.path.join(task.output_dir, "fuzzer0", "queue")
-            corpus_count = 0
-            if os.path.exists(queue_dir):
-                corpus_count = len([f for f in os.listdir(queue_dir) if f.startswith("id:")])
-
-            # 统计崩溃数量
-            crashes_dir = os.path.join(task.output_dir, "fuzzer0", "crashes")
-            unique_crashes = 0
-            if os.path.exists(crashes_dir):
-                unique_crashes = len([f for f in os.listdir(crashes_dir) if f.startswith("id:")])
-
-
+            stats = self._aggregate_instance_stats(instances)
+            for instance in stats["instances"]:
+                # 已退出实例的退出原因，仍在运行时为 None
+                instance["exited"] = task.instance_exits.get(instance["instance"])
             stats.update({
-                "corpus_count": corpus_count,
-                "unique_crashes": unique_crashes,
                 "run_time": self._format_runtime(task),
                 "coverage": self._calculate_coverage(stats),
                 "edges_found": stats.get("edges_found", 0)
             })
 
-            # 更新缓存
-            self._stats_cache[task_id] = {
-                "data": stats,
-                "timestamp": datetime.now()
-            }
-
             return stats
 
         except Exception as e:
-            # 返回缓存数据或默认值
-            if task_id in self._stats_cache:
-                cached = self._stats_cache[task_id]
-                if (datetime.now() - cached["timestamp"]).seconds < 30:
-                    return cached["data"]
-
+            # 返回任务上保存的最近一次统计
             return {
                 "exec_count": task.exec_count,
                 "unique_crashes": task.unique_crashes,
                 "run_time": self._format_runtime(task)
             }
 
-    def _parse_fuzzer_stats(self, stats_file: str) -> Dict:
-        """解析 AFL fuzzer_stats 文件"""
-        stats = {}
+    def discover_instances(self, output_dir: Optional[str]) -> List[Tuple[str, str]]:
+        """发现任务输出目录下的所有 AFL 实例目录，返回 (实例名, 路径) 列表
 
-        with open(stats_file, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-
-        # AFL stats 格式示例:
-        # run_time                : 0 days, 00 hrs, 32 min, 15 sec
-        # execs_done              : 1523456
-        # execs_per_sec           : 789.12
-        # unique_crashes           : 3
-        # unique_hangs             : 0
-
-        patterns = {
-            "run_time": r"run_time\s*:\s*(.+)",
-            "execs_done": r"execs_done\s*:\s*(\d+)",
-            "execs_per_sec": r"execs_per_sec\s*:\s*([\d.]+)",
-            "unique_crashes": r"unique_crashes\s*:\s*(\d+)",
-            "unique_hangs": r"unique_hangs\s*:\s*(\d+)",
-            "saved_crashes": r"saved_crashes\s*:\s*(\d+)",
-            "saved_hangs": r"saved_hangs\s*:\s*(\d+)",
-            "last_path": r"last_path\s*:\s*(.+)",
-            "last_crash": r"last_crash\s*:\s*(.+)",
-            "last_hang": r"last_hang\s*:\s*(.+)",
-            "paths_favored": r"paths_favored\s*:\s*(\d+)",
-            "paths_found": r"paths_found\s*:\s*(\d+)",
-            "paths_imported": r"paths_imported\s*:\s*(\d+)",
-            "max_depth": r"max_depth\s*:\s*(\d+)",
-            "cur_path": r"cur_path\s*:\s*(\d+)",
-            "map_size": r"map_size\s*:\s*(\d+)",
-            "map_density": r"map_density\s*:\s*([\d.]+)",
-            "cycles_done": r"cycles_done\s*:\s*(\d+)",
-            "cycles_wo_finds": r"cycles_wo_finds\s*:\s*(\d+)",
-            "timeout_time": r"timeout_time\s*:\s*(\d+)",
-            "unique_hangs": r"unique_hangs\s*:\s*(\d+)",
-            "edges_found": r"edges_found\s*:\s*(\d+)",
-            "edges_total": r"edges_total\s*:\s*(\d+)",
+        -M/-S 模式下每个实例位于 output_dir/<sync_id>，未使用 -M/-S 的
+        dumb 模式运行则直接写入 output_dir 本身。存放共享组样本的
+        shared_corpus/ 不是实例，不计入。
+        """
+        if not output_dir or not os.path.isdir(output_dir):
+            return []
+
+        instances = []
+        if self._is_instance_dir(output_dir):
+            instances.append((".", output_dir))
+
+        for name in sorted(os.listdir(output_dir)):
+            path = os.path.join(output_dir, name)
+            if name != SHARED_CORPUS_DIR and os.path.isdir(path) and self._is_instance_dir(path):
+                instances.append((name, path))
+
+        return instances
+
+    def _is_instance_dir(self, path: str) -> bool:
+        return (os.path.exists(os.path.join(path, "fuzzer_stats")) or
+                os.path.isdir(os.path.join(path, "queue")))
+
+    def _aggregate_instance_stats(self, instances: List[Tuple[str, str]]) -> Dict:
+        """汇总各实例的统计数据：执行次数和速率求和，语料和崩溃取并集"""
+        totals = {
+            "execs_done": 0,
+            "execs_per_sec": 0.0,
+            "corpus_count": 0,
+            "unique_crashes": 0,
+            "unique_hangs": 0,
+            "edges_found": 0,
+            "edges_total": 0,
+            "bitmap_cvg": 0.0,
         }
+        per_instance = []
+
+        for name, path in instances:
+            stats = self._read_fuzzer_stats(os.path.join(path, "fuzzer_stats"))
+
+            instance = {
+                "instance": name,
+                "execs_done": stats.get("execs_done", 0),
+                "execs_per_sec": stats.get("execs_per_sec", 0.0),
+                # 通过 -M/-S 同步导入的样本在来源实例中已经计数
+                "corpus_count": self._count_entries(os.path.join(path, "queue"), skip_synced=True),
+                "unique_crashes": self._count_entries(os.path.join(path, "crashes")),
+                "unique_hangs": self._count_entries(os.path.join(path, "hangs")),
+                "edges_found": stats.get("edges_found", 0),
+                "edges_total": stats.get("edges_total", 0),
+                "bitmap_cvg": stats.get("bitmap_cvg", 0.0),
+                "stability": stats.get("stability", 0.0),
+                "cycles_done": stats.get("cycles_done", 0),
+                "fuzzer_pid": stats.get("fuzzer_pid"),
+            }
+            per_instance.append(instance)
+
+            for key in ("execs_done", "execs_per_sec", "corpus_count", "unique_crashes", "unique_hangs"):
+                totals[key] += instance[key]
+            # 各实例共享同一目标的位图，覆盖取最大值
+            totals["edges_found"] = max(totals["edges_found"], instance["edges_found"])
+            totals["edges_total"] = max(totals["edges_total"], instance["edges_total"])
+            totals["bitmap_cvg"] = max(totals["bitmap_cvg"], instance["bitmap_cvg"])
+
+        totals["execs_per_sec"] = round(totals["execs_per_sec"], 2)
+        totals["exec_count"] = totals["execs_done"]
+        totals["total_execs"] = totals["execs_done"]
+        totals["instance_count"] = len(per_instance)
+        totals["instances"] = per_instance
+        return totals
+
+    def _read_fuzzer_stats(self, stats_file: str) -> Dict:
+        """读取 fuzzer_stats，文件未变化时直接使用缓存的解析结果"""
+        try:
+            st = os.stat(stats_file)
+        except FileNotFoundError:
+            return {}
+
+        key = (stats_file, "stats")
+        validator = (st.st_mtime_ns, st.st_size)
+        stats = self._stat_cache.get(key, validator)
+        if stats is None:
+            stats = self._parse_fuzzer_stats(stats_file)
+            self._stat_cache.put(key, validator, stats)
+        return stats
 
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content)
-            if match:
-                value = match.group(1).strip()
-                # 尝试转换为数字
-                try:
-                    if "." in value:
-                        stats[key] = float(value)
-                    else:
-                        stats[key] = int(value)
-                except ValueError:
-                    stats[key] = value
+    def _count_entries(self, dir_path: str, skip_synced: bool = False) -> int:
+        """统计 AFL 目录中的样本数量，目录未变化时直接使用缓存的计数"""
+        try:
+            st = os.stat(dir_path)
+        except FileNotFoundError:
+            return 0
+
+        key = (dir_path, "count", skip_synced)
+        validator = (st.st_mtime_ns,)
+        count = self._stat_cache.get(key, validator)
+        if count is None:
+            count = sum(
+                1 for f in os.listdir(dir_path)
+                if f.startswith("id:") and not (skip_synced and ",sync:" in f)
+            )
+            self._stat_cache.put(key, validator, count)
+        return count
+
+    def evict_task(self, output_dir: Optional[str]):
+        """删除任务时清理其输出目录相关的缓存"""
+        if output_dir:
+            self._stat_cache.evict_prefix(output_dir)
 
-        return stats
+    def _parse_fuzzer_stats(self, stats_file: str) -> Dict:
+        """解析 AFL fuzzer_stats 文件"""
+        with open(stats_file, "r", encoding="utf-8", errors="ignore") as f:
+            return parse_fuzzer_stats(f)
 
     def _calculate_coverage(self, stats: Dict) -> float:
         """计算覆盖率百分比"""
@@ -145,7 +330,8 @@ class MonitoringService:
         edges_total = stats.get("edges_total", 0)
 
         if edges_total == 0:
-            return 0.0
+            # AFL 2.x 不输出 edges_*，使用位图覆盖率
+            return round(float(stats.get("bitmap_cvg", 0.0) or 0.0), 2)
 
         coverage = (edges_found / edges_total) * 100
         return round(coverage, 2)
@@ -167,7 +353,7 @@ class MonitoringService:
 
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
-    async def get_dashboard_stats(self) -> Dict:
+    def get_dashboard_stats(self) -> Dict:
         """获取仪表盘统计数据"""
         tasks = task_manager.get_all_tasks()
 
@@ -179,11 +365,14 @@ class MonitoringService:
             "failed_tasks": 0,
             "total_crashes": 0,
             "total_executions": 0,
-            "avg_coverage": 0.0
+            "avg_coverage": 0.0,
+            "instrumentation": {}
         }
 
         total_coverage = 0.0
         coverage_count = 0
+        # 插桩方式 -> 运行中任务的执行速度，用于比较不同插桩方式的速度
+        speeds: Dict[str, List[float]] = {}
 
         for task in tasks:
             if task.task_status.name == "RUNNING":
@@ -202,56 +391,58 @@ class MonitoringService:
                 total_coverage += task.coverage
                 coverage_count += 1
 
+            if task.instrumentation:
+                mode = stats["instrumentation"].setdefault(
+                    task.instrumentation.value, {"tasks": 0, "running": 0, "avg_execs_per_sec": 0.0}
+                )
+                mode["tasks"] += 1
+                if task.task_status.name == "RUNNING":
+                    mode["running"] += 1
+                    speeds.setdefault(task.instrumentation.value, []).append(task.execs_per_sec)
+
         if coverage_count > 0:
             stats["avg_coverage"] = round(total_coverage / coverage_count, 2)
 
+        for mode, values in speeds.items():
+            stats["instrumentation"][mode]["avg_execs_per_sec"] = round(sum(values) / len(values), 2)
+
         return stats
 
     def get_crash_files(self, task_id: int) -> list:
-        """获取崩溃文件列表"""
-        task = task_manager.get_task(task_id)
-        if not task:
-            return []
-
-        crashes_dir = os.path.join(task.output_dir, "fuzzer0", "crashes")
-        if not os.path.exists(crashes_dir):
-            return []
-
-        crash_files = []
-        for filename in os.listdir(crashes_dir):
-            if filename.startswith("id:"):
-                filepath = os.path.join(crashes_dir, filename)
-                crash_files.append({
-                    "filename": filename,
-                    "filepath": filepath,
-                    "size": os.path.getsize(filepath),
-                    "mtime": datetime.fromtimestamp(os.path.getmtime(filepath))
-                })
-
-        return sorted(crash_files, key=lambda x: x["mtime"], reverse=True)
+        """获取崩溃文件列表（所有实例）"""
+        return self._list_instance_files(task_id, "crashes")
 
     def get_corpus_files(self, task_id: int) -> list:
-        """获取语料库文件列表"""
+        """获取语料库文件列表（所有实例，不含同步导入的副本）"""
+        return self._list_instance_files(task_id, "queue", skip_synced=True)
+
+    def _list_instance_files(self, task_id: int, subdir: str, skip_synced: bool = False) -> list:
+        """列出所有实例某个子目录下的样本文件，按修改时间倒序"""
         task = task_manager.get_task(task_id)
         if not task:
             return []
 
-        queue_dir = os.path.join(task.output_dir, "fuzzer0", "queue")
-        if not os.path.exists(queue_dir):
-            return []
-
-        corpus_files = []
-        for filename in os.listdir(queue_dir):
-            if filename.startswith("id:"):
-                filepath = os.path.join(queue_dir, filename)
-                corpus_files.append({
+        files = []
+        for instance, path in self.discover_instances(task.output_dir):
+            dir_path = os.path.join(path, subdir)
+            if not os.path.isdir(dir_path):
+                continue
+
+            for filename in os.listdir(dir_path):
+                if not filename.startswith("id:"):
+                    continue
+                if skip_synced and ",sync:" in filename:
+                    continue
+                filepath = os.path.join(dir_path, filename)
+                files.append({
+                    "instance": instance,
                     "filename": filename,
                     "filepath": filepath,
                     "size": os.path.getsize(filepath),
                     "mtime": datetime.fromtimestamp(os.path.getmtime(filepath))
                 })
 
-        return sorted(corpus_files, key=lambda x: x["mtime"], reverse=True)
+        return sorted(files, key=lambda x: x["mtime"], reverse=True)
 
 
 # 全局实例
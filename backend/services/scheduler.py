@@ -0,0 +1,160 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from models import TaskStatus
+from services.task_manager import task_manager
+
+
+class Scheduler:
+    """调度服务 - 负责 CPU 核心分配、实例绑核和任务排队准入"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cores = self._detect_cores()
+        # task_id -> 分配给该任务的核心列表
+        self._assigned: Dict[int, List[int]] = {}
+        # 等待核心释放的任务队列 (task_id, fuzzer_count)
+        self._queue: List[Tuple[int, int]] = []
+        self._restore_queued_tasks()
+
+    def _detect_cores(self) -> List[int]:
+        """获取可用于 fuzz 的 CPU 核心"""
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+
+        if settings.scheduler_cores > 0:
+            cores = cores[:settings.scheduler_cores]
+        return cores
+
+    def _restore_queued_tasks(self):
+        """队列只保存在内存中，重启后将遗留的排队任务恢复为就绪状态"""
+        for task in task_manager.get_all_tasks():
+            if task.task_status == TaskStatus.QUEUED:
+                task.queue_position = None
+                task_manager.update_task_status(task.id, TaskStatus.READY)
+
+    @property
+    def total_cores(self) -> int:
+        return len(self._cores)
+
+    def free_cores(self) -> List[int]:
+        """获取当前空闲的核心"""
+        with self._lock:
+            return self._free_cores()
+
+    def _free_cores(self) -> List[int]:
+        busy = {core for cores in self._assigned.values() for core in cores}
+        return [core for core in self._cores if core not in busy]
+
+    def _can_admit(self, fuzzer_count: int) -> bool:
+        if len(self._assigned) >= settings.max_tasks:
+            return False
+        return len(self._free_cores()) >= fuzzer_count
+
+    def submit(self, task_id: int, fuzzer_count: int) -> Tuple[bool, Optional[str]]:
+        """提交任务：核心充足时立即启动，否则进入排队状态"""
+        task = task_manager.get_task(task_id)
+        if not task:
+            return False, "任务不存在"
+
+        if task.task_status != TaskStatus.READY:
+            return False, "任务未就绪"
+
+        if fuzzer_count > self.total_cores:
+            return False, f"Fuzzer 实例数超过可用核心数 ({self.total_cores})"
+
+        with self._lock:
+            # 已有排队任务时新任务也必须排队，保证先到先得
+            if self._queue or not self._can_admit(fuzzer_count):
+                self._queue.append((task_id, fuzzer_count))
+                task.fuzzer_count = fuzzer_count
+                self._update_queue_positions()
+                task_manager.update_task_status(task_id, TaskStatus.QUEUED)
+                return True, None
+
+            cores = self._free_cores()[:fuzzer_count]
+            self._assigned[task_id] = cores
+
+        if not task_manager.start_fuzz(task_id, fuzzer_count, cores):
+            self.release(task_id)
+            return False, task.error_message or "任务启动失败"
+
+        return True, None
+
+    def cancel(self, task_id: int) -> bool:
+        """取消排队中的任务，恢复为就绪状态"""
+        with self._lock:
+            if not self._remove_from_queue(task_id):
+                return False
+
+        task_manager.update_task_status(task_id, TaskStatus.READY)
+        return True
+
+    def release(self, task_id: int):
+        """释放任务占用的核心（或移出队列），并尝试启动排队任务"""
+        with self._lock:
+            self._assigned.pop(task_id, None)
+            self._remove_from_queue(task_id)
+
+        self._drain()
+
+    def _remove_from_queue(self, task_id: int) -> bool:
+        for i, (queued_id, _) in enumerate(self._queue):
+            if queued_id == task_id:
+                del self._queue[i]
+                task = task_manager.get_task(task_id)
+                if task:
+                    task.queue_position = None
+                self._update_queue_positions()
+                return True
+        return False
+
+    def _update_queue_positions(self):
+        for position, (task_id, _) in enumerate(self._queue, 1):
+            task = task_manager.get_task(task_id)
+            if task:
+                task.queue_position = position
+
+    def _drain(self):
+        """按先后顺序启动排队任务，直到队首任务无法获得足够的核心"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+
+                task_id, fuzzer_count = self._queue[0]
+                if not self._can_admit(fuzzer_count):
+                    return
+
+                self._queue.pop(0)
+                cores = self._free_cores()[:fuzzer_count]
+                self._assigned[task_id] = cores
+
+                task = task_manager.get_task(task_id)
+                if task:
+                    task.queue_position = None
+                    task.task_status = TaskStatus.READY
+                self._update_queue_positions()
+
+            if not task_manager.start_fuzz(task_id, fuzzer_count, cores):
+                with self._lock:
+                    self._assigned.pop(task_id, None)
+
+    def get_status(self) -> Dict:
+        """获取调度器状态"""
+        with self._lock:
+            return {
+                "total_cores": len(self._cores),
+                "free_cores": self._free_cores(),
+                "assigned": {task_id: list(cores) for task_id, cores in self._assigned.items()},
+                "queue": [task_id for task_id, _ in self._queue],
+                "max_tasks": settings.max_tasks,
+            }
+
+
+# 全局实例
+scheduler = Scheduler()
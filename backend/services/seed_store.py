@@ -0,0 +1,319 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from typing import IO, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from services.uploads import HashingFile
+
+
+# 种子集名称：字母、数字、下划线、点和横线，以字母或数字开头（排除 . 和 ..）
+_SET_NAME = re.compile(r"^[A-Za-z0-9][\w.-]{0,63}$")
+
+_SET_MANIFEST = ".seedset.json"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SeedStore:
+    """内容寻址的种子存储
+
+    种子内容按 sha256 保存为只读的 blobs/<前两位>/<哈希> 文件，任务的种子
+    目录和命名种子集中的文件都是它的硬链接，相同内容只占一份磁盘空间。
+    引用计数即文件的链接数：删除任务后链接数只剩 1（仅存储自身）的
+    blob 会被回收。afl-fuzz 把初始语料硬链接进 queue/ 时同样计入引用。
+    无法硬链接（跨文件系统）时退化为复制。
+
+    put / put_stream / put_file 返回的内容在调用 release(..., pinned=True)
+    之前不会被回收，避免并发的 release 在链接到目录之前删除它。
+    """
+
+    def __init__(self, root: str):
+        self._lock = threading.Lock()
+        # sha256 -> 尚未链接到目录的 put 次数
+        self._pins: Dict[str, int] = {}
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.sets_dir = os.path.join(root, "sets")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.sets_dir, exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def put(self, content: bytes) -> str:
+        """保存内容，返回 sha256；已存在的内容不重复写入"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest)
+        with self._lock:
+            self._pin(digest)
+            if os.path.exists(path):
+                return digest
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            self._commit(tmp, path)
+        return digest
+
+    def put_stream(self, stream: IO[bytes], limit: Optional[int] = None) -> str:
+        """从流中保存内容，返回 sha256，内容超过 limit 字节时抛出 ValueError
+
+        上传的临时文件在接收时已计算哈希，直接硬链接进存储；其他流（例如
+        压缩包中的文件）分块写入，同时计算哈希，不在内存中保留完整内容。
+        """
+        if isinstance(stream, HashingFile):
+            if limit is not None and stream.size > limit:
+                raise ValueError("文件过大")
+            digest = stream.hexdigest()
+            path = self.blob_path(digest)
+            with self._lock:
+                self._pin(digest)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = self._temp_path()
+                    stream.link_to(tmp)
+                    self._commit(tmp, path)
+            return digest
+
+        tmp = self._temp_path()
+        digest, size = hashlib.sha256(), 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+                    size += len(chunk)
+                    if limit is not None and size > limit:
+                        raise ValueError("文件过大")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        path = self.blob_path(digest.hexdigest())
+        with self._lock:
+            self._pin(digest.hexdigest())
+            if os.path.exists(path):
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._commit(tmp, path)
+        return digest.hexdigest()
+
+    def put_file(self, filepath: str) -> str:
+        """保存本地文件的内容，返回 sha256"""
+        with open(filepath, "rb") as f:
+            return self.put_stream(f)
+
+    def _pin(self, digest: str):
+        self._pins[digest] = self._pins.get(digest, 0) + 1
+
+    def _pin_existing(self, digest: str) -> bool:
+        """内容已在存储中时保留它（同 put），否则返回 False"""
+        with self._lock:
+            if not os.path.exists(self.blob_path(digest)):
+                return False
+            self._pin(digest)
+            return True
+
+    def _temp_path(self) -> str:
+        fd, tmp = tempfile.mkstemp(dir=self.blobs_dir, prefix=".tmp_")
+        os.close(fd)
+        return tmp
+
+    def _commit(self, tmp: str, path: str):
+        """以只读权限放入最终位置，防止通过硬链接修改共享内容"""
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+
+    def link(self, digest: str, dest: str):
+        """把 blob 链接到 dest（已存在时替换）"""
+        try:
+            os.link(self.blob_path(digest), dest)
+            return
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(self.blob_path(digest), dest)
+            return
+
+        tmp = f"{dest}.linking"
+        os.link(self.blob_path(digest), tmp)
+        os.replace(tmp, dest)
+
+    def digests(self, directory: str) -> Dict[str, str]:
+        """目录中的文件内容 -> 文件名"""
+        result = {}
+        if not os.path.isdir(directory):
+            return result
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                result.setdefault(_sha256_file(entry.path), entry.name)
+        return result
+
+    def add_files(self, directory: str, files: Iterable[Tuple[str, str]]) -> Tuple[int, int]:
+        """把已入库的 (文件名, sha256) 链接到目录，内容已存在的跳过
+
+        文件名冲突而内容不同时在文件名后追加哈希前缀。返回 (新增数, 重复数)。
+        """
+        os.makedirs(directory, exist_ok=True)
+        existing = self.digests(directory)
+        taken = set(os.listdir(directory))
+        added = duplicates = 0
+        for name, digest in files:
+            if digest in existing:
+                duplicates += 1
+                continue
+            if name in taken:
+                name = f"{name}.{digest[:8]}"
+            self.link(digest, os.path.join(directory, name))
+            taken.add(name)
+            existing[digest] = name
+            added += 1
+        return added, duplicates
+
+    def release(self, digests: Iterable[str], pinned: bool = False) -> int:
+        """回收不再被引用的 blob（链接数为 1），返回回收数量
+
+        pinned 为 True 时 digests 是 put 返回的内容（每次 put 对应一项），
+        先解除 put 时的保留；仍被其他未完成的上传保留的内容不回收。
+        """
+        digests = list(digests)
+        removed = 0
+        with self._lock:
+            if pinned:
+                for digest in digests:
+                    count = self._pins.get(digest, 0) - 1
+                    if count > 0:
+                        self._pins[digest] = count
+                    else:
+                        self._pins.pop(digest, None)
+
+            for digest in set(digests):
+                if digest in self._pins:
+                    continue
+                path = self.blob_path(digest)
+                try:
+                    if os.stat(path).st_nlink <= 1:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    def list_sets(self) -> List[Dict]:
+        sets = []
+        for name in sorted(os.listdir(self.sets_dir)):
+            info = self.get_set(name)
+            if info:
+                info.pop("files")
+                sets.append(info)
+        return sets
+
+    def get_set(self, name: str) -> Optional[Dict]:
+        """种子集信息和文件列表"""
+        directory = self._set_dir(name)
+        if not directory or not os.path.isdir(directory):
+            return None
+
+        try:
+            with open(os.path.join(directory, _SET_MANIFEST), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        files = []
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if entry.is_file() and not entry.name.startswith("."):
+                files.append({"name": entry.name, "size": entry.stat().st_size})
+        return {
+            "name": name,
+            "description": manifest.get("description", ""),
+            "created_at": manifest.get("created_at"),
+            "file_count": len(files),
+            "total_size": sum(f["size"] for f in files),
+            "files": files,
+        }
+
+    def save_set(self, name: str, files: Iterable[Tuple[str, str]],
+                 description: str = "") -> Tuple[int, int]:
+        """把 (文件名, sha256) 加入种子集（不存在时创建），返回 (新增数, 重复数)"""
+        directory = self._set_dir(name)
+        if not directory:
+            raise ValueError("种子集名称只能包含字母、数字、下划线、点和横线，并以字母或数字开头")
+
+        manifest_path = os.path.join(directory, _SET_MANIFEST)
+        result = self.add_files(directory, files)
+        if not os.path.exists(manifest_path) or description:
+            with open(manifest_path, "w") as f:
+                json.dump({"description": description, "created_at": datetime.now().isoformat()}, f)
+        return result
+
+    def save_set_from_dir(self, name: str, source_dir: str, description: str = "") -> Tuple[int, int]:
+        """把目录中的文件（例如任务当前的种子）保存为种子集"""
+        files = []
+        try:
+            for digest, filename in self.digests(source_dir).items():
+                if not self._pin_existing(digest):
+                    digest = self.put_file(os.path.join(source_dir, filename))
+                files.append((filename, digest))
+            return self.save_set(name, files, description)
+        finally:
+            self.release((digest for _, digest in files), pinned=True)
+
+    def apply_set(self, name: str, directory: str, replace: bool = False) -> Tuple[int, int]:
+        """把种子集链接到目录（任务的种子目录），不重新上传"""
+        seed_set = self._set_dir(name)
+        if not seed_set or not os.path.isdir(seed_set):
+            raise KeyError(name)
+
+        if replace:
+            self.clear_dir(directory)
+        return self.add_files(directory, [(filename, digest) for digest, filename in self.digests(seed_set).items()])
+
+    def delete_set(self, name: str) -> bool:
+        directory = self._set_dir(name)
+        if not directory or not os.path.isdir(directory):
+            return False
+        self.remove_dir(directory)
+        return True
+
+    def _set_dir(self, name: str) -> Optional[str]:
+        """种子集目录，名称不合法或解析后不在 sets/ 下（如符号链接）时返回 None"""
+        if not _SET_NAME.match(name):
+            return None
+        directory = os.path.join(self.sets_dir, name)
+        if os.path.dirname(os.path.realpath(directory)) != os.path.realpath(self.sets_dir):
+            return None
+        return directory
+
+    def clear_dir(self, directory: str):
+        """清空目录中的种子并回收不再被引用的 blob"""
+        digests = list(self.digests(directory))
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                os.unlink(entry.path)
+        self.release(digests)
+
+    def remove_dir(self, directory: str):
+        """删除目录并回收其中不再被引用的 blob"""
+        if not os.path.isdir(directory):
+            return
+        digests = list(self.digests(directory))
+        shutil.rmtree(directory, ignore_errors=True)
+        self.release(digests)
+
+
+# 全局实例
+seed_store = SeedStore(settings.seed_store_dir)
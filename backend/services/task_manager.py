@@ -1,18 +1,29 @@
 import os
 import shutil
 import json
-import asyncio
 import signal
 import subprocess
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set
 from pathlib import Path
 
 from config import settings
-from models import Task, TaskType, TaskStatus, InputType
+from models import Task, TaskType, TaskStatus, InputType, BuildVariant
+from services.watcher import task_watcher
+from services.fuzzer_logs import fuzzer_logs
 
 _UNSET = object()
 
+# 重新开始 fuzz 时，之前的输出移动到输出目录下的这个子目录中
+SESSIONS_DIR = "sessions"
+
+# 每个 sessions/<时间>/ 中保存该轮 fuzz 的实例变体分配（task.fuzzer_variants）
+SESSION_VARIANTS_FILE = "fuzzer_variants.json"
+
+# 语料共享组中其他任务的样本放在输出目录下的这个伪实例目录中，
+# afl-fuzz -M/-S 同步时会像读取其他实例一样读取它的 queue/
+SHARED_CORPUS_DIR = "shared_corpus"
+
 
 class TaskManager:
     """任务管理器 - 负责任务的创建、启动、停止和状态管理"""
@@ -20,7 +31,11 @@ class TaskManager:
     _instance = None
     _tasks: Dict[int, Task] = {}
     _task_id_counter = 0
-    _task_processes: Dict[int, subprocess.Popen] = {}
+    _task_processes: Dict[int, List[subprocess.Popen]] = {}
+    # 正在停止的任务，进程退出后由 stop_task 设置状态，定时检查不处理
+    _stopping: Set[int] = set()
+    # 任务状态变化监听器: (task_id, status)
+    _status_listeners: List[Callable[[int, TaskStatus], None]] = []
 
     def __new__(cls):
         if cls._instance is None:
@@ -31,6 +46,8 @@ class TaskManager:
         """初始化任务管理器"""
         if not hasattr(self, '_initialized'):
             self._load_tasks()
+            task_watcher.add_listener(self._on_watch_event)
+            task_watcher.add_tick_listener(self._check_running_tasks)
             self._initialized = True
 
     @classmethod
@@ -103,6 +120,10 @@ class TaskManager:
         """获取所有任务"""
         return list(self._tasks.values())
 
+    def add_status_listener(self, listener: Callable[[int, TaskStatus], None]):
+        """注册任务状态变化监听器，单个实例退出时也会通知"""
+        self._status_listeners.append(listener)
+
     def update_task_status(self, task_id: int, status: TaskStatus, error_message=_UNSET):
         """更新任务状态"""
         task = self._tasks.get(task_id)
@@ -119,6 +140,29 @@ class TaskManager:
 
         self._save_task(task)
 
+        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.STOPPED]:
+            self._on_task_finished(task_id)
+
+        self._notify_status(task_id, status)
+
+    def _notify_status(self, task_id: int, status: TaskStatus):
+        for listener in list(self._status_listeners):
+            try:
+                listener(task_id, status)
+            except Exception as e:
+                print(f"任务状态监听器执行失败: {e}")
+
+    def _on_task_finished(self, task_id: int):
+        """任务结束后停止监听输出目录，并通知调度器释放 CPU 核心"""
+        from services.scheduler import scheduler
+
+        task_watcher.unwatch_task(task_id)
+
+        task = self._tasks.get(task_id)
+        if task:
+            task.cpu_cores = []
+        scheduler.release(task_id)
+
     def _save_task(self, task: Task):
         """保存任务到文件"""
         task_file = os.path.join(settings.tasks_dir, f"task_{task.id}", "task.json")
@@ -188,13 +232,29 @@ class TaskManager:
         if not task:
             return False
 
-        # 停止正在运行的任务
-        if task.task_status == TaskStatus.RUNNING:
+        # 停止正在运行的任务，取消编译
+        if task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED):
             self.stop_task(task_id)
+        elif task.task_status == TaskStatus.COMPILING:
+            from services import build_queue
+            build_queue.cancel(task_id)
 
         # 删除进程记录
-        if task_id in self._task_processes:
-            del self._task_processes[task_id]
+        self._task_processes.pop(task_id, None)
+
+        # 停止监听并移出调度队列
+        self._on_task_finished(task_id)
+
+        # 清理统计缓存、时间序列、输出日志和崩溃索引
+        from services import monitoring_service, metrics_store, crash_index, seed_store, coverage_service
+        monitoring_service.evict_task(task.output_dir)
+        metrics_store.evict_task(task_id)
+        coverage_service.evict_task(task_id)
+        fuzzer_logs.reset(task_id)
+        crash_index.delete_task(task_id)
+
+        # 删除目录后回收不再被任何任务或种子集引用的种子
+        seed_digests = list(seed_store.digests(os.path.join(settings.seeds_dir, f"task_{task_id}")))
 
         # 删除任务数据
         if task_id in self._tasks:
@@ -205,11 +265,60 @@ class TaskManager:
             task_dir = os.path.join(base_dir, f"task_{task_id}")
             if os.path.exists(task_dir):
                 shutil.rmtree(task_dir)
+        seed_store.release(seed_digests)
+
+        return True
+
+    def set_share_group(self, task_id: int, group: Optional[str]) -> bool:
+        """设置任务的语料共享组，group 为 None 时退出共享"""
+        task = self._tasks.get(task_id)
+        if not task:
+            return False
 
+        task.share_group = group
+        self._save_task(task)
+        return True
+
+    def reseed(self, task_id: int, seeds_dir: str) -> bool:
+        """以新的初始语料开始新一轮 fuzz（例如语料精简之后）
+
+        afl-fuzz 不会在已有较长运行记录的输出目录上重新开始，而且全新启动
+        会清空 crashes/，因此之前的输出整体移动到 sessions/<时间>/ 下保留，
+        崩溃索引中的路径随之更新。任务恢复为就绪状态，由调用方重新启动。
+        """
+        task = self._tasks.get(task_id)
+        if not task or task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED, TaskStatus.QUEUED):
+            return False
+
+        from services import monitoring_service, crash_index
+
+        session = os.path.join(SESSIONS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        entries = [name for name in os.listdir(task.output_dir) if name != SESSIONS_DIR]
+        if entries:
+            session_dir = os.path.join(task.output_dir, session)
+            os.makedirs(session_dir)
+            for name in entries:
+                os.rename(os.path.join(task.output_dir, name), os.path.join(session_dir, name))
+            # 新一轮 fuzz 会覆盖 fuzzer_variants，之前实例发现的样本仍需用原来的变体重放
+            with open(os.path.join(session_dir, SESSION_VARIANTS_FILE), "w") as f:
+                json.dump(task.fuzzer_variants, f)
+            crash_index.relocate_task(task_id, session, entries)
+
+        monitoring_service.evict_task(task.output_dir)
+        fuzzer_logs.reset(task_id)
+
+        task.seeds_dir = seeds_dir
+        self.update_task_stats(
+            task_id, exec_count=0, unique_crashes=0, unique_hangs=0, total_execs=0,
+            execs_per_sec=0.0, corpus_count=0, coverage=0.0, edges_found=0
+        )
+        task.started_at = None
+        task.completed_at = None
+        self.update_task_status(task_id, TaskStatus.READY, None)
         return True
 
-    def start_fuzz(self, task_id: int, fuzzer_count: int = 1) -> bool:
-        """启动 Fuzz 测试"""
+    def start_fuzz(self, task_id: int, fuzzer_count: int = 1, cores: Optional[List[int]] = None) -> bool:
+        """启动 Fuzz 测试，cores 指定时第 i 个实例绑定到 cores[i]"""
         task = self._tasks.get(task_id)
         if not task:
             return False
@@ -217,12 +326,10 @@ class TaskManager:
         if task.task_status != TaskStatus.READY:
             return False
 
+        processes: List[subprocess.Popen] = []
         try:
             self.update_task_status(task_id, TaskStatus.RUNNING)
 
-            # 构建 AFL 命令
-            command = self._build_afl_command(task, fuzzer_count)
-
             # 创建输出目录结构
             for i in range(fuzzer_count):
                 fuzzer_output_dir = os.path.join(task.output_dir, f"fuzzer{i}")
@@ -230,49 +337,133 @@ class TaskManager:
                 os.makedirs(os.path.join(fuzzer_output_dir, "crashes"), exist_ok=True)
                 os.makedirs(os.path.join(fuzzer_output_dir, "hangs"), exist_ok=True)
 
-            # 启动主 fuzzer
             env = os.environ.copy()
             env["AFL_I_DONT_CARE_ABOUT_MISSING_CRASHES"] = "1"
             env["AFL_SKIP_CPUFREQ"] = "1"
+            if cores:
+                # 由调度器负责绑核，避免 AFL 自行选择核心
+                env["AFL_NO_AFFINITY"] = "1"
+            if settings.afl_no_ui:
+                env["AFL_NO_UI"] = "1"
+
+            # 输出由 fuzzer_logs 持续读取，避免管道写满后阻塞 fuzzer
+            fuzzer_logs.reset(task_id)
+            output = subprocess.PIPE if settings.fuzzer_log_size > 0 else subprocess.DEVNULL
+
+            # 启动主 fuzzer（fuzzer0）和从 fuzzer（fuzzer1..N-1），
+            # 每个实例放在独立的进程组中，便于连同目标子进程一起发送信号
+            fuzzer_variants = self._assign_variants(task, fuzzer_count)
+            for i in range(fuzzer_count):
+                command = self._build_afl_command(task, i, fuzzer_count, fuzzer_variants[i])
+                process = subprocess.Popen(
+                    command,
+                    shell=False,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                    env=env,
+                    start_new_session=True,
+                    preexec_fn=self._pin_to_core(cores[i]) if cores else None
+                )
+                processes.append(process)
+                if process.stdout:
+                    fuzzer_logs.attach(task_id, f"fuzzer{i}", process.stdout)
 
-            # 启动进程
-            process = subprocess.Popen(
-                command,
-                shell=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=env
-            )
-
-            self._task_processes[task_id] = process
-            task.pid = process.pid
+            self._task_processes[task_id] = processes
+            task.pid = processes[0].pid
+            task.pids = [process.pid for process in processes]
             task.fuzzer_count = fuzzer_count
+            task.fuzzer_variants = fuzzer_variants
+            task.instance_exits = {}
+            task.cpu_cores = list(cores or [])
+            self._save_task(task)
 
-            # 在线程中启动监控任务
-            import threading
-            monitor_thread = threading.Thread(
-                target=self._monitor_task_sync,
-                args=(task_id,),
-                daemon=True
-            )
-            monitor_thread.start()
+            # 监听输出目录变化，由监听线程统一刷新统计和检查进程
+            task_watcher.watch_task(task_id, task.output_dir)
 
             return True
 
         except Exception as e:
+            # 清理已启动的实例
+            for process in processes:
+                self._kill_process(process)
             self.update_task_status(task_id, TaskStatus.FAILED, str(e))
             return False
 
-    def _build_afl_command(self, task: Task, fuzzer_count: int) -> List[str]:
-        """构建 AFL 命令"""
+    def _pin_to_core(self, core: int) -> Optional[Callable[[], None]]:
+        """在子进程 exec 之前绑定核心，afl-fuzz 启动的 forkserver 和目标程序继承该亲和性"""
+        if not hasattr(os, "sched_setaffinity"):
+            return None
+        return lambda: os.sched_setaffinity(0, {core})
+
+    def _assign_variants(self, task: Task, fuzzer_count: int) -> List[str]:
+        """为实例分配编译变体
+
+        主实例（fuzzer0）运行 plain，其余变体（asan / ubsan / cmplog）依次
+        分配给从实例各一个，剩下的从实例运行 plain；实例数不足时靠后的
+        变体不运行。
+        """
+        assignment = [BuildVariant.PLAIN.value] * fuzzer_count
+        extra = [variant.value for variant in BuildVariant
+                 if variant != BuildVariant.PLAIN and variant.value in task.variants]
+        for i, variant in enumerate(extra[:max(0, fuzzer_count - 1)], 1):
+            assignment[i] = variant
+        return assignment
+
+    def instance_binary(self, task: Task, instance: str) -> Optional[str]:
+        """实例运行的目标程序（cmplog 实例的目标程序为 plain），用于重放该实例发现的样本
+
+        instance 为崩溃索引中的实例名：当前一轮为 fuzzerN，之前几轮为
+        sessions/<时间>/fuzzerN，变体分配从该轮保存的记录中读取。
+        """
+        session, name = os.path.split(instance)
+        fuzzer_variants = self._session_variants(task, session) if session else task.fuzzer_variants
+
+        index = name[len("fuzzer"):] if name.startswith("fuzzer") else ""
+        variant = BuildVariant.PLAIN.value
+        if index.isdigit() and int(index) < len(fuzzer_variants):
+            variant = fuzzer_variants[int(index)]
+        if variant == BuildVariant.CMPLOG.value:
+            variant = BuildVariant.PLAIN.value
+        return task.variants.get(variant) or task.target_binary
+
+    def sample_binary(self, task: Task, filepath: str) -> Optional[str]:
+        """输出目录中的样本对应实例运行的目标程序
+
+        实例名取自崩溃索引，不在索引中的样本（如精简结果）按路径推导，
+        与崩溃索引的推导方式一致。
+        """
+        from services import crash_index
+
+        sample = os.path.relpath(filepath, task.output_dir)
+        row = crash_index.get(task.id, sample)
+        instance = row["instance"] if row else os.path.dirname(os.path.dirname(sample))
+        return self.instance_binary(task, instance)
+
+    def _session_variants(self, task: Task, session: str) -> List[str]:
+        """之前一轮 fuzz 的实例变体分配，没有记录时视为全部为 plain"""
+        try:
+            with open(os.path.join(task.output_dir, session, SESSION_VARIANTS_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _build_afl_command(self, task: Task, fuzzer_id: int, fuzzer_count: int,
+                           variant: str = BuildVariant.PLAIN.value) -> List[str]:
+        """构建第 fuzzer_id 个 AFL 实例的命令，variant 为实例运行的编译变体"""
         command = [settings.afl_path]
 
         # 基础参数
         command.extend(["-i", task.seeds_dir])  # 输入目录
-        command.extend(["-o", task.output_dir])  # 输出目录
 
-        # 内存限制 - 在虚拟化环境中不进行 CPU 节流检测
-        command.extend(["-m", "none"])
+        # 输出目录 - dumb 模式不支持 -M/-S 同步，每个实例直接写入各自的 fuzzerN 目录
+        if task.type == TaskType.BLACKBOX:
+            command.extend(["-o", os.path.join(task.output_dir, f"fuzzer{fuzzer_id}")])
+        else:
+            command.extend(["-o", task.output_dir])
+
+        # 内存限制 - ASan 需要保留大量虚拟地址空间，只能不限制
+        memory_limit = "none" if variant == BuildVariant.ASAN.value else settings.afl_memory_limit
+        command.extend(["-m", memory_limit])
 
         # 超时时间 - 使用 AFL 默认值，除非用户自定义
         timeout_customized = False
@@ -294,98 +485,119 @@ class TaskManager:
                 command.insert(1, "-n")  # 使用 dumb fuzzer 模式
 
         # 多实例模式（dumb 模式下不支持 -M/-S）
-        if task.type == TaskType.WHITEBOX and fuzzer_count > 1:
+        if task.type == TaskType.WHITEBOX and fuzzer_count > 1 and fuzzer_id == 0:
             command.extend(["-M", "fuzzer0"])
         elif task.type == TaskType.WHITEBOX:
-            # 单实例模式使用 -S
-            command.extend(["-S", "fuzzer0"])
+            # 单实例模式和从实例使用 -S
+            command.extend(["-S", f"fuzzer{fuzzer_id}"])
 
-        # 目标程序
-        command.extend(["--", task.target_binary])
+        # 目标程序，cmplog 实例以 -c 指定 CmpLog 目标程序，主目标程序仍为 plain
+        target = task.variants.get(variant) or task.target_binary
+        if variant == BuildVariant.CMPLOG.value:
+            command.extend(["-c", target])
+            target = task.target_binary
+        command.extend(["--", target])
 
         return command
 
-    def _monitor_task_sync(self, task_id: int):
-        """监控任务状态（同步版本，用于线程）"""
-        import time
-        from services import monitoring_service
+    def _check_processes(self, task_id: int) -> bool:
+        """检查任务的 fuzzer 进程，记录单个实例的退出，全部退出时更新任务状态并返回 False"""
+        processes = self._task_processes.get(task_id)
+        if not processes or task_id in self._stopping:
+            return True
 
         task = self._tasks.get(task_id)
-        if not task:
-            return
+        for i, process in enumerate(processes):
+            instance = f"fuzzer{i}"
+            if task and process.poll() is not None and instance not in task.instance_exits:
+                self._record_instance_exit(task, instance, process.returncode)
 
-        while task.task_status == TaskStatus.RUNNING:
-            # 更新统计信息
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                stats = loop.run_until_complete(monitoring_service.get_task_stats(task_id))
-                loop.close()
-
-                if stats:
-                    self.update_task_stats(
-                        task_id,
-                        exec_count=stats.get("exec_count", 0),
-                        unique_crashes=stats.get("unique_crashes", 0),
-                        total_execs=stats.get("total_execs", 0),
-                        execs_per_sec=stats.get("execs_per_sec", 0.0),
-                        corpus_count=stats.get("corpus_count", 0),
-                        coverage=stats.get("coverage", 0.0),
-                        edges_found=stats.get("edges_found", 0)
-                    )
-            except Exception as e:
-                print(f"监控任务统计失败: {e}")
+        if any(process.poll() is None for process in processes):
+            return True
 
-            # 检查进程是否还在运行
-            if task_id in self._task_processes:
-                process = self._task_processes[task_id]
-                if process.poll() is not None:
-                    # 进程已退出
-                    return_code = process.returncode
-                    if return_code != 0:
-                        self.update_task_status(task_id, TaskStatus.FAILED, f"进程异常退出，返回码: {return_code}")
-                    else:
-                        self.update_task_status(task_id, TaskStatus.COMPLETED)
-                    break
-
-            time.sleep(2)
-
-    async def _monitor_task(self, task_id: int):
-        """监控任务状态"""
-        task = self._tasks.get(task_id)
-        if not task:
-            return
+        # 所有实例均已退出
+        self._task_processes.pop(task_id, None)
+        return_codes = [process.returncode for process in processes]
+        failed = [code for code in return_codes if code != 0]
+        if failed:
+            message = f"进程异常退出，返回码: {failed[0]}"
+            output = fuzzer_logs.last_lines(task_id)
+            if output:
+                message = f"{message}\n{output}"
+            self.update_task_status(task_id, TaskStatus.FAILED, message)
+        else:
+            self.update_task_status(task_id, TaskStatus.COMPLETED)
+        return False
+
+    def _record_instance_exit(self, task: Task, instance: str, return_code: int):
+        """记录实例的退出原因（例如 cmplog 实例的 -c 参数不被 afl-fuzz 支持），其他实例继续运行"""
+        message = f"{instance} 进程退出，返回码: {return_code}"
+        output = fuzzer_logs.last_lines(task.id, instance=instance)
+        if output:
+            message = f"{message}\n{output}"
+        print(f"任务 {task.id} 的 {message}")
+
+        task.instance_exits[instance] = message
+        if return_code != 0:
+            task.error_message = message
+        task.last_updated = datetime.now()
+        self._save_task(task)
+        self._notify_status(task.id, task.task_status)
 
+    def _on_watch_event(self, task_id: int, kind: str, paths: List[str]):
+        """任务输出目录发生变化（fuzzer_stats 更新、新样本、新崩溃）时刷新统计"""
+        task = self._tasks.get(task_id)
+        if task and task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED):
+            self._refresh_task_stats(task_id)
+
+    def _check_running_tasks(self):
+        """定时检查所有任务的 fuzzer 进程是否退出"""
+        for task_id in list(self._task_processes):
+            if not self._check_processes(task_id):
+                # 进程退出后同步最后一次统计
+                self._refresh_task_stats(task_id)
+
+    def _refresh_task_stats(self, task_id: int):
+        """从 AFL 输出目录读取统计并更新任务"""
         from services import monitoring_service
 
-        while task.task_status == TaskStatus.RUNNING:
-            # 更新统计信息
-            stats = await monitoring_service.get_task_stats(task_id)
+        try:
+            stats = monitoring_service.get_task_stats(task_id)
+
             if stats:
                 self.update_task_stats(
                     task_id,
                     exec_count=stats.get("exec_count", 0),
                     unique_crashes=stats.get("unique_crashes", 0),
+                    unique_hangs=stats.get("unique_hangs", 0),
                     total_execs=stats.get("total_execs", 0),
                     execs_per_sec=stats.get("execs_per_sec", 0.0),
                     corpus_count=stats.get("corpus_count", 0),
                     coverage=stats.get("coverage", 0.0),
                     edges_found=stats.get("edges_found", 0)
                 )
+        except Exception as e:
+            print(f"监控任务统计失败: {e}")
 
-            # 检查进程是否还在运行
-            if task_id in self._task_processes:
-                process = self._task_processes[task_id]
-                if process.poll() is not None:
-                    # 进程已退出
-                    return_code = process.returncode
-                    if return_code != 0:
-                        self.update_task_status(task_id, TaskStatus.FAILED, f"进程异常退出，返回码: {return_code}")
-                    else:
-                        self.update_task_status(task_id, TaskStatus.COMPLETED)
-                    break
-
-            await asyncio.sleep(2)
+    def _signal_processes(self, task_id: int, sig: int):
+        """向任务的所有 fuzzer 进程组发送信号"""
+        for process in self._task_processes.get(task_id, []):
+            if process.poll() is not None:
+                continue
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _kill_process(self, process: subprocess.Popen):
+        """强制结束 fuzzer 进程组"""
+        if process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
 
     def stop_task(self, task_id: int) -> bool:
         """停止任务"""
@@ -393,30 +605,34 @@ class TaskManager:
         if not task:
             return False
 
-        if task.task_status != TaskStatus.RUNNING:
+        if task.task_status not in (TaskStatus.RUNNING, TaskStatus.PAUSED):
             return False
 
+        self._stopping.add(task_id)
         try:
-            # 停止 AFL 进程
+            # 停止所有 AFL 进程
             if task_id in self._task_processes:
-                process = self._task_processes[task_id]
-                # 发送 SIGTERM
-                process.terminate()
+                # 发送 SIGTERM，已暂停的进程需要 SIGCONT 才能处理
+                self._signal_processes(task_id, signal.SIGTERM)
+                self._signal_processes(task_id, signal.SIGCONT)
 
                 # 等待进程退出
-                try:
-                    process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    # 强制杀死
-                    process.kill()
+                for process in self._task_processes.get(task_id, []):
+                    try:
+                        process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        # 强制杀死
+                        self._kill_process(process)
 
-                del self._task_processes[task_id]
+                self._task_processes.pop(task_id, None)
 
             self.update_task_status(task_id, TaskStatus.STOPPED)
             return True
 
         except Exception as e:
             return False
+        finally:
+            self._stopping.discard(task_id)
 
     def pause_task(self, task_id: int) -> bool:
         """暂停任务"""
@@ -429,8 +645,7 @@ class TaskManager:
 
         try:
             if task_id in self._task_processes:
-                process = self._task_processes[task_id]
-                process.send_signal(signal.SIGSTOP)
+                self._signal_processes(task_id, signal.SIGSTOP)
                 self.update_task_status(task_id, TaskStatus.PAUSED)
                 return True
         except Exception as e:
@@ -449,8 +664,7 @@ class TaskManager:
 
         try:
             if task_id in self._task_processes:
-                process = self._task_processes[task_id]
-                process.send_signal(signal.SIGCONT)
+                self._signal_processes(task_id, signal.SIGCONT)
                 self.update_task_status(task_id, TaskStatus.RUNNING)
                 return True
         except Exception as e:
@@ -0,0 +1,398 @@
+import os
+import re
+import shlex
+import shutil
+import signal
+import hashlib
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models import Task, InputType, CrashInfo
+from services.task_manager import task_manager
+from services.watcher import task_watcher
+from services.crash_index import crash_index
+
+
+# 保留的 stderr 字节数（sanitizer 报告在末尾）
+_STDERR_LIMIT = 64 * 1024
+
+# 数字越大越严重，与前端的 1-5 星评级一致
+_SANITIZER_TYPES = {
+    "heap-buffer-overflow": ("Heap Overflow", 4),
+    "stack-buffer-overflow": ("Stack Overflow", 4),
+    "stack-buffer-underflow": ("Stack Overflow", 4),
+    "global-buffer-overflow": ("Buffer Overflow", 4),
+    "container-overflow": ("Buffer Overflow", 4),
+    "dynamic-stack-buffer-overflow": ("Stack Overflow", 4),
+    "heap-use-after-free": ("Use After Free", 5),
+    "stack-use-after-return": ("Use After Free", 5),
+    "stack-use-after-scope": ("Use After Free", 5),
+    "double-free": ("Double Free", 5),
+    "bad-free": ("Invalid Free", 4),
+    "alloc-dealloc-mismatch": ("Invalid Free", 3),
+    "stack-overflow": ("Stack Exhaustion", 2),
+    "SEGV": ("Segmentation Fault", 3),
+    "memory-leak": ("Memory Leak", 1),
+}
+
+_SIGNAL_TYPES = {
+    signal.SIGSEGV: ("Segmentation Fault", 3),
+    signal.SIGBUS: ("Bus Error", 3),
+    signal.SIGILL: ("Illegal Instruction", 2),
+    signal.SIGFPE: ("Floating Point Exception", 2),
+    signal.SIGABRT: ("Abort", 2),
+    signal.SIGTRAP: ("Trap", 2),
+}
+
+_SANITIZER_ERROR = re.compile(r"ERROR: (\w+Sanitizer): ([\w-]+)(?: on (?:unknown )?address (0x[0-9a-f]+))?")
+_SANITIZER_ACCESS = re.compile(r"^(READ|WRITE) of size \d+", re.M)
+_UBSAN_ERROR = re.compile(r"runtime error: (.+)")
+_SANITIZER_FRAME = re.compile(
+    r"^\s*#(\d+) 0x[0-9a-f]+ (?:in (\S+)(?: (\S+))?|\((\S+)\+(0x[0-9a-f]+)\))"
+)
+_GDB_FRAME = re.compile(
+    r"^#(\d+)\s+(?:0x[0-9a-f]+ in )?(\S+) \(.*?\)(?: at (\S+))?(?: from (\S+))?"
+)
+
+# 计算栈哈希时跳过的运行时/库函数帧
+_IGNORED_FRAME_PREFIXES = (
+    "__asan", "__ubsan", "__sanitizer", "__interceptor", "__interceptor_trampoline",
+    "__GI_", "__libc_", "__pthread_kill", "raise", "abort", "__assert", "_start",
+)
+
+# 分析完成回调 (任务, 相对于输出目录的样本路径, 分析结果)
+TriageListener = Callable[[Task, str, Dict], None]
+
+
+class CrashTriage:
+    """崩溃分析服务 - 重放崩溃样本、识别信号和崩溃类型，并按栈哈希分桶
+
+    样本由有限大小的线程池依次重放，重放进程降低调度优先级，避免分析
+    抢占 fuzzer 的 CPU。结果写入崩溃索引。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.triage_workers),
+            thread_name_prefix="crash-triage"
+        )
+        # 已提交但尚未完成的样本 (task_id, 相对于输出目录的路径)
+        self._pending = set()
+        self._listeners: List[TriageListener] = []
+        task_watcher.add_listener(self._on_watch_event)
+
+    def add_listener(self, listener: TriageListener):
+        """注册分析完成监听器"""
+        self._listeners.append(listener)
+
+    def _on_watch_event(self, task_id: int, kind: str, paths: List[str]):
+        """发现新崩溃样本时自动提交分析（崩溃索引的监听器先于此执行）"""
+        if kind != "crashes":
+            return
+        for path in paths:
+            self.submit(task_id, path)
+
+    def submit(self, task_id: int, filepath: str, force: bool = False) -> bool:
+        """提交样本分析，已分析或正在分析的样本不重复提交"""
+        task = task_manager.get_task(task_id)
+        if not task or not task.target_binary:
+            return False
+
+        sample = os.path.relpath(filepath, task.output_dir)
+        with self._lock:
+            if (task_id, sample) in self._pending:
+                return False
+            if not force:
+                row = crash_index.get(task_id, sample)
+                if row and row["triage_status"] in ("done", "failed"):
+                    return False
+            self._pending.add((task_id, sample))
+
+        self._executor.submit(self._run, task_id, sample, filepath)
+        return True
+
+    def submit_pending(self, task: Task, limit: int = 1000) -> int:
+        """提交索引中尚未分析的样本（例如服务重启前未完成的分析）"""
+        submitted = 0
+        for sample in crash_index.pending_samples(task.id, limit):
+            if self.submit(task.id, os.path.join(task.output_dir, sample)):
+                submitted += 1
+        return submitted
+
+    def crash_info(self, task: Task, row: Dict) -> CrashInfo:
+        """根据崩溃索引记录构建崩溃信息，尚未分析的样本会被提交分析"""
+        info = CrashInfo(
+            crash_id=row["crash_id"],
+            task_id=task.id,
+            task_name=task.name,
+            crash_type=row["crash_type"] or "Pending",
+            signal=row["signal"],
+            reproducible=bool(row["reproducible"]),
+            severity=row["severity"] or 0,
+            sample_file=row["filename"],
+            stack_trace=row["stack_trace"],
+            found_at=row["found_at"],
+            instance=row["instance"],
+            exit_code=row["exit_code"],
+            bucket=row["bucket"],
+            frames=row["frames"],
+            triage_status=row["triage_status"],
+            min_status=row["min_status"],
+            min_size=row["min_size"],
+        )
+
+        if row["triage_status"] == "pending":
+            self.submit(task.id, os.path.join(task.output_dir, row["sample"]))
+        return info
+
+    def _run(self, task_id: int, sample: str, filepath: str):
+        try:
+            task = task_manager.get_task(task_id)
+            if task and os.path.exists(filepath):
+                result = self.analyze(task, filepath)
+                crash_index.update_triage(task_id, sample, result)
+                for listener in list(self._listeners):
+                    try:
+                        listener(task, sample, result)
+                    except Exception as e:
+                        print(f"崩溃分析监听器执行失败: {e}")
+        except Exception as e:
+            print(f"崩溃样本分析失败 {filepath}: {e}")
+            # 记录失败结果，避免每次列出崩溃时重新提交（force 时重新分析）
+            try:
+                crash_index.update_triage(task_id, sample, {
+                    "signal": None,
+                    "exit_code": None,
+                    "reproducible": False,
+                    "crash_type": "Analysis Failed",
+                    "severity": 0,
+                    "frames": [],
+                    "stack_trace": str(e),
+                    "bucket": None,
+                    "triaged_at": datetime.now().isoformat(),
+                }, status="failed")
+            except Exception as e:
+                print(f"记录分析失败结果失败 {filepath}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((task_id, sample))
+
+    def analyze(self, task: Task, filepath: str) -> Dict:
+        """重放样本并分析崩溃
+
+        样本用发现它的实例所运行的目标程序重放，sanitizer 变体的实例
+        发现的崩溃可以得到 sanitizer 报告。
+        """
+        binary = task_manager.sample_binary(task, filepath)
+        returncode, stderr = self._replay(binary, task, filepath)
+
+        sig = -returncode if returncode is not None and returncode < 0 else None
+        crash_type, severity, frames, stack_trace = self._classify(returncode, sig, stderr)
+
+        if not frames and sig is not None:
+            gdb_trace = self._gdb_backtrace(binary, task, filepath)
+            if gdb_trace:
+                frames = self._parse_frames(gdb_trace, _GDB_FRAME)
+                stack_trace = gdb_trace
+
+        if frames:
+            frames = self._symbolize(binary, frames)
+
+        return {
+            "signal": signal.Signals(sig).name if sig in signal.valid_signals() else None,
+            "exit_code": returncode,
+            "reproducible": crash_type not in ("Not Reproducible", "Timeout"),
+            "crash_type": crash_type,
+            "severity": severity,
+            "frames": [frame["function"] for frame in frames[:settings.triage_stack_depth]],
+            "stack_trace": stack_trace,
+            "bucket": self._bucket(crash_type, sig, frames),
+            "triaged_at": datetime.now().isoformat(),
+        }
+
+    def _replay_command(self, binary: str, task: Task, filepath: str) -> Tuple[List, Optional[str]]:
+        """按输入类型构建重放命令，返回 (命令, 作为 stdin 的文件)"""
+        if task.input_type == InputType.FILE:
+            return [binary, filepath], None
+        if task.input_type == InputType.ARGS:
+            with open(filepath, "rb") as f:
+                # 命令行参数不能包含 NUL 字节
+                return [binary, f.read().replace(b"\0", b"")], None
+        return [binary], filepath
+
+    def _replay_env(self) -> Dict[str, str]:
+        env = os.environ.copy()
+        # 让 sanitizer 在首个错误处终止，并输出带符号的调用栈
+        env.setdefault("ASAN_OPTIONS", "abort_on_error=1:symbolize=1:detect_leaks=0:allocator_may_return_null=1")
+        env.setdefault("UBSAN_OPTIONS", "halt_on_error=1:abort_on_error=1:print_stacktrace=1")
+        return env
+
+    def _replay(self, binary: str, task: Task, filepath: str) -> Tuple[Optional[int], str]:
+        """在临时目录中运行目标程序，返回 (返回码, stderr)，超时返回码为 None"""
+        command, stdin_file = self._replay_command(binary, task, filepath)
+        returncode, _, stderr = self._execute(command, stdin_file)
+        return returncode, stderr
+
+    def _execute(self, command: List, stdin_file: Optional[str],
+                 capture_stdout: bool = False) -> Tuple[Optional[int], str, str]:
+        """以低优先级运行命令，返回 (返回码, stdout, stderr)，超时返回码为 None"""
+        with tempfile.TemporaryDirectory(prefix="triage_") as cwd:
+            stdin = open(stdin_file, "rb") if stdin_file else subprocess.DEVNULL
+            try:
+                process = subprocess.Popen(
+                    command,
+                    stdin=stdin,
+                    stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    cwd=cwd,
+                    env=self._replay_env(),
+                    start_new_session=True
+                )
+                try:
+                    os.setpriority(os.PRIO_PROCESS, process.pid, settings.triage_nice)
+                except (OSError, AttributeError):
+                    pass
+
+                try:
+                    stdout, stderr = process.communicate(timeout=settings.triage_timeout)
+                    returncode = process.returncode
+                except subprocess.TimeoutExpired:
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    stdout, stderr = process.communicate()
+                    returncode = None
+            finally:
+                if stdin_file:
+                    stdin.close()
+
+        return (
+            returncode,
+            (stdout or b"")[-_STDERR_LIMIT:].decode("utf-8", "replace"),
+            stderr[-_STDERR_LIMIT:].decode("utf-8", "replace"),
+        )
+
+    def _classify(self, returncode: Optional[int], sig: Optional[int],
+                  stderr: str) -> Tuple[str, int, List[Dict], Optional[str]]:
+        """根据 sanitizer 报告或信号确定崩溃类型、严重程度和调用栈"""
+        if returncode is None:
+            return "Timeout", 1, [], None
+
+        match = _SANITIZER_ERROR.search(stderr)
+        if match:
+            report = stderr[match.start():]
+            crash_type, severity = _SANITIZER_TYPES.get(match.group(2), (match.group(2), 3))
+            access = _SANITIZER_ACCESS.search(report)
+            if access and access.group(1) == "READ" and severity > 3:
+                # 越界读的危害低于越界写
+                severity -= 1
+            if match.group(2) == "SEGV" and match.group(3) and int(match.group(3), 16) < 0x1000:
+                crash_type, severity = "Null Pointer Dereference", 2
+            return crash_type, severity, self._parse_frames(report, _SANITIZER_FRAME), report
+
+        match = _UBSAN_ERROR.search(stderr)
+        if match and sig is not None:
+            report = stderr[stderr.rfind("\n", 0, match.start()) + 1:]
+            return "Undefined Behavior", 2, self._parse_frames(report, _SANITIZER_FRAME), report
+
+        if sig is not None:
+            crash_type, severity = _SIGNAL_TYPES.get(sig, (signal.Signals(sig).name, 2))
+            return crash_type, severity, [], None
+
+        return "Not Reproducible", 1, [], None
+
+    def _parse_frames(self, report: str, pattern: re.Pattern) -> List[Dict]:
+        """解析第一段调用栈（sanitizer 报告后续的分配/释放栈不计入）"""
+        frames = []
+        for line in report.splitlines():
+            match = pattern.match(line)
+            if not match:
+                if frames and not line.strip():
+                    break
+                continue
+            if int(match.group(1)) == 0 and frames:
+                break
+
+            groups = match.groups()
+            if pattern is _SANITIZER_FRAME:
+                function, location, module, offset = groups[1], groups[2], groups[3], groups[4]
+            else:
+                function, location, module, offset = groups[1], groups[2], groups[3], None
+            frames.append({
+                "function": function or "??",
+                "location": location,
+                "module": module,
+                "offset": offset,
+            })
+        return frames
+
+    def _gdb_backtrace(self, binary: str, task: Task, filepath: str) -> Optional[str]:
+        """没有 sanitizer 报告时用 gdb 获取调用栈（未安装 gdb 时跳过）"""
+        gdb = shutil.which(settings.gdb_path)
+        if not gdb:
+            return None
+
+        command, stdin_file = self._replay_command(binary, task, filepath)
+        run = f"run < {shlex.quote(stdin_file)}" if stdin_file else "run"
+        returncode, stdout, _ = self._execute([
+            gdb, "-q", "-nx", "-batch",
+            "-ex", "set disable-randomization on",
+            "-ex", run,
+            "-ex", "bt 32",
+            "--args", *command,
+        ], None, capture_stdout=True)
+        if returncode is None:
+            return None
+
+        lines = [line for line in stdout.splitlines() if line.startswith("#")]
+        return "\n".join(lines) or None
+
+    def _symbolize(self, binary: str, frames: List[Dict]) -> List[Dict]:
+        """用 addr2line 为目标程序中未符号化的帧补充函数名"""
+        unresolved = [
+            frame for frame in frames
+            if frame["function"] == "??" and frame["offset"] and frame["module"] == binary
+        ]
+        addr2line = shutil.which("addr2line")
+        if not unresolved or not addr2line:
+            return frames
+
+        try:
+            result = subprocess.run(
+                [addr2line, "-f", "-C", "-e", binary, *[frame["offset"] for frame in unresolved]],
+                capture_output=True,
+                timeout=settings.triage_timeout
+            )
+        except subprocess.TimeoutExpired:
+            return frames
+
+        lines = result.stdout.decode("utf-8", "replace").splitlines()
+        for frame, function, location in zip(unresolved, lines[0::2], lines[1::2]):
+            frame["function"] = function
+            if not location.startswith("??"):
+                frame["location"] = location
+        return frames
+
+    def _bucket(self, crash_type: str, sig: Optional[int], frames: List[Dict]) -> str:
+        """用前 N 个有效帧的函数名计算栈哈希，没有调用栈时按崩溃类型和信号分桶"""
+        functions = [
+            frame["function"] for frame in frames
+            if not frame["function"].startswith(_IGNORED_FRAME_PREFIXES)
+        ][:settings.triage_stack_depth]
+
+        if functions:
+            key = "\n".join(functions)
+        else:
+            key = f"{crash_type}:{sig}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# 全局实例
+crash_triage = CrashTriage()
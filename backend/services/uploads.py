@@ -0,0 +1,110 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import IO, Optional
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import settings
+
+
+class HashingFile:
+    """上传文件的临时存储 - 接收时直接写入磁盘，同时计算 sha256 并检查大小
+
+    文件位于 upload_dir 中（与种子存储、任务目录在同一文件系统），保存时
+    直接硬链接到目标位置，不需要再读取和复制内容。一个请求可能包含上万个
+    文件，因此写完后立即关闭写入句柄，只在需要读取时才重新打开；请求结束
+    时删除临时文件。
+    """
+
+    def __init__(self, directory: str, limit: int):
+        fd, self.name = tempfile.mkstemp(dir=directory, prefix="upload_")
+        self._writer: Optional[IO[bytes]] = os.fdopen(fd, "wb")
+        self._reader: Optional[IO[bytes]] = None
+        self._hash = hashlib.sha256()
+        self._limit = limit
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self._limit:
+            raise RequestEntityTooLarge(f"上传文件超过 {self._limit} 字节")
+        self._hash.update(data)
+        return self._writer.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def _finish_writing(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def link_to(self, dest: str):
+        """把已接收的内容保存到 dest（已存在时替换）"""
+        self._finish_writing()
+        tmp = f"{dest}.incoming"
+        try:
+            os.link(self.name, tmp)
+        except OSError:
+            shutil.copyfile(self.name, tmp)
+        os.replace(tmp, dest)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        # 解析器写完文件后调用 seek(0)，此时不需要打开读取句柄
+        self._finish_writing()
+        if self._reader is None and offset == 0 and whence == os.SEEK_SET:
+            return 0
+        return self._open_reader().seek(offset, whence)
+
+    def _open_reader(self) -> IO[bytes]:
+        self._finish_writing()
+        if self._reader is None:
+            self._reader = open(self.name, "rb")
+        return self._reader
+
+    def close(self):
+        self._finish_writing()
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+        try:
+            os.unlink(self.name)
+        except FileNotFoundError:
+            pass
+
+    def __getattr__(self, name):
+        # read / readline / tell / seekable 等交给读取句柄
+        return getattr(self._open_reader(), name)
+
+
+# 按文件名识别的种子压缩包，使用 max_archive_size 限制
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class UploadRequest(Request):
+    """上传文件不在内存中缓冲，直接写入 upload_dir 下的临时文件"""
+
+    @property
+    def max_form_parts(self) -> int:
+        return settings.max_upload_files + 100
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        if filename and filename.lower().endswith(ARCHIVE_SUFFIXES):
+            return HashingFile(settings.upload_dir, settings.max_archive_size)
+        return HashingFile(settings.upload_dir, settings.max_file_size)
+
+
+def save_stream(stream: IO[bytes], dest: str):
+    """保存上传的文件：已落盘的上传文件直接硬链接，否则分块复制"""
+    if isinstance(stream, HashingFile):
+        stream.link_to(dest)
+        return
+
+    tmp = f"{dest}.incoming"
+    with open(tmp, "wb") as f:
+        shutil.copyfileobj(stream, f, 1024 * 1024)
+    os.replace(tmp, dest)
@@ -0,0 +1,242 @@
+import os
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+
+# inotify 常量（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+
+# AFL 实例目录下需要监听的样本目录
+SAMPLE_DIRS = ("queue", "crashes", "hangs")
+
+# 监听器回调: (task_id, kind, paths)，kind 为 stats / queue / crashes / hangs
+WatchListener = Callable[[int, str, List[str]], None]
+
+
+class _Inotify:
+    """基于 ctypes 的最小 inotify 封装"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """读取一批待处理事件，返回 (wd, mask, name) 列表
+
+        只在 fd 可读后调用且只读取一次：eventlet patch 后的 os.read 在没有
+        数据时会等待而不是抛出 BlockingIOError。剩余的事件由下一次 select 读取。
+        """
+        events = []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+
+class TaskWatcher:
+    """文件监听服务 - 监听任务输出目录并把变化分发给各监听器
+
+    所有任务共用一个后台线程：Linux 上通过 inotify 监听每个实例的
+    fuzzer_stats、queue/、crashes/ 和 hangs/；inotify 不可用时退化为
+    按 monitor_interval 轮询。线程同时按 monitor_interval 触发定时回调，
+    用于检查 fuzzer 进程是否退出。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[WatchListener] = []
+        self._tick_listeners: List[Callable[[], None]] = []
+        # task_id -> 输出目录
+        self._tasks: Dict[int, str] = {}
+        # wd -> (task_id, kind, path)，kind 为 instance / queue / crashes / hangs
+        self._watches: Dict[int, Tuple[int, str, str]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+        self._inotify: Optional[_Inotify] = None
+        if settings.use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"inotify 不可用，使用轮询监听: {e}")
+
+    @property
+    def using_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def add_listener(self, listener: WatchListener):
+        """注册文件变化监听器"""
+        self._listeners.append(listener)
+
+    def add_tick_listener(self, listener: Callable[[], None]):
+        """注册定时回调"""
+        self._tick_listeners.append(listener)
+
+    def watch_task(self, task_id: int, output_dir: str):
+        """开始监听任务输出目录"""
+        with self._lock:
+            self._tasks[task_id] = output_dir
+            if self._inotify:
+                self._watch_instance(task_id, output_dir)
+                for name in os.listdir(output_dir):
+                    path = os.path.join(output_dir, name)
+                    if name not in SAMPLE_DIRS and os.path.isdir(path):
+                        self._watch_instance(task_id, path)
+
+        self._ensure_thread()
+
+    def unwatch_task(self, task_id: int):
+        """停止监听任务"""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            for wd, (watched_id, _, _) in list(self._watches.items()):
+                if watched_id == task_id:
+                    del self._watches[wd]
+                    if self._inotify:
+                        self._inotify.rm_watch(wd)
+
+    def is_watching(self, task_id: int) -> bool:
+        return task_id in self._tasks
+
+    def _watch_instance(self, task_id: int, path: str):
+        """监听实例目录本身（fuzzer_stats 和新建子目录）及其样本目录"""
+        self._add_watch(task_id, "instance", path)
+        for sample_dir in SAMPLE_DIRS:
+            sample_path = os.path.join(path, sample_dir)
+            if os.path.isdir(sample_path):
+                self._add_watch(task_id, sample_dir, sample_path)
+
+    def _add_watch(self, task_id: int, kind: str, path: str):
+        try:
+            wd = self._inotify.add_watch(path, _WATCH_MASK)
+        except OSError as e:
+            print(f"添加 inotify 监听失败: {e}")
+            return
+        self._watches[wd] = (task_id, kind, path)
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="task-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        interval = settings.monitor_interval
+        next_tick = time.monotonic() + interval
+
+        while True:
+            timeout = max(0.0, next_tick - time.monotonic())
+
+            if self._inotify:
+                readable, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                if readable:
+                    # 短暂等待以合并同一批写入产生的事件
+                    time.sleep(settings.watcher_debounce)
+                    self._dispatch(self._collect_events())
+            else:
+                time.sleep(timeout)
+
+            if time.monotonic() >= next_tick:
+                next_tick = time.monotonic() + interval
+                if not self._inotify:
+                    # 轮询模式：每个周期让所有任务刷新一次统计
+                    with self._lock:
+                        task_ids = list(self._tasks)
+                    self._dispatch({(task_id, "stats"): [] for task_id in task_ids})
+                for listener in list(self._tick_listeners):
+                    try:
+                        listener()
+                    except Exception as e:
+                        print(f"定时回调执行失败: {e}")
+
+    def _collect_events(self) -> Dict[Tuple[int, str], List[str]]:
+        """读取 inotify 事件并按 (task_id, kind) 合并"""
+        changes: Dict[Tuple[int, str], List[str]] = {}
+
+        with self._lock:
+            for wd, mask, name in self._inotify.read_events():
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，所有任务都需要刷新
+                    for task_id in self._tasks:
+                        changes.setdefault((task_id, "stats"), [])
+                    continue
+
+                watch = self._watches.get(wd)
+                if not watch:
+                    continue
+                task_id, kind, path = watch
+
+                if mask & (IN_IGNORED | IN_DELETE_SELF):
+                    self._watches.pop(wd, None)
+                    continue
+
+                if kind == "instance":
+                    if mask & IN_ISDIR:
+                        child = os.path.join(path, name)
+                        if name in SAMPLE_DIRS:
+                            self._add_watch(task_id, name, child)
+                        elif path == self._tasks.get(task_id):
+                            # 输出目录下新建的实例目录
+                            self._watch_instance(task_id, child)
+                    elif name == "fuzzer_stats" and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        changes.setdefault((task_id, "stats"), []).append(os.path.join(path, name))
+                elif name.startswith("id:"):
+                    paths = changes.setdefault((task_id, kind), [])
+                    filepath = os.path.join(path, name)
+                    if filepath not in paths:
+                        paths.append(filepath)
+
+        return changes
+
+    def _dispatch(self, changes: Dict[Tuple[int, str], List[str]]):
+        for (task_id, kind), paths in changes.items():
+            for listener in list(self._listeners):
+                try:
+                    listener(task_id, kind, paths)
+                except Exception as e:
+                    print(f"文件变化监听器执行失败: {e}")
+
+
+# 全局实例
+task_watcher = TaskWatcher()
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+# 服务模块在导入时创建全局实例和数据目录，测试使用临时目录，不影响开发环境的数据
+_DATA_DIR = tempfile.mkdtemp(prefix="afl_server_test_")
+for name, path in {
+    "BASE_DIR": _DATA_DIR,
+    "UPLOAD_DIR": "uploads",
+    "TASKS_DIR": "tasks",
+    "OUTPUTS_DIR": "outputs",
+    "CRASHES_DIR": "crashes",
+    "SEEDS_DIR": "seeds",
+    "SEED_STORE_DIR": "seed_store",
+    "CRASH_INDEX_PATH": "crash_index.db",
+    "MINIMIZE_CACHE_DIR": "minimized",
+    "COVERAGE_DIR": "coverage",
+    "BUILD_CACHE_DIR": "build_cache",
+}.items():
+    os.environ.setdefault(name, os.path.join(_DATA_DIR, path))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from services.build_cache import BuildCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BuildCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def compiler(tmp_path):
+    path = tmp_path / "afl-gcc"
+    path.write_text("#!/bin/sh\necho 'afl-cc 2.57b'\n")
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture
+def sources(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "main.c").write_text("int main(void) { return 0; }\n")
+    (src / "util.h").write_text("#define N 1\n")
+    return [str(src / "main.c"), str(src / "util.h")]
+
+
+COMMAND = ["-O2", "main.c", "-o", "target"]
+
+
+def test_key_is_stable(cache, compiler, sources):
+    key = cache.key(str(compiler), "plain", COMMAND, sources)
+
+    assert key == cache.key(str(compiler), "plain", COMMAND, list(reversed(sources)))
+    assert key == BuildCache(cache.root).key(str(compiler), "plain", COMMAND, sources)
+
+
+def test_key_ignores_source_directory(cache, compiler, sources, tmp_path):
+    # 上传目录不同但内容相同的源码命中同一缓存项
+    other = tmp_path / "other"
+    other.mkdir()
+    copies = []
+    for path in sources:
+        copy = other / os.path.basename(path)
+        copy.write_bytes(open(path, "rb").read())
+        copies.append(str(copy))
+
+    assert cache.key(str(compiler), "plain", COMMAND, sources) == \
+        cache.key(str(compiler), "plain", COMMAND, copies)
+
+
+def test_key_changes_with_inputs(cache, compiler, sources):
+    key = cache.key(str(compiler), "plain", COMMAND, sources)
+
+    assert cache.key(str(compiler), "asan", COMMAND, sources) != key
+    assert cache.key(str(compiler), "plain", COMMAND + ["-g"], sources) != key
+    assert cache.key(str(compiler), "plain", COMMAND, sources[:1]) != key
+
+    with open(sources[1], "a") as f:
+        f.write("#define M 2\n")
+    assert cache.key(str(compiler), "plain", COMMAND, sources) != key
+
+
+def test_key_changes_with_compiler_version(cache, compiler, sources):
+    key = cache.key(str(compiler), "plain", COMMAND, sources)
+
+    compiler.write_text("#!/bin/sh\necho 'afl-cc++4.08c'\n")
+
+    assert cache.key(str(compiler), "plain", COMMAND, sources) != key
+
+
+def test_key_changes_with_instrumentation_env(cache, compiler, sources, monkeypatch):
+    monkeypatch.delenv("AFL_USE_ASAN", raising=False)
+    key = cache.key(str(compiler), "plain", COMMAND, sources)
+
+    monkeypatch.setenv("AFL_USE_ASAN", "1")
+
+    assert cache.key(str(compiler), "plain", COMMAND, sources) != key
@@ -0,0 +1,32 @@
+import re
+
+from services.crash_index import make_crash_id
+
+
+def test_make_crash_id_is_stable():
+    crash_id = make_crash_id(1, "fuzzer0", "id:000003,sig:11,src:000000,op:havoc,rep:2")
+
+    assert re.fullmatch(r"[0-9a-f]{20}", crash_id)
+    assert crash_id == make_crash_id(1, "fuzzer0", "id:000003,sig:11,src:000000,op:havoc,rep:2")
+
+
+def test_make_crash_id_uses_afl_sample_id_only():
+    # 同一样本编号的文件名其余部分不同（例如 AFL++ 追加的 time 字段）时ID不变
+    assert make_crash_id(1, "fuzzer0", "id:000003,sig:11,src:000000,op:havoc,rep:2") == \
+        make_crash_id(1, "fuzzer0", "id:000003,sig:06,src:000001,time:1234,op:flip1")
+
+
+def test_make_crash_id_differs_by_task_instance_and_sample():
+    ids = {
+        make_crash_id(1, "fuzzer0", "id:000003,sig:11"),
+        make_crash_id(2, "fuzzer0", "id:000003,sig:11"),
+        make_crash_id(1, "fuzzer1", "id:000003,sig:11"),
+        make_crash_id(1, "fuzzer0", "id:000004,sig:11"),
+        make_crash_id(11, "fuzzer0", "id:000003,sig:11"),
+    }
+
+    assert len(ids) == 5
+
+
+def test_make_crash_id_without_comma():
+    assert make_crash_id(1, "default", "id:000000") == make_crash_id(1, "default", "id:000000,sig:11")
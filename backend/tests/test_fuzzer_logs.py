@@ -0,0 +1,55 @@
+from services.fuzzer_logs import RingBuffer
+
+
+def test_ring_buffer_incremental_read():
+    buffer = RingBuffer(16)
+    buffer.write(b"hello ")
+    start, data = buffer.read()
+    assert (start, data) == (0, b"hello ")
+
+    buffer.write(b"world")
+    assert buffer.read(since=6) == (6, b"world")
+    assert buffer.read(since=buffer.offset) == (11, b"")
+
+
+def test_ring_buffer_wraps_around():
+    buffer = RingBuffer(8)
+    buffer.write(b"abcdef")
+    buffer.write(b"ghij")
+
+    assert buffer.offset == 10
+    assert buffer.start_offset == 2
+    assert buffer.read() == (2, b"cdefghij")
+    assert buffer.read(since=7) == (7, b"hij")
+
+
+def test_ring_buffer_skips_overwritten_data():
+    buffer = RingBuffer(8)
+    buffer.write(b"0123456789")
+
+    # 读取方落后时从缓冲区中最早的字节开始
+    assert buffer.read(since=0) == (2, b"23456789")
+
+
+def test_ring_buffer_write_larger_than_capacity():
+    buffer = RingBuffer(4)
+    buffer.write(b"ab")
+    buffer.write(b"cdefghij")
+
+    assert buffer.offset == 10
+    assert buffer.read() == (6, b"ghij")
+
+
+def test_ring_buffer_read_limit_keeps_latest():
+    buffer = RingBuffer(16)
+    buffer.write(b"line1\nline2\n")
+
+    assert buffer.read(limit=6) == (6, b"line2\n")
+    assert buffer.read(since=2, limit=100) == (2, b"ne1\nline2\n")
+
+
+def test_ring_buffer_since_beyond_offset():
+    buffer = RingBuffer(8)
+    buffer.write(b"abc")
+
+    assert buffer.read(since=10) == (3, b"")
@@ -0,0 +1,94 @@
+import math
+
+from services.metrics import METRICS, _Downsampler, _Ring
+
+
+EXECS = METRICS.index("execs_per_sec")
+PATHS = METRICS.index("paths_total")
+
+
+def _values(execs_per_sec: float = 0.0, paths_total: float = 0.0):
+    values = [math.nan] * len(METRICS)
+    values[EXECS] = execs_per_sec
+    values[PATHS] = paths_total
+    return values
+
+
+def test_ring_grows_until_capacity():
+    ring = _Ring(4)
+    assert len(ring) == 0
+    assert ring.oldest() is None
+
+    for t in range(3):
+        ring.append(float(t), _values(paths_total=t))
+
+    assert len(ring) == 3
+    assert not ring.is_full()
+    assert ring.oldest() == 0.0
+
+
+def test_ring_overwrites_oldest():
+    ring = _Ring(3)
+    for t in range(5):
+        ring.append(float(t), _values(paths_total=t))
+
+    assert len(ring) == 3
+    assert ring.is_full()
+    assert [ring.time_at(i) for i in range(3)] == [2.0, 3.0, 4.0]
+    times, (paths,) = ring.slice(0, 10, [PATHS])
+    assert times == [2.0, 3.0, 4.0]
+    assert paths == [2.0, 3.0, 4.0]
+
+
+def test_ring_bisect_after_wrap():
+    ring = _Ring(4)
+    for t in (10, 20, 30, 40, 50, 60):
+        ring.append(float(t), _values())
+
+    assert ring.bisect(0) == 0
+    assert ring.bisect(30) == 0
+    assert ring.bisect(35) == 1
+    assert ring.bisect(60) == 3
+    assert ring.bisect(61) == 4
+
+
+def test_ring_slice_is_inclusive():
+    ring = _Ring(8)
+    for t in (10, 20, 30, 40):
+        ring.append(float(t), _values(paths_total=t))
+
+    times, (paths,) = ring.slice(20, 30, [PATHS])
+
+    assert times == [20.0, 30.0]
+    assert paths == [20.0, 30.0]
+
+
+def test_downsampler_empty():
+    assert _Downsampler(60, 4).current() is None
+
+
+def test_downsampler_buckets():
+    sampler = _Downsampler(60, 4)
+    sampler.add(60, _values(execs_per_sec=100, paths_total=1))
+    sampler.add(90, _values(execs_per_sec=300, paths_total=5))
+
+    # 桶尚未结束，不写入环形缓冲区
+    assert len(sampler.ring) == 0
+    bucket, values = sampler.current()
+    assert bucket == 60
+    # 执行速度取平均值，累计量取桶内最后一个值
+    assert values[EXECS] == 200
+    assert values[PATHS] == 5
+
+    sampler.add(125, _values(execs_per_sec=50, paths_total=7))
+
+    assert len(sampler.ring) == 1
+    times, (execs, paths) = sampler.ring.slice(0, 1000, [EXECS, PATHS])
+    assert times == [60.0]
+    assert execs == [200.0]
+    assert paths == [5.0]
+
+    bucket, values = sampler.current()
+    assert bucket == 120
+    assert values[EXECS] == 50
+
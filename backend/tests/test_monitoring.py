@@ -0,0 +1,138 @@
+import os
+
+from services.monitoring import StatCache, parse_fuzzer_stats
+
+
+AFL_257B_STATS = """\
+start_time        : 1700000000
+last_update       : 1700000120
+fuzzer_pid        : 4242
+cycles_done       : 3
+execs_done        : 1523456
+execs_per_sec     : 789.12
+paths_total       : 57
+stability         : 100.00%
+bitmap_cvg        : 1.27%
+unique_crashes    : 2
+peak_rss_mb       : 0
+afl_banner        : target
+afl_version       : 2.57b
+command_line      : afl-fuzz -i in -o out -M fuzzer0 -- ./target @@
+""".splitlines(keepends=True)
+
+
+def test_parse_fuzzer_stats_types():
+    stats = parse_fuzzer_stats(AFL_257B_STATS)
+
+    assert stats["execs_done"] == 1523456
+    assert stats["execs_per_sec"] == 789.12
+    assert stats["paths_total"] == 57
+    assert stats["unique_crashes"] == 2
+    assert stats["afl_version"] == "2.57b"
+
+
+def test_parse_fuzzer_stats_strips_percent():
+    stats = parse_fuzzer_stats(AFL_257B_STATS)
+
+    assert stats["stability"] == 100.0
+    assert stats["bitmap_cvg"] == 1.27
+
+
+def test_parse_fuzzer_stats_value_with_colon():
+    stats = parse_fuzzer_stats(AFL_257B_STATS)
+
+    assert stats["command_line"] == "afl-fuzz -i in -o out -M fuzzer0 -- ./target @@"
+
+
+def test_parse_fuzzer_stats_infers_unknown_fields():
+    stats = parse_fuzzer_stats([
+        "new_counter : 12\n",
+        "new_ratio   : 0.5%\n",
+        "new_text    : hello\n",
+    ])
+
+    assert stats == {"new_counter": 12, "new_ratio": 0.5, "new_text": "hello"}
+
+
+def test_parse_fuzzer_stats_keeps_unparsable_values():
+    stats = parse_fuzzer_stats(["peak_rss_mb : not available while afl is running\n"])
+
+    assert stats["peak_rss_mb"] == "not available while afl is running"
+
+
+def test_parse_fuzzer_stats_skips_malformed_lines():
+    stats = parse_fuzzer_stats(["\n", "no separator\n", " : 5\n", "execs_done : 7\n"])
+
+    assert stats == {"execs_done": 7}
+
+
+def test_stat_cache_validator_mismatch_is_miss():
+    cache = StatCache(8)
+    cache.put(("/out/fuzzer0/fuzzer_stats", "stats"), (1, 100), {"execs_done": 1})
+
+    assert cache.get(("/out/fuzzer0/fuzzer_stats", "stats"), (1, 100)) == {"execs_done": 1}
+    assert cache.get(("/out/fuzzer0/fuzzer_stats", "stats"), (2, 100)) is None
+    assert cache.get(("/out/fuzzer0/fuzzer_stats", "stats"), (1, 120)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_stat_cache_evicts_least_recently_used():
+    cache = StatCache(2)
+    cache.put(("a", "stats"), (1,), "a")
+    cache.put(("b", "stats"), (1,), "b")
+    cache.get(("a", "stats"), (1,))
+    cache.put(("c", "stats"), (1,), "c")
+
+    assert len(cache) == 2
+    assert cache.get(("a", "stats"), (1,)) == "a"
+    assert cache.get(("b", "stats"), (1,)) is None
+    assert cache.get(("c", "stats"), (1,)) == "c"
+
+
+def test_stat_cache_evict_prefix():
+    cache = StatCache(8)
+    cache.put(("/out/task_1", "count", False), (1,), 1)
+    cache.put(("/out/task_1/fuzzer0/fuzzer_stats", "stats"), (1, 1), {})
+    cache.put(("/out/task_10/fuzzer0/fuzzer_stats", "stats"), (1, 1), {})
+
+    cache.evict_prefix("/out/task_1")
+
+    assert len(cache) == 1
+    assert cache.get(("/out/task_10/fuzzer0/fuzzer_stats", "stats"), (1, 1)) == {}
+
+
+def test_read_fuzzer_stats_rereads_changed_file(tmp_path):
+    from services.monitoring import MonitoringService
+
+    service = MonitoringService()
+    stats_file = tmp_path / "fuzzer_stats"
+    stats_file.write_text("execs_done : 10\n")
+    os.utime(stats_file, ns=(1, 1_000_000_000))
+
+    assert service._read_fuzzer_stats(str(stats_file)) == {"execs_done": 10}
+    assert service._read_fuzzer_stats(str(stats_file)) == {"execs_done": 10}
+    assert service._stat_cache.hits == 1
+
+    # AFL 重写文件后 mtime 和大小都会变化
+    stats_file.write_text("execs_done : 2000\n")
+    os.utime(stats_file, ns=(2, 2_000_000_000))
+
+    assert service._read_fuzzer_stats(str(stats_file)) == {"execs_done": 2000}
+
+
+def test_count_entries_recounts_when_directory_changes(tmp_path):
+    from services.monitoring import MonitoringService
+
+    service = MonitoringService()
+    (tmp_path / "id:000000,orig:seed").write_bytes(b"a")
+    (tmp_path / "id:000001,sync:fuzzer1,src:000003").write_bytes(b"b")
+    (tmp_path / "README.txt").write_bytes(b"")
+    os.utime(tmp_path, ns=(1, 1_000_000_000))
+
+    assert service._count_entries(str(tmp_path)) == 2
+    assert service._count_entries(str(tmp_path), skip_synced=True) == 1
+
+    (tmp_path / "id:000002,src:000000,op:havoc").write_bytes(b"c")
+    os.utime(tmp_path, ns=(2, 2_000_000_000))
+
+    assert service._count_entries(str(tmp_path)) == 3
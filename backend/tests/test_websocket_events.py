@@ -0,0 +1,109 @@
+import copy
+
+from websocket_events import DeltaState, apply_delta, diff_dict
+
+
+OLD = {
+    "status": "running",
+    "stats": {"execs_done": 100, "edges_total": 10, "stability": 100.0},
+    "instances": [
+        {"name": "fuzzer0", "execs_done": 60},
+        {"name": "fuzzer1", "execs_done": 40},
+    ],
+    "error_message": None,
+}
+
+
+def test_diff_dict_identical():
+    assert diff_dict(OLD, copy.deepcopy(OLD)) == ({}, [])
+
+
+def test_diff_dict_nested_changes_only():
+    new = copy.deepcopy(OLD)
+    new["stats"]["execs_done"] = 250
+
+    assert diff_dict(OLD, new) == ({"stats": {"execs_done": 250}}, [])
+
+
+def test_diff_dict_instance_list_by_index():
+    new = copy.deepcopy(OLD)
+    new["instances"][1]["execs_done"] = 90
+
+    assert diff_dict(OLD, new) == ({"instances": {"1": {"execs_done": 90}}}, [])
+
+
+def test_diff_dict_list_length_change_replaces_list():
+    new = copy.deepcopy(OLD)
+    new["instances"].append({"name": "fuzzer2", "execs_done": 0})
+
+    changes, removed = diff_dict(OLD, new)
+
+    assert changes == {"instances": new["instances"]}
+    assert removed == []
+
+
+def test_diff_dict_added_and_removed_fields():
+    new = copy.deepcopy(OLD)
+    del new["stats"]["edges_total"]
+    del new["error_message"]
+    new["stats"]["unique_crashes"] = 1
+
+    changes, removed = diff_dict(OLD, new)
+
+    assert changes == {"stats": {"unique_crashes": 1}}
+    assert sorted(removed) == ["error_message", "stats.edges_total"]
+
+
+def test_apply_delta_roundtrip():
+    new = copy.deepcopy(OLD)
+    new["status"] = "stopped"
+    new["stats"]["execs_done"] = 300
+    del new["stats"]["edges_total"]
+    new["instances"][0]["execs_done"] = 200
+    new["instances"][1]["exited"] = "fuzzer1 进程退出，返回码: 1"
+
+    changes, removed = diff_dict(OLD, new)
+
+    assert apply_delta(copy.deepcopy(OLD), changes, removed) == new
+
+
+def test_delta_state_merges_history():
+    state = DeltaState(history=10)
+    state.update(copy.deepcopy(OLD))
+    seq, base = state.snapshot()
+    client = copy.deepcopy(base)
+
+    second = copy.deepcopy(OLD)
+    second["stats"]["execs_done"] = 200
+    del second["error_message"]
+    state.update(second)
+
+    third = copy.deepcopy(second)
+    third["stats"]["execs_done"] = 300
+    third["error_message"] = "fuzzer0 进程退出，返回码: 1"
+    state.update(third)
+
+    merged_seq, changes, removed = state.since(seq)
+
+    assert merged_seq == 3
+    # 中间被删除、之后又出现的字段不应再被删除
+    assert removed == []
+    assert apply_delta(client, changes, removed) == third
+
+
+def test_delta_state_unchanged_update():
+    state = DeltaState(history=10)
+    assert state.update(copy.deepcopy(OLD))[0] == 1
+    assert state.update(copy.deepcopy(OLD)) is None
+    assert state.since(1) == (1, {}, [])
+
+
+def test_delta_state_history_exhausted():
+    state = DeltaState(history=2)
+    for execs in range(5):
+        data = copy.deepcopy(OLD)
+        data["stats"]["execs_done"] = execs
+        state.update(data)
+
+    assert state.since(1) is None
+    assert state.since(3) is not None
@@ -1,14 +1,395 @@
-import asyncio
+import os
 import json
+import threading
+from collections import deque
 from datetime import datetime
-from flask_socketio import emit
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from flask import request
+from flask_socketio import emit, join_room, leave_room
 from config import settings
-from services import task_manager, monitoring_service
+from models import TaskStatus
+from services import task_manager, monitoring_service, task_watcher, fuzzer_logs, build_queue
+
+
+DASHBOARD_ROOM = "dashboard"
+
+
+def task_room(task_id: int) -> str:
+    """任务对应的 Socket.IO 房间名"""
+    return f"task_{task_id}"
+
+
+def log_room(task_id: int) -> str:
+    """任务输出日志对应的房间名"""
+    return f"task_{task_id}_logs"
+
+
+def build_room(task_id: int) -> str:
+    """任务编译进度对应的房间名"""
+    return f"task_{task_id}_build"
+
+
+def diff_dict(old: Dict, new: Dict, prefix: str = "") -> Tuple[Dict, List[str]]:
+    """比较两个字典，返回 (变化的字段, 被删除字段的路径)
+
+    嵌套字典递归比较，只包含变化的子字段；长度不变的字典列表（如各实例
+    统计）按下标比较，变化以 {"下标": 子字段} 表示；其它值整体替换。
+    删除字段的路径以 "." 连接，例如 "stats.edges_total"。
+    """
+    changes = {}
+    removed = []
+
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            sub_changes, sub_removed = diff_dict(old[key], value, f"{prefix}{key}.")
+            if sub_changes:
+                changes[key] = sub_changes
+            removed.extend(sub_removed)
+        elif _same_shape_dict_lists(old[key], value):
+            sub_changes, sub_removed = diff_dict(
+                dict(enumerate(old[key])), dict(enumerate(value)), f"{prefix}{key}."
+            )
+            if sub_changes:
+                changes[key] = {str(index): item for index, item in sub_changes.items()}
+            removed.extend(sub_removed)
+        elif old[key] != value:
+            changes[key] = value
+
+    removed.extend(f"{prefix}{key}" for key in old if key not in new)
+    return changes, removed
+
+
+def apply_delta(data: Dict, changes: Dict, removed: List[str]) -> Dict:
+    """将增量应用到数据上（原地修改并返回）"""
+    for path in removed:
+        *parents, leaf = path.split(".")
+        target = data
+        for key in parents:
+            target = _child(target, key)
+        if isinstance(target, dict):
+            target.pop(leaf, None)
+
+    for key, value in changes.items():
+        current = data.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            apply_delta(current, value, [])
+        elif isinstance(value, dict) and isinstance(current, list):
+            for index, item in value.items():
+                apply_delta(current[int(index)], item, [])
+        else:
+            data[key] = value
+
+    return data
+
+
+def _same_shape_dict_lists(old, new) -> bool:
+    return (isinstance(old, list) and isinstance(new, list) and len(old) == len(new)
+            and all(isinstance(item, dict) for item in old + new))
+
+
+def _child(target, key: str):
+    if isinstance(target, dict):
+        return target.get(key)
+    if isinstance(target, list) and key.isdigit() and int(key) < len(target):
+        return target[int(key)]
+    return None
+
+
+class DeltaState:
+    """房间的版本化状态 - 每次变化递增序号，并保留最近若干条增量
+
+    客户端订阅时获得完整快照 (seq, data)，之后只接收带序号的增量；
+    落后太多无法用保留的增量补齐时重新发送快照。
+    """
+
+    def __init__(self, history: int):
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.data: Dict = {}
+        # (seq, changes, removed)
+        self._history = deque(maxlen=history)
+
+    def update(self, data: Dict) -> Optional[Tuple[int, Dict, List[str]]]:
+        """更新状态，有变化时返回 (seq, changes, removed)"""
+        with self._lock:
+            changes, removed = diff_dict(self.data, data)
+            if self.seq and not changes and not removed:
+                return None
+            self.seq += 1
+            self.data = data
+            self._history.append((self.seq, changes, removed))
+            return self.seq, changes, removed
+
+    def snapshot(self) -> Tuple[int, Dict]:
+        with self._lock:
+            return self.seq, self.data
+
+    def since(self, seq: int) -> Optional[Tuple[int, Dict, List[str]]]:
+        """合并 seq 之后的所有增量，历史不足时返回 None"""
+        with self._lock:
+            if seq >= self.seq:
+                return self.seq, {}, []
+            if not self._history or self._history[0][0] > seq + 1:
+                return None
+
+            merged_changes: Dict = {}
+            merged_removed: List[str] = []
+            for entry_seq, changes, removed in self._history:
+                if entry_seq <= seq:
+                    continue
+                # 后来重新出现的字段不再视为删除
+                merged_removed = [path for path in merged_removed if not _path_in(changes, path)]
+                merged_removed.extend(removed)
+                apply_delta(merged_changes, _copy_nested(changes), removed)
+            return self.seq, merged_changes, merged_removed
+
+
+def _path_in(changes: Dict, path: str) -> bool:
+    target = changes
+    for key in path.split("."):
+        if not isinstance(target, dict) or key not in target:
+            return False
+        target = target[key]
+    return True
+
+
+def _copy_nested(value):
+    """复制嵌套字典和列表，避免合并增量时修改历史记录"""
+    if isinstance(value, dict):
+        return {key: _copy_nested(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_nested(item) for item in value]
+    return value
+
+
+class RoomProducers:
+    """房间推送管理 - 每个房间只有一个推送任务，按订阅计数启停
+
+    同一任务被多个客户端订阅时只计算一次统计并发送到房间；推送任务在
+    房间有订阅者期间一直存在（任务结束后等待重新启动），最后一个
+    订阅者取消订阅或断开连接后退出。同一客户端的直接订阅
+    （加入房间）和批量订阅分别计数，取消其中一种不影响另一种。
+    """
+
+    def __init__(self, socketio):
+        self._socketio = socketio
+        self._lock = threading.Lock()
+        # room -> 订阅该房间的 (sid, 是否加入房间)
+        self._members: Dict[str, Set[Tuple[str, bool]]] = {}
+        # room -> 当前推送任务的代号，用于让过期的推送任务退出
+        self._generations: Dict[str, int] = {}
+        self._next_generation = 0
+        # room -> 版本化状态
+        self._states: Dict[str, DeltaState] = {}
+        # room -> 唤醒推送任务的事件
+        self._wakeups: Dict[str, threading.Event] = {}
+
+    @property
+    def socketio(self):
+        return self._socketio
+
+    def state(self, room: str) -> DeltaState:
+        """获取房间的版本化状态"""
+        with self._lock:
+            if room not in self._states:
+                self._states[room] = DeltaState(settings.ws_delta_history)
+            return self._states[room]
+
+    def subscribe(self, sid: str, room: str, producer: Callable, *args, join: bool = True):
+        """加入房间，房间没有推送任务时启动一个
+
+        join=False 时只计入订阅计数、不加入 Socket.IO 房间，用于批量订阅：
+        推送任务照常维护状态，但消息由批量推送统一发送。
+        """
+        if join:
+            join_room(room, sid=sid)
+
+        with self._lock:
+            members = self._members.setdefault(room, set())
+            members.add((sid, join))
+            self._wakeups.setdefault(room, threading.Event())
+            if room in self._generations:
+                return
+            self._next_generation += 1
+            generation = self._generations[room] = self._next_generation
+
+        self._socketio.start_background_task(producer, self, room, generation, *args)
+
+    def unsubscribe(self, sid: str, room: str, leave: bool = True):
+        """离开房间，订阅计数归零时停止推送；leave 与订阅时的 join 对应"""
+        if leave:
+            leave_room(room, sid=sid)
+
+        with self._lock:
+            self._discard((sid, leave), room)
+
+    def unsubscribe_all(self, sid: str):
+        """客户端断开连接时离开所有房间"""
+        with self._lock:
+            for room, members in list(self._members.items()):
+                for member in [member for member in members if member[0] == sid]:
+                    self._discard(member, room)
+
+    def _discard(self, member: Tuple[str, bool], room: str):
+        members = self._members.get(room)
+        if members is None:
+            return
+        members.discard(member)
+        if not members:
+            del self._members[room]
+            self._generations.pop(room, None)
+            self._states.pop(room, None)
+            # 让正在等待的推送任务检查 is_current 后退出
+            event = self._wakeups.pop(room, None)
+            if event:
+                event.set()
+
+    def wake(self, room: str):
+        """房间数据可能发生了变化（输出目录变化、任务状态变化），唤醒推送任务"""
+        with self._lock:
+            event = self._wakeups.get(room)
+        if event:
+            event.set()
+
+    def wait(self, room: str, timeout: Optional[float] = None):
+        """推送任务等待 wake，timeout 为空时一直等待；房间没有订阅者后立即返回"""
+        with self._lock:
+            event = self._wakeups.get(room)
+        if event:
+            event.wait(timeout)
+            event.clear()
+
+    def is_current(self, room: str, generation: int) -> bool:
+        """推送任务是否仍需运行"""
+        with self._lock:
+            return self._generations.get(room) == generation
+
+    def finish(self, room: str, generation: int):
+        """推送任务主动结束（例如任务已删除），允许之后重新启动"""
+        with self._lock:
+            if self._generations.get(room) == generation:
+                del self._generations[room]
+
+    def subscriber_count(self, room: str) -> int:
+        with self._lock:
+            return len({sid for sid, _ in self._members.get(room, ())})
+
+
+class BatchSubscriptions:
+    """批量订阅 - 每个周期把一个客户端订阅的所有任务的增量合并成一条消息"""
+
+    def __init__(self, producers: RoomProducers):
+        self._producers = producers
+        self._lock = threading.Lock()
+        # sid -> {task_id: 已发送给该客户端的序号}
+        self._sent: Dict[str, Dict[int, int]] = {}
+        self._running = False
+
+    def subscribe(self, sid: str, task_ids: List[int]):
+        with self._lock:
+            sent = self._sent.setdefault(sid, {})
+            for task_id in task_ids:
+                sent.setdefault(task_id, 0)
+            start = not self._running
+            self._running = True
+
+        for task_id in task_ids:
+            self._producers.subscribe(sid, task_room(task_id), produce_task_updates, task_id, join=False)
+
+        if start:
+            self._producers.socketio.start_background_task(self._run)
+
+    def unsubscribe(self, sid: str, task_ids: Optional[List[int]] = None):
+        with self._lock:
+            sent = self._sent.get(sid, {})
+            for task_id in list(sent) if task_ids is None else task_ids:
+                if sent.pop(task_id, None) is not None:
+                    self._producers.unsubscribe(sid, task_room(task_id), leave=False)
+            if not sent:
+                self._sent.pop(sid, None)
+
+    def resync(self, sid: str, task_id: int):
+        """下次推送时给该客户端发送任务快照"""
+        with self._lock:
+            if task_id in self._sent.get(sid, {}):
+                self._sent[sid][task_id] = 0
+
+    def flush(self):
+        """为每个客户端发送一条包含其所有任务增量的消息"""
+        with self._lock:
+            subscriptions = {sid: dict(sent) for sid, sent in self._sent.items()}
+
+        for sid, sent in subscriptions.items():
+            entries = []
+            for task_id, last_seq in sent.items():
+                entry = build_delta_entry(self._producers.state(task_room(task_id)), last_seq)
+                if entry:
+                    entry["task_id"] = task_id
+                    entries.append(entry)
+                    sent[task_id] = entry["seq"]
+
+            if not entries:
+                continue
+
+            self._producers.socketio.emit("tasks_delta", {
+                "tasks": entries,
+                "timestamp": datetime.now().isoformat()
+            }, to=sid)
+
+            with self._lock:
+                current = self._sent.get(sid)
+                if current is not None:
+                    for task_id, seq in sent.items():
+                        if task_id in current:
+                            current[task_id] = seq
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._sent:
+                    self._running = False
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"批量推送任务更新失败: {e}")
+            self._producers.socketio.sleep(settings.monitor_interval)
+
+
+def build_delta_entry(state: DeltaState, last_seq: int) -> Optional[Dict]:
+    """根据客户端已有的序号构建增量，无法补齐时返回快照"""
+    if state.seq == 0 or state.seq == last_seq:
+        return None
+
+    delta = state.since(last_seq) if last_seq else None
+    if delta is None:
+        seq, data = state.snapshot()
+        return {"seq": seq, "snapshot": data}
+
+    seq, changes, removed = delta
+    return {"seq": seq, "base_seq": last_seq, "changes": changes, "removed": removed}
 
 
 def register_socket_events(socketio):
     """注册 WebSocket 事件处理器"""
 
+    producers = RoomProducers(socketio)
+    batches = BatchSubscriptions(producers)
+
+    def emit_task_snapshot(task_id: int):
+        """给当前客户端发送任务完整快照"""
+        seq, data = producers.state(task_room(task_id)).snapshot()
+        if seq:
+            emit("task_update", dict(data, task_id=task_id, seq=seq))
+
+    def emit_dashboard_snapshot():
+        """给当前客户端发送仪表盘完整快照"""
+        seq, data = producers.state(DASHBOARD_ROOM).snapshot()
+        if seq:
+            emit("dashboard_update", dict(data, seq=seq))
+
     @socketio.on("connect")
     def handle_connect():
         """处理客户端连接"""
@@ -18,96 +399,293 @@ def register_socket_events(socketio):
     @socketio.on("disconnect")
     def handle_disconnect():
         """处理客户端断开连接"""
+        batches.unsubscribe(request.sid)
+        producers.unsubscribe_all(request.sid)
         print(f"客户端断开连接: {datetime.now()}")
 
     @socketio.on("subscribe_task")
     def handle_subscribe_task(data):
-        """订阅任务实时数据"""
-        task_id = data.get("task_id")
+        """订阅任务实时数据：先发送完整快照，之后只推送增量"""
+        task_id = _parse_task_id(data)
+        if not task_id or not task_manager.get_task(task_id):
+            return
 
-        if task_id:
-            # 启动任务监控任务
-            asyncio.create_task(monitor_task_updates(task_id, socketio))
+        # 推送任务已在运行时直接发送当前快照，否则由其首次推送发送
+        emit_task_snapshot(task_id)
+        producers.subscribe(request.sid, task_room(task_id), produce_task_updates, task_id)
 
     @socketio.on("unsubscribe_task")
     def handle_unsubscribe_task(data):
         """取消订阅任务"""
-        task_id = data.get("task_id")
-        # 这里可以添加取消订阅的逻辑
-        print(f"取消订阅任务: {task_id}")
+        task_id = _parse_task_id(data)
+        if task_id:
+            producers.unsubscribe(request.sid, task_room(task_id))
+
+    @socketio.on("resync_task")
+    def handle_resync_task(data):
+        """客户端检测到序号缺口时请求重新同步"""
+        task_id = _parse_task_id(data)
+        if not task_id:
+            return
+        emit_task_snapshot(task_id)
+        batches.resync(request.sid, task_id)
+
+    @socketio.on("subscribe_tasks")
+    def handle_subscribe_tasks(data):
+        """批量订阅多个任务，每个周期一条 tasks_delta 消息携带所有任务的增量"""
+        task_ids = [task_id for task_id in _parse_task_ids(data) if task_manager.get_task(task_id)]
+        if task_ids:
+            batches.subscribe(request.sid, task_ids)
+
+    @socketio.on("unsubscribe_tasks")
+    def handle_unsubscribe_tasks(data):
+        """取消批量订阅，不指定任务时取消全部"""
+        batches.unsubscribe(request.sid, _parse_task_ids(data) or None)
+
+    @socketio.on("subscribe_logs")
+    def handle_subscribe_logs(data):
+        """订阅 fuzzer 输出：先发送缓冲区中的最近输出，之后推送新增部分"""
+        task_id = _parse_task_id(data)
+        if not task_id or not task_manager.get_task(task_id):
+            return
+
+        emit("task_log", {
+            "task_id": task_id,
+            "logs": fuzzer_logs.tail(task_id),
+            "timestamp": datetime.now().isoformat()
+        })
+        producers.subscribe(request.sid, log_room(task_id), produce_log_updates, task_id)
+
+    @socketio.on("unsubscribe_logs")
+    def handle_unsubscribe_logs(data):
+        """取消订阅 fuzzer 输出"""
+        task_id = _parse_task_id(data)
+        if task_id:
+            producers.unsubscribe(request.sid, log_room(task_id))
+
+    @socketio.on("subscribe_build")
+    def handle_subscribe_build(data):
+        """订阅编译进度：先发送当前状态和已有的编译输出，之后推送状态变化和新增输出"""
+        task_id = _parse_task_id(data)
+        if not task_id or not task_manager.get_task(task_id):
+            return
+
+        join_room(build_room(task_id))
+        job = build_queue.get_job(task_id)
+        if job:
+            emit("build_status", dict(job, timestamp=datetime.now().isoformat()))
+
+    @socketio.on("unsubscribe_build")
+    def handle_unsubscribe_build(data):
+        """取消订阅编译进度"""
+        task_id = _parse_task_id(data)
+        if task_id:
+            leave_room(build_room(task_id))
 
     @socketio.on("subscribe_dashboard")
     def handle_subscribe_dashboard():
         """订阅仪表盘实时数据"""
-        asyncio.create_task(monitor_dashboard_updates(socketio))
+        emit_dashboard_snapshot()
+        producers.subscribe(request.sid, DASHBOARD_ROOM, produce_dashboard_updates)
+
+    @socketio.on("unsubscribe_dashboard")
+    def handle_unsubscribe_dashboard():
+        """取消订阅仪表盘"""
+        producers.unsubscribe(request.sid, DASHBOARD_ROOM)
+
+    @socketio.on("resync_dashboard")
+    def handle_resync_dashboard():
+        """仪表盘重新同步"""
+        emit_dashboard_snapshot()
 
     @socketio.on("ping")
     def handle_ping():
         """处理心跳检测"""
         emit("pong", {"timestamp": datetime.now().isoformat()})
 
+    def handle_task_files_changed(task_id: int, kind: str, paths: list):
+        """监听到新崩溃时立即通知订阅该任务的客户端"""
+        task = task_manager.get_task(task_id)
+        if kind != "crashes" or not paths or not task:
+            return
+
+        socketio.emit("task_crash", {
+            "task_id": task_id,
+            "files": [os.path.relpath(path, task.output_dir) for path in paths],
+            "timestamp": datetime.now().isoformat()
+        }, to=task_room(task_id))
+
+    task_watcher.add_listener(handle_task_files_changed)
+
+    def handle_task_files_updated(task_id: int, *_):
+        """输出目录变化时唤醒任务房间的推送任务"""
+        producers.wake(task_room(task_id))
+
+    task_watcher.add_listener(handle_task_files_updated)
+
+    def handle_task_status_changed(task_id: int, status: TaskStatus):
+        """任务状态变化（包括结束后重新启动）时唤醒任务和日志房间的推送任务"""
+        producers.wake(task_room(task_id))
+        producers.wake(log_room(task_id))
 
-async def monitor_task_updates(task_id: int, socketio):
-    """监控任务更新并发送到客户端"""
+    task_manager.add_status_listener(handle_task_status_changed)
+
+    def handle_build_event(task_id: int, kind: str, data: Dict):
+        """编译状态变化和编译器输出推送给订阅编译进度的客户端"""
+        event = "build_status" if kind == "status" else "build_output"
+        socketio.emit(event, dict(data, task_id=task_id, timestamp=datetime.now().isoformat()),
+                      to=build_room(task_id))
+
+    build_queue.add_listener(handle_build_event)
+
+
+def _parse_task_id(data) -> Optional[int]:
+    """从订阅消息中解析任务ID（前端路由参数可能是字符串）"""
+    try:
+        return int((data or {}).get("task_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_task_ids(data) -> List[int]:
+    """从批量订阅消息中解析任务ID列表"""
+    task_ids = []
+    for value in (data or {}).get("task_ids") or []:
+        try:
+            task_ids.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return task_ids
+
+
+def build_task_state(task_id: int) -> Optional[Dict]:
+    """构建任务状态（快照内容，也是计算增量的基准）"""
     task = task_manager.get_task(task_id)
     if not task:
+        return None
+
+    stats = monitoring_service.get_task_stats(task_id)
+    if not stats:
+        return None
+
+    return {
+        "task_name": task.name,
+        "status": task.task_status.value,
+        "stats": stats
+    }
+
+
+def emit_room_update(producers: RoomProducers, room: str, event: str, delta_event: str,
+                     data: Dict, extra: Dict):
+    """更新房间状态：首个版本发送完整快照，之后发送带序号的增量"""
+    update = producers.state(room).update(data)
+    if not update:
         return
 
-    last_stats = {}
+    seq, changes, removed = update
+    timestamp = datetime.now().isoformat()
+    if seq == 1:
+        producers.socketio.emit(event, dict(data, seq=seq, timestamp=timestamp, **extra), to=room)
+    else:
+        producers.socketio.emit(delta_event, dict(
+            extra, seq=seq, changes=changes, removed=removed, timestamp=timestamp
+        ), to=room)
 
-    while True:
-        try:
-            # 获取最新统计信息
-            stats = await monitoring_service.get_task_stats(task_id)
 
-            if stats and stats != last_stats:
-                # 发送任务更新
-                socketio.emit("task_update", {
-                    "task_id": task_id,
-                    "task_name": task.name,
-                    "status": task.status.value,
-                    "stats": stats,
-                    "timestamp": datetime.now().isoformat()
-                })
+def produce_task_updates(producers: RoomProducers, room: str, generation: int, task_id: int):
+    """任务房间的推送任务：统计只计算一次，变化时向整个房间发送增量
 
-                last_stats = stats.copy()
+    输出目录变化（fuzzer_stats 更新、新样本）和任务状态变化时才重新计算；
+    inotify 不可用时文件监听退化为轮询，这里也按 monitor_interval 刷新。
+    任务结束后继续等待，重新启动（重新导入种子、应用语料精简）后照常推送。
+    """
+    timeout = None if task_watcher.using_inotify else settings.monitor_interval
 
-                # 如果任务状态变化，发送状态更新
-                if task.task_status.value in ["completed", "failed", "stopped"]:
-                    break
+    while producers.is_current(room, generation):
+        try:
+            data = build_task_state(task_id)
+            if not data:
+                break
+
+            emit_room_update(producers, room, "task_update", "task_delta", data, {"task_id": task_id})
 
         except Exception as e:
             print(f"监控任务更新失败: {e}")
             break
 
-        # 2秒轮询一次
-        await asyncio.sleep(2)
+        producers.wait(room, timeout)
+
+    producers.finish(room, generation)
+
 
+def produce_log_updates(producers: RoomProducers, room: str, generation: int, task_id: int):
+    """日志房间的推送任务：按偏移量读取各实例新增的输出
 
-async def monitor_dashboard_updates(socketio):
-    """监控仪表盘更新并发送到客户端"""
-    last_total_crashes = -1
-    last_total_executions = -1
+    fuzzer 运行时每秒推送一次；任务不在运行且输出管道全部关闭后等待
+    任务状态变化，重新启动时从新缓冲区的开头推送。
+    """
+    socketio = producers.socketio
+    # 订阅时已发送缓冲区内容，从当前位置开始推送
+    log_generation = fuzzer_logs.generation(task_id)
+    offsets = {log["instance"]: log["next_offset"] for log in fuzzer_logs.tail(task_id, limit=0)}
+    idle = False
 
-    while True:
+    while producers.is_current(room, generation):
         try:
-            stats = await monitoring_service.get_dashboard_stats()
+            task = task_manager.get_task(task_id)
+            if not task:
+                break
+            running = task.task_status in (TaskStatus.RUNNING, TaskStatus.PAUSED)
+            if fuzzer_logs.generation(task_id) != log_generation:
+                # 任务重新启动，各实例的输出缓冲区已重建
+                log_generation = fuzzer_logs.generation(task_id)
+                offsets = {}
+            streaming = fuzzer_logs.is_streaming(task_id)
 
-            # 只在有变化时发送
-            if (stats["total_crashes"] != last_total_crashes or
-                stats["total_executions"] != last_total_executions):
+            logs = []
+            for instance in fuzzer_logs.instances(task_id):
+                for log in fuzzer_logs.tail(task_id, instance=instance, since=offsets.get(instance, 0)):
+                    offsets[instance] = log["next_offset"]
+                    if log["data"] or log["truncated"]:
+                        logs.append(log)
 
-                socketio.emit("dashboard_update", {
-                    "stats": stats,
+            if logs:
+                socketio.emit("task_log", {
+                    "task_id": task_id,
+                    "logs": logs,
                     "timestamp": datetime.now().isoformat()
-                })
+                }, to=room)
 
-                last_total_crashes = stats["total_crashes"]
-                last_total_executions = stats["total_executions"]
+            # 任务结束且所有实例的输出管道关闭后，发送完剩余输出即可等待
+            idle = not running and not streaming
+
+        except Exception as e:
+            print(f"推送任务日志失败: {e}")
+            break
+
+        if idle:
+            producers.wait(room)
+        else:
+            # 1秒推送一次
+            socketio.sleep(1)
+
+    producers.finish(room, generation)
+
+
+def produce_dashboard_updates(producers: RoomProducers, room: str, generation: int):
+    """仪表盘房间的推送任务"""
+    socketio = producers.socketio
+
+    while producers.is_current(room, generation):
+        try:
+            data = {"stats": monitoring_service.get_dashboard_stats()}
+            emit_room_update(producers, room, "dashboard_update", "dashboard_delta", data, {})
 
         except Exception as e:
             print(f"监控仪表盘更新失败: {e}")
             break
 
         # 5秒轮询一次
-        await asyncio.sleep(5)
+        socketio.sleep(5)
+
+    producers.finish(room, generation)
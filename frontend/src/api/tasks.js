@@ -22,11 +22,12 @@ export const getAllCrashes = (taskId) => {
   })
 }
 
-export const getCoverage = (taskId) => {
+// 指定 group 时返回共享组内各任务覆盖的并集和交集
+export const getCoverage = (taskId, group) => {
   return request({
     url: '/results/coverage',
     method: 'get',
-    params: { taskId }
+    params: { taskId, group }
   })
 }
 
@@ -47,6 +48,16 @@ export const downloadCrash = (crashId) => {
   })
 }
 
+// 打包下载崩溃样本，params 为 { crash_ids } 或过滤条件，format 为 tar / zip
+export const downloadCrashes = (params, format = 'tar') => {
+  return request({
+    url: '/results/crashes/download',
+    method: 'post',
+    data: { ...params, format },
+    responseType: 'blob'
+  })
+}
+
 export const getTaskStats = (taskId) => {
   return request({
     url: `/tasks/${taskId}/stats`,
@@ -54,6 +65,66 @@ export const getTaskStats = (taskId) => {
   })
 }
 
+// params: metrics, from, to, resolution, instance, maxPoints
+export const getTaskTimeseries = (taskId, params = {}) => {
+  return request({
+    url: `/tasks/${taskId}/timeseries`,
+    method: 'get',
+    params
+  })
+}
+
+// params: page, pageSize, sort (new_edges / edges / id)
+export const getTaskCoverage = (taskId, params = {}) => {
+  return request({
+    url: `/tasks/${taskId}/coverage`,
+    method: 'get',
+    params
+  })
+}
+
+export const updateTaskCoverage = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/coverage`,
+    method: 'post'
+  })
+}
+
+export const getBuilds = () => {
+  return request({
+    url: '/tasks/builds',
+    method: 'get'
+  })
+}
+
+export const getBuildCache = () => {
+  return request({
+    url: '/tasks/builds/cache',
+    method: 'get'
+  })
+}
+
+export const clearBuildCache = () => {
+  return request({
+    url: '/tasks/builds/cache',
+    method: 'delete'
+  })
+}
+
+export const getTaskBuild = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/build`,
+    method: 'get'
+  })
+}
+
+export const cancelTaskBuild = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/build/cancel`,
+    method: 'post'
+  })
+}
+
 export const getTaskCrashes = (taskId) => {
   return request({
     url: `/tasks/${taskId}/crashes`,
@@ -68,6 +139,60 @@ export const getTaskCorpus = (taskId) => {
   })
 }
 
+export const getCorpusDistill = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/corpus/distill`,
+    method: 'get'
+  })
+}
+
+// restart 为 true 时精简完成后用精简语料重新启动任务
+export const distillCorpus = (taskId, restart = false) => {
+  return request({
+    url: `/tasks/${taskId}/corpus/distill`,
+    method: 'post',
+    data: { restart }
+  })
+}
+
+export const applyDistilledCorpus = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/corpus/distill/apply`,
+    method: 'post'
+  })
+}
+
+export const getShareGroups = () => {
+  return request({
+    url: '/tasks/share-groups',
+    method: 'get'
+  })
+}
+
+export const getCorpusShare = (taskId) => {
+  return request({
+    url: `/tasks/${taskId}/corpus/share`,
+    method: 'get'
+  })
+}
+
+// group 为空时退出共享组
+export const setCorpusShare = (taskId, group) => {
+  return request({
+    url: `/tasks/${taskId}/corpus/share`,
+    method: 'put',
+    data: { group }
+  })
+}
+
+export const getTaskLogs = (taskId, params = {}) => {
+  return request({
+    url: `/tasks/${taskId}/logs`,
+    method: 'get',
+    params
+  })
+}
+
 export const getTaskDetail = (taskId) => {
   return request({
     url: `/tasks/${taskId}`,
@@ -33,6 +33,44 @@ export const uploadSeedFiles = (formData) => {
   })
 }
 
+export const getSeedSets = () => {
+  return request({
+    url: '/seeds/sets',
+    method: 'get'
+  })
+}
+
+export const getSeedSet = (name) => {
+  return request({
+    url: `/seeds/sets/${name}`,
+    method: 'get'
+  })
+}
+
+// 把任务当前的种子保存为种子集
+export const createSeedSet = (name, taskId, description = '') => {
+  return request({
+    url: '/seeds/sets',
+    method: 'post',
+    data: { name, taskId, description }
+  })
+}
+
+export const deleteSeedSet = (name) => {
+  return request({
+    url: `/seeds/sets/${name}`,
+    method: 'delete'
+  })
+}
+
+export const applySeedSet = (name, taskId, replace = false) => {
+  return request({
+    url: `/seeds/sets/${name}/apply`,
+    method: 'post',
+    data: { taskId, replace }
+  })
+}
+
 export const getTasks = () => {
   return request({
     url: '/tasks',
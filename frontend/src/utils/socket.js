@@ -24,11 +24,69 @@ const eventBus = {
   }
 }
 
+// 将增量应用到本地数据上，removed 为以 "." 连接的字段路径
+function applyDelta(data, changes, removed = []) {
+  removed.forEach(path => {
+    const keys = path.split('.')
+    const leaf = keys.pop()
+    let target = data
+    for (const key of keys) {
+      target = target && target[key]
+    }
+    if (target && typeof target === 'object') {
+      delete target[leaf]
+    }
+  })
+
+  // 对象按字段合并；数组对应的对象为 {下标: 变化的字段}
+  Object.keys(changes || {}).forEach(key => {
+    const value = changes[key]
+    const current = data[key]
+    const isObject = value && typeof value === 'object' && !Array.isArray(value)
+    if (isObject && Array.isArray(current)) {
+      Object.keys(value).forEach(index => applyDelta(current[index], value[index]))
+    } else if (isObject && current && typeof current === 'object') {
+      applyDelta(current, value)
+    } else {
+      data[key] = value
+    }
+  })
+
+  return data
+}
+
 // 简单的 Socket.IO 客户端
 class SimpleSocketClient {
   constructor() {
     this.socket = null
     this.connected = false
+    // 服务端只推送增量，本地保存每个任务/仪表盘的完整数据和序号
+    this.taskStates = {}
+    this.dashboardState = null
+  }
+
+  // 收到完整快照
+  handleTaskSnapshot(data) {
+    this.taskStates[data.task_id] = data
+    eventBus.emit('task:update', data)
+  }
+
+  // 收到任务增量，序号不连续时请求重新同步
+  handleTaskDelta(taskId, delta) {
+    const state = this.taskStates[taskId]
+    const baseSeq = delta.base_seq !== undefined ? delta.base_seq : delta.seq - 1
+    if (!state || state.seq !== baseSeq) {
+      delete this.taskStates[taskId]
+      this.emit('resync_task', { task_id: Number(taskId) })
+      return
+    }
+
+    applyDelta(state, delta.changes, delta.removed)
+    state.seq = delta.seq
+    if (delta.timestamp) {
+      state.timestamp = delta.timestamp
+    }
+    eventBus.emit('task:update', state)
   }
 
   // 连接到服务器
@@ -83,18 +141,63 @@ class SimpleSocketClient {
           }
         })
 
-        // 接收任务更新
+        // 接收任务完整快照
         this.socket.on('task_update', (data) => {
           console.log('[Socket] 任务更新:', data)
-          eventBus.emit('task:update', data)
+          this.handleTaskSnapshot(data)
+        })
+
+        // 接收任务增量
+        this.socket.on('task_delta', (delta) => {
+          this.handleTaskDelta(delta.task_id, delta)
         })
 
-        // 接收仪表盘更新
+        // 接收批量订阅的任务增量
+        this.socket.on('tasks_delta', (data) => {
+          data.tasks.forEach(entry => {
+            if (entry.snapshot) {
+              this.handleTaskSnapshot({ ...entry.snapshot, task_id: entry.task_id, seq: entry.seq })
+            } else {
+              this.handleTaskDelta(entry.task_id, { ...entry, timestamp: data.timestamp })
+            }
+          })
+        })
+
+        // 接收 fuzzer 输出
+        this.socket.on('task_log', (data) => {
+          eventBus.emit('task:log', data)
+        })
+
+        // 接收编译状态和编译器输出
+        this.socket.on('build_status', (data) => {
+          eventBus.emit('task:build', { type: 'status', ...data })
+        })
+
+        this.socket.on('build_output', (data) => {
+          eventBus.emit('task:build', { type: 'output', ...data })
+        })
+
+        // 接收仪表盘完整快照
         this.socket.on('dashboard_update', (data) => {
           console.log('[Socket] 仪表盘更新:', data)
+          this.dashboardState = data
           eventBus.emit('dashboard:update', data)
         })
 
+        // 接收仪表盘增量
+        this.socket.on('dashboard_delta', (delta) => {
+          const state = this.dashboardState
+          if (!state || state.seq !== delta.seq - 1) {
+            this.dashboardState = null
+            this.emit('resync_dashboard')
+            return
+          }
+          applyDelta(state, delta.changes, delta.removed)
+          state.seq = delta.seq
+          state.timestamp = delta.timestamp
+          eventBus.emit('dashboard:update', state)
+        })
+
         // 心跳响应
         this.socket.on('pong', (data) => {
           console.log('[Socket] 心跳响应:', data)
@@ -139,6 +242,26 @@ class SimpleSocketClient {
     eventBus.off('task:update', callback)
   }
 
+  // 监听 fuzzer 输出，每个实例的数据带有 offset / next_offset
+  onTaskLog(callback) {
+    eventBus.on('task:log', callback)
+  }
+
+  // 取消监听 fuzzer 输出
+  offTaskLog(callback) {
+    eventBus.off('task:log', callback)
+  }
+
+  // 监听编译进度，type 为 status（编译状态）或 output（新增的编译器输出）
+  onBuild(callback) {
+    eventBus.on('task:build', callback)
+  }
+
+  // 取消监听编译进度
+  offBuild(callback) {
+    eventBus.off('task:build', callback)
+  }
+
   // 订阅仪表盘更新
   onDashboardUpdate(callback) {
     eventBus.on('dashboard:update', callback)
@@ -149,6 +272,76 @@ class SimpleSocketClient {
     eventBus.off('dashboard:update', callback)
   }
 
+  // 监听服务器事件
+  on(event, callback) {
+    if (this.socket) {
+      this.socket.on(event, callback)
+    }
+  }
+
+  // 取消监听服务器事件
+  off(event, callback) {
+    if (this.socket) {
+      this.socket.off(event, callback)
+    }
+  }
+
+  // 订阅任务实时数据，同一任务的推送由服务端房间统一发送
+  subscribeTask(taskId) {
+    this.emit('subscribe_task', { task_id: Number(taskId) })
+  }
+
+  // 取消订阅任务
+  unsubscribeTask(taskId) {
+    this.emit('unsubscribe_task', { task_id: Number(taskId) })
+    delete this.taskStates[taskId]
+  }
+
+  // 批量订阅多个任务，服务端每个周期合并成一条 tasks_delta 消息
+  subscribeTasks(taskIds) {
+    this.emit('subscribe_tasks', { task_ids: taskIds.map(Number) })
+  }
+
+  // 取消批量订阅，不传参数时取消全部
+  unsubscribeTasks(taskIds) {
+    const ids = taskIds || Object.keys(this.taskStates)
+    this.emit('unsubscribe_tasks', { task_ids: (taskIds || []).map(Number) })
+    ids.forEach(taskId => {
+      delete this.taskStates[taskId]
+    })
+  }
+
+  // 订阅编译进度
+  subscribeBuild(taskId) {
+    this.emit('subscribe_build', { task_id: Number(taskId) })
+  }
+
+  // 取消订阅编译进度
+  unsubscribeBuild(taskId) {
+    this.emit('unsubscribe_build', { task_id: Number(taskId) })
+  }
+
+  // 订阅 fuzzer 输出日志
+  subscribeLogs(taskId) {
+    this.emit('subscribe_logs', { task_id: Number(taskId) })
+  }
+
+  // 取消订阅 fuzzer 输出日志
+  unsubscribeLogs(taskId) {
+    this.emit('unsubscribe_logs', { task_id: Number(taskId) })
+  }
+
+  // 订阅仪表盘实时数据
+  subscribeDashboard() {
+    this.emit('subscribe_dashboard')
+  }
+
+  // 取消订阅仪表盘
+  unsubscribeDashboard() {
+    this.emit('unsubscribe_dashboard')
+    this.dashboardState = null
+  }
+
   // 连接状态
   onConnect(callback) {
     eventBus.on('socket:connected', callback)